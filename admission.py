@@ -0,0 +1,193 @@
+"""Request admission control: per-route concurrency and per-client rate limits.
+
+Web requests and the collector share one process and the GIL, so a client
+hammering the dashboard can delay poll cycles. AdmissionController puts
+three limits in front of the routes:
+
+- a token bucket per client address (`rate` requests per second, bursts of
+  `burst`); an empty bucket is answered with 429 and a Retry-After of the
+  time until the next token;
+- at most `concurrency` requests in flight per route (`limits` overrides it
+  per route). Requests over the limit wait up to `timeout` seconds in a
+  queue of at most `queue` per route; a full queue or a timeout is answered
+  with 503 right away;
+- while a poll cycle processes and stores a fleet (collector_priority()),
+  at most `poll_concurrency` requests in flight in total, so the collector
+  gets most of the interpreter for that part. The upstream fetch before it
+  mostly waits on the network and is not covered.
+
+A rate, concurrency or poll_concurrency of 0 disables that limit; a queue
+of 0 rejects as soon as a route is at its limit. Rejections raise
+Rejected; stats() reports the in-flight, queued, rejected and timed-out
+counts per route.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+BUSY_RETRY_AFTER = 1  # seconds suggested to clients turned away by a full queue
+
+
+class Rejected(Exception):
+    """A request turned away; `status` is 429 or 503."""
+
+    def __init__(self, status, retry_after, reason):
+        super().__init__(reason)
+        self.status = status
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class TokenBucket:
+    """`rate` tokens per second, holding at most `burst`."""
+
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.stamp = now
+
+    def take(self, now):
+        """Take a token; return 0, or the seconds until one is available."""
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        concurrency=0,
+        limits=None,
+        queue=0,
+        timeout=5.0,
+        rate=0,
+        burst=1,
+        poll_concurrency=0,
+        max_clients=10000,
+    ):
+        self.concurrency = concurrency
+        self.limits = dict(limits or {})
+        self.queue = queue
+        self.timeout = timeout
+        self.rate = rate
+        self.burst = burst
+        self.poll_concurrency = poll_concurrency
+        self.max_clients = max_clients
+        self._cond = threading.Condition()
+        self._routes = {}
+        self._clients = OrderedDict()  # address -> TokenBucket, least recent first
+        self.active = 0
+        self.polling = 0
+        self.rate_limited = 0
+
+    def limit(self, route):
+        return self.limits.get(route, self.concurrency)
+
+    def _route(self, route):
+        stats = self._routes.get(route)
+        if stats is None:
+            stats = self._routes[route] = {
+                "active": 0,
+                "waiting": 0,
+                "admitted": 0,
+                "queued": 0,
+                "rejected": 0,
+                "timed_out": 0,
+            }
+        return stats
+
+    def _can_enter(self, stats, limit):
+        if limit and stats["active"] >= limit:
+            return False
+        return not (self.polling and self.poll_concurrency and self.active >= self.poll_concurrency)
+
+    def throttle(self, client, now=None):
+        """Charge `client` one request; return 0 or the seconds to retry after."""
+        if not self.rate:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        with self._cond:
+            bucket = self._clients.pop(client, None)
+            if bucket is None:
+                bucket = TokenBucket(self.rate, self.burst, now)
+            self._clients[client] = bucket
+            while len(self._clients) > self.max_clients:
+                self._clients.popitem(last=False)
+            wait = bucket.take(now)
+            if wait:
+                self.rate_limited += 1
+            return wait
+
+    def admit(self, route, client, rate_checked=False):
+        """Block until `route` has a free slot; Rejected if it cannot get one.
+
+        Every admitted request must be paired with release(route).
+        """
+        if not rate_checked:
+            wait = self.throttle(client)
+            if wait:
+                raise Rejected(429, max(1, math.ceil(wait)), "rate limited")
+        with self._cond:
+            stats = self._route(route)
+            limit = self.limit(route)
+            if not self._can_enter(stats, limit):
+                if stats["waiting"] >= self.queue:
+                    stats["rejected"] += 1
+                    raise Rejected(503, BUSY_RETRY_AFTER, "too many requests in progress")
+                stats["waiting"] += 1
+                stats["queued"] += 1
+                deadline = time.monotonic() + self.timeout
+                try:
+                    while not self._can_enter(stats, limit):
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            stats["timed_out"] += 1
+                            raise Rejected(503, BUSY_RETRY_AFTER, "timed out waiting for a slot")
+                        self._cond.wait(remaining)
+                finally:
+                    stats["waiting"] -= 1
+            stats["active"] += 1
+            stats["admitted"] += 1
+            self.active += 1
+        return route
+
+    def release(self, route):
+        with self._cond:
+            self._routes[route]["active"] -= 1
+            self.active -= 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def collector_priority(self):
+        """Hold web requests to poll_concurrency while the block runs."""
+        with self._cond:
+            self.polling += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self.polling -= 1
+                self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            routes = {
+                route: dict(stats, limit=self.limit(route))
+                for route, stats in sorted(self._routes.items())
+            }
+            return {
+                "active": self.active,
+                "polling": bool(self.polling),
+                "rate_limited": self.rate_limited,
+                "clients": len(self._clients),
+                "queued": sum(s["queued"] for s in routes.values()),
+                "rejected": sum(s["rejected"] for s in routes.values()),
+                "timed_out": sum(s["timed_out"] for s in routes.values()),
+                "routes": routes,
+            }
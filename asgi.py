@@ -0,0 +1,484 @@
+"""ASGI entry point for the dashboard: `uvicorn asgi:app`.
+
+The hot read paths are answered on the event loop from the same
+generation-keyed caches the Flask views fill: the page (when already
+rendered), /api/orchestrators and the /api/events stream. Everything else,
+including cache misses, is handed to the Flask app on a small thread pool,
+so both serving modes share one snapshot, one set of caches and one set of
+routes.
+
+The collector runs as a task on the event loop rather than a thread. The
+poll cycle itself (HTTP requests and SQLite) is blocking, so each cycle is
+run on a dedicated thread that request traffic cannot starve. Followers
+(processes that lost the collector election) pick up new snapshots from a
+watcher task, which also wakes the /api/events subscribers.
+
+Admission control (admission.py) charges each client's rate limit here,
+before the fast paths, so cached responses cannot be scraped without limit
+either. Per-route concurrency limits apply in the Flask app, which only
+sees requests that need a worker thread.
+
+With TRACE_DIR set, responses answered here (the fast paths and 429s) get
+the same "GET <route>" server traces as the ones Flask answers.
+"""
+import asyncio
+import io
+import json
+import logging
+import math
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+from werkzeug.exceptions import HTTPException
+
+import test_orchestrators as dashboard
+import tracing
+
+WATCH_INTERVAL = 0.25  # seconds between checks for a new generation
+
+
+def route_path(scope):
+    """The request path below the app's mount point (root_path)."""
+    root_path = scope.get("root_path", "")
+    path = scope["path"]
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+    return path or "/"
+
+
+def wsgi_environ(scope, body):
+    """Build a WSGI environ for an ASGI http scope."""
+    root_path = scope.get("root_path", "")
+    path = route_path(scope)
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": root_path.encode("utf-8").decode("latin-1"),
+        "PATH_INFO": path.encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": "HTTP/" + scope.get("http_version", "1.1"),
+        "REMOTE_ADDR": client[0],
+        "REMOTE_PORT": str(client[1]),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope.get("headers", []):
+        name = name.decode("latin-1")
+        if name == "content-type":
+            key = "CONTENT_TYPE"
+        elif name == "content-length":
+            key = "CONTENT_LENGTH"
+        else:
+            key = "HTTP_" + name.upper().replace("-", "_")
+        value = value.decode("latin-1")
+        environ[key] = environ[key] + "," + value if key in environ else value
+    return environ
+
+
+def run_wsgi(wsgi_app, environ):
+    """Call a WSGI app; return (status, headers, body) for ASGI."""
+    response = []
+    chunks = []
+
+    def start_response(status, headers, exc_info=None):
+        response[:] = [
+            int(status.split(" ", 1)[0]),
+            [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers],
+        ]
+        return chunks.append
+
+    result = wsgi_app(environ, start_response)
+    try:
+        for chunk in result:
+            chunks.append(chunk)
+    finally:
+        if hasattr(result, "close"):
+            result.close()
+    return response[0], response[1], b"".join(chunks)
+
+
+def scope_client(scope):
+    """dashboard.client_address() for an ASGI scope."""
+    forwarded = ",".join(
+        value.decode("latin-1") for name, value in scope.get("headers", []) if name == b"x-forwarded-for"
+    )
+    return dashboard.client_address((scope.get("client") or ("", 0))[0], forwarded)
+
+
+def etag_matches(header, etag):
+    """Whether an If-None-Match header value matches a strong ETag."""
+    if not header:
+        return False
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate.strip('"') == etag:
+            return True
+    return False
+
+
+def traced_send(send, root):
+    """send() that records the response status and size on a trace root."""
+    if root is None:
+        return send
+
+    async def traced(message):
+        if message["type"] == "http.response.start":
+            root.set(**{"http.status_code": message["status"], "http.response_content_length": 0})
+            if message["status"] >= 500:
+                root.status = tracing.STATUS_ERROR
+        elif message["type"] == "http.response.body":
+            root.attributes["http.response_content_length"] += len(message.get("body", b""))
+        await send(message)
+
+    return traced
+
+
+async def wait_for_disconnect(receive):
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+class DashboardASGI:
+    """ASGI application serving the dashboard; see the module docstring."""
+
+    def __init__(self, config=None):
+        self.config = config
+        self.flask_app = None
+        self.executor = None
+        self.poll_executor = None
+        self.tasks = []
+        self.changed = None  # asyncio.Event, replaced on every new generation
+        self.published_generation = None
+        self.subscribers = 0
+        self._startup_lock = asyncio.Lock()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self.lifespan(receive, send)
+        if scope["type"] != "http":
+            return
+        if self.flask_app is None:
+            await self.startup()
+
+        root = self.start_trace(scope)
+        answered = False
+        try:
+            answered = await self.answer(scope, receive, traced_send(send, root))
+        except BaseException as exc:
+            answered = True
+            if root is not None:
+                root.error(exc)
+            raise
+        finally:
+            if answered:
+                tracing.end_trace(root)
+        # Otherwise the root is dropped unexported: Flask traces what it serves.
+        if not answered:
+            await self.call_flask(scope, receive, send)
+
+    async def answer(self, scope, receive, send):
+        """Answer on the event loop if possible; False to hand over to Flask."""
+        method = scope["method"]
+        path = route_path(scope)
+        if not dashboard.admission_exempt(path):
+            wait = dashboard.get_admission().throttle(scope_client(scope))
+            if wait:
+                await self.reject(send, 429, max(1, math.ceil(wait)), "rate limited")
+                return True
+        if method in ("GET", "HEAD"):
+            query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+            if path == "/api/events" and method == "GET":
+                await self.events(scope, receive, send)
+                return True
+            if path == "/api/orchestrators":
+                return await self.orchestrators(scope, send, query)
+            if path == "/":
+                return await self.page(scope, send, query)
+        return False
+
+    def start_trace(self, scope):
+        """The root span of a request, named after its Flask route."""
+        if tracing.get_exporter() is None:
+            return None
+        method = scope["method"]
+        path = route_path(scope)
+        try:
+            rule, _ = self.flask_app.url_map.bind("localhost").match(
+                path, method=method, return_rule=True
+            )
+            rule = rule.rule
+        except HTTPException:
+            rule = "unmatched"
+        query = scope.get("query_string", b"").decode("latin-1")
+        return tracing.start_trace(
+            "{} {}".format(method, rule),
+            tracing.SERVER,
+            {
+                "http.method": method,
+                "http.route": rule,
+                "http.target": path + "?" + query if query else path,
+                "client.address": scope_client(scope),
+            },
+            detached=True,
+        )
+
+    # Lifecycle
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    await self.startup()
+                except Exception as exc:
+                    logging.exception("ASGI startup failed")
+                    await send({"type": "lifespan.startup.failed", "message": str(exc)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def startup(self):
+        async with self._startup_lock:
+            if self.flask_app is not None:
+                return
+            self.flask_app = dashboard.create_app(self.config)
+            self.executor = ThreadPoolExecutor(
+                dashboard.ASGI_THREADS, thread_name_prefix="asgi-flask"
+            )
+            self.changed = asyncio.Event()
+            self.published_generation = dashboard.data_generation
+            owner, elected = dashboard.elect_collector()
+            if owner and elected:
+                self.poll_executor = ThreadPoolExecutor(1, thread_name_prefix="asgi-poll")
+                self.tasks.append(asyncio.create_task(self.collect()))
+                logging.info("Collector task started in pid %d", os.getpid())
+            self.tasks.append(asyncio.create_task(self.watch()))
+
+    async def shutdown(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+        for executor in (self.executor, self.poll_executor):
+            if executor is not None:
+                executor.shutdown(wait=False)
+
+    def publish(self):
+        """Wake /api/events subscribers if the generation changed."""
+        if dashboard.data_generation == self.published_generation:
+            return
+        self.published_generation = dashboard.data_generation
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+    async def collect(self):
+        """The collector loop of fetch_orchestrators(), as a task."""
+        loop = asyncio.get_running_loop()
+        while True:
+            since = await loop.run_in_executor(
+                self.poll_executor, dashboard.seconds_since_last_poll
+            )
+            if since is not None and since < dashboard.UPDATE_INTERVAL:
+                await self.sleep_until_due(dashboard.UPDATE_INTERVAL - since)
+                continue
+            try:
+                await loop.run_in_executor(self.poll_executor, dashboard.run_poll)
+            except Exception:
+                logging.exception("Error fetching orchestrators")
+                await asyncio.sleep(dashboard.UPDATE_INTERVAL)
+            self.publish()
+
+    async def sleep_until_due(self, seconds):
+        """Sleep, returning early when /refresh resets the schedule."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + seconds
+        while loop.time() < deadline:
+            if dashboard.take_collector_wakeup():
+                return
+            await asyncio.sleep(min(0.5, deadline - loop.time()))
+
+    async def watch(self):
+        """Follow snapshots from other processes and publish new generations.
+
+        Also re-reads when the last poll finished, which page() needs but
+        must not read from the database on the event loop.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(WATCH_INTERVAL)
+            try:
+                if not dashboard.collector_owner:
+                    await loop.run_in_executor(self.executor, dashboard.follow_if_stale)
+                await loop.run_in_executor(self.executor, dashboard.last_poll_finished)
+            except Exception:
+                logging.exception("Error following snapshot")
+            self.publish()
+
+    # Responses
+
+    async def respond(self, send, status, headers, body, method="GET"):
+        headers = list(headers) + [(b"content-length", str(len(body)).encode())]
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": b"" if method == "HEAD" else body})
+
+    async def reject(self, send, status, retry_after, reason):
+        body = json.dumps({"error": reason, "retry_after": retry_after}).encode()
+        headers = [
+            (b"content-type", b"application/json"),
+            (b"retry-after", str(retry_after).encode()),
+        ]
+        await self.respond(send, status, headers, body)
+
+    async def call_flask(self, scope, receive, send):
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                break
+        environ = wsgi_environ(scope, b"".join(chunks))
+        environ["dashboard.rate_checked"] = True
+        status, headers, body = await asyncio.get_running_loop().run_in_executor(
+            self.executor, run_wsgi, self.flask_app, environ
+        )
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+    async def page(self, scope, send, query):
+        """Serve an already rendered page; False to let Flask render it."""
+        if "at" in query:
+            return False
+        generation, fleet = dashboard.data_generation, dashboard.orchestrators_data
+        view = dashboard.page_view(query.get("view", [None])[0], fleet)
+        version = dashboard.page_version(generation, reread=False)
+        html = dashboard.cached_page(view, version)
+        if html is None:
+            return False
+        etag = dashboard.page_etag(version, view)
+        headers = [
+            (b"etag", '"{}"'.format(etag).encode()),
+            (b"cache-control", b"no-cache"),
+        ]
+        if etag_matches(self.header(scope, b"if-none-match"), etag):
+            await self.respond(send, 304, headers, b"")
+        else:
+            headers.append((b"content-type", b"text/html; charset=utf-8"))
+            await self.respond(send, 200, headers, html.encode("utf-8"), scope["method"])
+        return True
+
+    async def orchestrators(self, scope, send, query):
+        """Serve /api/orchestrators; False to let Flask answer (errors, ?at=)."""
+        if "at" in query:
+            return False
+        if query.get("format", [None])[0] == "columns":
+            try:
+                body = await asyncio.get_running_loop().run_in_executor(
+                    self.executor,
+                    dashboard.orchestrators_columns_body,
+                    query.get("offset", [0])[0],
+                    query.get("limit", [dashboard.API_PAGE_SIZE])[0],
+                )
+            except ValueError:
+                return False
+        else:
+            body = dashboard.cached_rows_body()
+            if body is None:
+                body = await asyncio.get_running_loop().run_in_executor(
+                    self.executor, dashboard.orchestrators_rows_body
+                )
+        await self.respond(
+            send,
+            200,
+            [(b"content-type", b"application/json")],
+            body.encode("utf-8"),
+            scope["method"],
+        )
+        return True
+
+    async def events(self, scope, receive, send):
+        """Push a server-sent event for every new generation until disconnect."""
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"text/event-stream; charset=utf-8"),
+                    (b"cache-control", b"no-cache"),
+                    (b"x-accel-buffering", b"no"),
+                ],
+            }
+        )
+        sent = self.header(scope, b"last-event-id")
+        disconnected = asyncio.ensure_future(wait_for_disconnect(receive))
+        waiter = None
+        self.subscribers += 1
+        try:
+            while True:
+                if str(dashboard.data_generation) != sent:
+                    sent = str(dashboard.data_generation)
+                    frame = dashboard.event_frame(retry_ms=dashboard.UPDATE_INTERVAL * 1000)
+                    await send(
+                        {"type": "http.response.body", "body": frame.encode(), "more_body": True}
+                    )
+                if waiter is None:
+                    waiter = asyncio.ensure_future(self.changed.wait())
+                done, _ = await asyncio.wait(
+                    {waiter, disconnected},
+                    timeout=dashboard.EVENTS_KEEPALIVE,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if disconnected in done:
+                    break
+                if waiter in done:
+                    waiter = None
+                else:
+                    await send(
+                        {"type": "http.response.body", "body": b": keepalive\n\n", "more_body": True}
+                    )
+        except OSError:
+            pass  # client went away mid-send
+        finally:
+            self.subscribers -= 1
+            disconnected.cancel()
+            if waiter is not None:
+                waiter.cancel()
+
+    @staticmethod
+    def header(scope, name):
+        for key, value in scope.get("headers", []):
+            if key == name:
+                return value.decode("latin-1")
+        return None
+
+
+app = DashboardASGI()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    try:
+        import uvicorn
+    except ImportError:
+        sys.exit("uvicorn is not installed; `pip install uvicorn` or serve test_orchestrators:app with gunicorn")
+    uvicorn.run(app, host="0.0.0.0", port=int(os.environ.get("PORT", 5000)))
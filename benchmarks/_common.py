@@ -0,0 +1,62 @@
+"""Shared helpers for the benchmark scripts.
+
+The scripts are meant to be run directly from the project root, e.g.
+`python benchmarks/bench_startup.py`. They print plain-text tables.
+"""
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def synthetic_fleet(size, seed=0):
+    """Return `size` orchestrator records shaped like the upstream API."""
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    fleet = []
+    for i in range(size):
+        healthy = rng.random() < 0.8
+        fleet.append(
+            {
+                "orchestrator_id": "orch-{:06d}".format(i),
+                "address": "0x{:040x}".format(rng.getrandbits(160)),
+                "balance_eth": round(rng.uniform(0, 5), 8),
+                "eligible_for_payments": rng.random() < 0.7,
+                "cooldown_active": rng.random() < 0.1,
+                "is_top_100": i < 100,
+                "last_healthy_at": (
+                    (now - timedelta(minutes=rng.randint(0, 120))).isoformat()
+                    if healthy
+                    else None
+                ),
+            }
+        )
+    return fleet
+
+
+def measure(fn, repeat=5):
+    """Run fn `repeat` times; return (median, min) wall time in seconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples), min(samples)
+
+
+def print_table(headers, rows):
+    widths = [
+        max(len(str(h)), *(len(str(r[i])) for r in rows)) if rows else len(str(h))
+        for i, h in enumerate(headers)
+    ]
+    line = "  ".join(str(h).ljust(w) for h, w in zip(headers, widths))
+    print(line)
+    print("-" * len(line))
+    for row in rows:
+        print("  ".join(str(c).ljust(w) for c, w in zip(row, widths)))
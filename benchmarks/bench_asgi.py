@@ -0,0 +1,212 @@
+"""WSGI (gunicorn) vs. ASGI (uvicorn) under many idle live-update clients.
+
+    python benchmarks/bench_asgi.py --fleet 2000 --subscribers 500 --clients 16 --duration 15
+
+For each server in --servers (`wsgi:WORKERSxTHREADS` or `asgi:WORKERS`) this
+script serves the same seeded DB and stand-in upstream as loadtest.py,
+attaches --subscribers EventSource-like clients to /api/events and, while
+they are attached, drives --clients keep-alive clients over --paths.
+Admission control is off, as in loadtest.py.
+
+Under WSGI every /api/events request is answered at once and the client
+reconnects after the advertised retry interval. Under ASGI the stream stays
+open and new generations are pushed. The report has the request
+throughput and latency under that background load, how stale the data
+was when a subscriber learned about a new generation ("lag"), how many
+/api/events requests the subscribers made, and worker RSS.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from _common import ROOT, print_table, synthetic_fleet
+from loadtest import (
+    ADMISSION_OFF,
+    DEFAULT_PATHS,
+    drive,
+    free_port,
+    percentile,
+    rss_mb,
+    seed_db,
+    start_gunicorn,
+    start_upstream,
+    summarize,
+    wait_for_server,
+    worker_pids,
+)
+
+
+def start_uvicorn(port, workers, env):
+    cmd = [
+        sys.executable, "-m", "uvicorn",
+        "--workers", str(workers),
+        "--host", "127.0.0.1",
+        "--port", str(port),
+        "--log-level", "warning",
+        "asgi:app",
+    ]
+    return wait_for_server(subprocess.Popen(cmd, cwd=ROOT, env=env), port)
+
+
+async def subscribe(port, stop_at, stats):
+    """One EventSource-like client: follow /api/events until stop_at."""
+    last_id, retry = None, 3.0
+    while time.time() < stop_at:
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        except OSError:
+            stats["errors"] += 1
+            await asyncio.sleep(retry)
+            continue
+        stats["requests"] += 1
+        request = "GET /api/events HTTP/1.1\r\nHost: bench\r\nAccept: text/event-stream\r\n"
+        if last_id is not None:
+            request += "Last-Event-ID: {}\r\n".format(last_id)
+        writer.write((request + "Connection: close\r\n\r\n").encode())
+        try:
+            while time.time() < stop_at:
+                line = await asyncio.wait_for(reader.readline(), max(0.1, stop_at - time.time()))
+                if not line:
+                    break
+                line = line.decode().rstrip("\r\n")
+                if line.startswith("retry: "):
+                    retry = int(line[7:]) / 1000.0
+                elif line.startswith("data: "):
+                    event = json.loads(line[6:])
+                    if last_id is not None and event["generation"] > last_id and event["last_update"]:
+                        published = datetime.fromisoformat(event["last_update"]).timestamp()
+                        stats["lags"].append(time.time() - published)
+                    last_id = max(last_id or 0, event["generation"])
+        except asyncio.TimeoutError:
+            pass
+        except (OSError, ValueError):
+            stats["errors"] += 1
+        finally:
+            writer.close()
+        if time.time() < stop_at:
+            await asyncio.sleep(retry)
+
+
+def subscriber_process(port, count, duration, results):
+    stop_at = time.time() + duration
+    stats = {"requests": 0, "errors": 0, "lags": []}
+
+    async def run():
+        await asyncio.gather(*(subscribe(port, stop_at, stats) for _ in range(count)))
+
+    asyncio.run(run())
+    results.put(stats)
+
+
+def parse_servers(text):
+    servers = []
+    for item in text.split(","):
+        kind, _, shape = item.partition(":")
+        workers, _, threads = shape.partition("x")
+        servers.append((kind, int(workers or 1), int(threads or 1)))
+    return servers
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fleet", type=int, default=2000, help="synthetic fleet size")
+    parser.add_argument("--servers", default="wsgi:2x4,asgi:2", help="wsgi:WxT / asgi:W list")
+    parser.add_argument("--subscribers", type=int, default=500, help="idle /api/events clients")
+    parser.add_argument("--clients", type=int, default=16, help="active request clients")
+    parser.add_argument("--client-procs", type=int, default=min(4, os.cpu_count() or 1))
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds per server")
+    parser.add_argument("--paths", default=DEFAULT_PATHS, help="comma-separated paths")
+    parser.add_argument("--update-interval", type=int, default=5)
+    args = parser.parse_args()
+
+    paths = args.paths.split(",")
+    fleet = synthetic_fleet(args.fleet)
+    upstream = start_upstream(fleet)
+    api_url = "http://127.0.0.1:{}/api/orchestrators".format(upstream.server_address[1])
+
+    tmp = tempfile.mkdtemp(prefix="bench-asgi-")
+    seed = os.path.join(tmp, "seed.db")
+    seed_db(seed, fleet)
+
+    rows = []
+    try:
+        for kind, workers, threads in parse_servers(args.servers):
+            label = "{}:{}x{}".format(kind, workers, threads) if kind == "wsgi" else "{}:{}".format(kind, workers)
+            db_file = os.path.join(tmp, "{}.db".format(label.replace(":", "-")))
+            shutil.copy(seed, db_file)
+            env = dict(
+                os.environ,
+                DB_FILE=db_file,
+                API_URL=api_url,
+                UPDATE_INTERVAL=str(args.update_interval),
+                **ADMISSION_OFF
+            )
+            port = free_port()
+            if kind == "wsgi":
+                proc = start_gunicorn(port, workers, threads, env)
+            else:
+                proc = start_uvicorn(port, workers, env)
+            try:
+                results = multiprocessing.Queue()
+                subscribers = multiprocessing.Process(
+                    target=subscriber_process,
+                    args=(port, args.subscribers, args.duration + 2, results),
+                )
+                subscribers.start()
+                time.sleep(2)  # let the subscribers connect before measuring
+                samples = drive(port, paths, args.clients, args.client_procs, args.duration)
+                pids = worker_pids(proc.pid) or [proc.pid]
+                rss = [rss_mb(pid) for pid in pids]
+                sub_stats = results.get()
+                subscribers.join()
+            finally:
+                proc.send_signal(signal.SIGTERM)
+                proc.wait(timeout=30)
+
+            stats = summarize(samples, args.duration)
+            lags = sorted(sub_stats["lags"])
+            rows.append(
+                [
+                    label,
+                    "{:.0f}".format(stats["rps"]),
+                    "{:.1f}".format(stats["p50"]),
+                    "{:.1f}".format(stats["p99"]),
+                    stats["429"],
+                    stats["503"],
+                    stats["errors"],
+                    "{:.2f}".format(percentile(lags, 50)),
+                    "{:.2f}".format(percentile(lags, 95)),
+                    sub_stats["requests"],
+                    sub_stats["errors"],
+                    "{:.0f}".format(sum(rss)),
+                ]
+            )
+    finally:
+        upstream.shutdown()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    print(
+        "fleet={} subscribers={} clients={} duration={}s update_interval={}s".format(
+            args.fleet, args.subscribers, args.clients, args.duration, args.update_interval
+        )
+    )
+    print_table(
+        [
+            "server", "req/s", "p50 ms", "p99 ms", "429", "503", "errors",
+            "lag p50 s", "lag p95 s", "event reqs", "sub errors", "RSS MB",
+        ],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
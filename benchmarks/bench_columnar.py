@@ -0,0 +1,85 @@
+"""Per-poll processing: per-record loop vs. the NumPy columnar backend.
+
+    python benchmarks/bench_columnar.py [--sizes 1000,10000,100000]
+
+Each size gets a seeded history DB (three snapshots per address spread over
+the last 30 hours); every timed run starts from a fresh copy of it and
+processes one synthetic poll with process_fleet().
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from _common import print_table, synthetic_fleet
+
+import test_orchestrators as dashboard
+
+
+def seed_db(path, fleet, now):
+    dashboard.DB_FILE = path
+    dashboard.init_db()
+    rows = []
+    for o in fleet:
+        for hours, factor in ((30, 1.2), (12, 1.1), (2, 1.0)):
+            rows.append(
+                (o["address"], o["balance_eth"] * factor, (now - timedelta(hours=hours)).isoformat())
+            )
+    dashboard.save_balances(rows)
+    dashboard.get_db().close()
+    dashboard._db_local.conn = None
+
+
+def run_once(seed_path, work_path, fleet, now, backend):
+    shutil.copy(seed_path, work_path)
+    dashboard.DB_FILE = work_path
+    dashboard.COLUMNAR_BACKEND = backend
+    data = [dict(o) for o in fleet]
+    start = time.perf_counter()
+    dashboard.process_fleet(data, now=now)
+    elapsed = time.perf_counter() - start
+    dashboard.get_db().close()
+    dashboard._db_local.conn = None
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    import columnar
+
+    if not columnar.available():
+        raise SystemExit("NumPy is not installed; the columnar backend is unavailable")
+
+    now = datetime.now(timezone.utc)
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in [int(s) for s in args.sizes.split(",")]:
+            fleet = synthetic_fleet(size)
+            seed_path = os.path.join(tmp, "seed-{}.db".format(size))
+            work_path = os.path.join(tmp, "work.db")
+            seed_db(seed_path, fleet, now)
+            timings = {}
+            for backend in ("off", "auto"):
+                timings[backend] = min(
+                    run_once(seed_path, work_path, fleet, now, backend)
+                    for _ in range(args.repeat)
+                )
+            rows.append(
+                [
+                    size,
+                    "{:.1f}".format(timings["off"] * 1000),
+                    "{:.1f}".format(timings["auto"] * 1000),
+                    "{:.1f}x".format(timings["off"] / timings["auto"]),
+                ]
+            )
+    print_table(["orchestrators", "loop ms", "columnar ms", "speedup"], rows)
+
+
+if __name__ == "__main__":
+    main()
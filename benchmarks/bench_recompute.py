@@ -0,0 +1,97 @@
+"""Scaling of `manage.py recompute` (balance_hourly rebuild) with workers.
+
+    python benchmarks/bench_recompute.py [--addresses 20000] [--hours 25] [--workers 0,1,2,4]
+
+Builds a synthetic balance_history (change-only rows: a few balance changes
+per address per hour plus 6-hourly heartbeats), then rebuilds balance_hourly
+with recompute_rollups() for each worker count on a fresh copy of the DB.
+Workers 0 is the serial in-process path; every run must produce the same
+table (compared by SHA-256 of its dump).
+"""
+import argparse
+import hashlib
+import os
+import random
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from _common import print_table
+
+import test_orchestrators as dashboard
+
+
+def build_db(path, addresses, hours, seed=0):
+    rng = random.Random(seed)
+    dashboard.DB_FILE = path
+    dashboard.init_db()
+    start = dashboard.floor_hour(datetime.now(timezone.utc)) - timedelta(hours=hours)
+    rows = []
+    for i in range(addresses):
+        address = "0x{:040x}".format(rng.getrandbits(160))
+        balance = rng.uniform(0, 5)
+        minute = 0
+        while minute < hours * 60:
+            rows.append((address, round(balance, 8), (start + timedelta(minutes=minute)).isoformat()))
+            balance = max(0.0, balance - rng.random() / 100)
+            minute += rng.choice((7, 19, 23, 360))
+        if len(rows) > 200000:
+            dashboard.save_balances(rows)
+            rows = []
+    dashboard.save_balances(rows)
+    conn = dashboard.get_db()
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return start, conn.execute("SELECT COUNT(*) FROM balance_history").fetchone()[0]
+
+
+def table_digest():
+    digest = hashlib.sha256()
+    for line in dashboard.get_db().iterdump():
+        if line.startswith('INSERT INTO "balance_hourly"'):
+            digest.update(line.encode())
+    return digest.hexdigest()[:16]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--addresses", type=int, default=20000)
+    parser.add_argument("--hours", type=int, default=25)
+    parser.add_argument("--workers", default="0,1,2,4", help="comma-separated worker counts")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench-recompute-")
+    try:
+        seed = os.path.join(tmp, "seed.db")
+        started = time.perf_counter()
+        since, history_rows = build_db(seed, args.addresses, args.hours)
+        print(
+            "seeded {} history rows for {} addresses in {:.1f}s; {} CPUs".format(
+                history_rows, args.addresses, time.perf_counter() - started, os.cpu_count()
+            )
+        )
+        until = since + timedelta(hours=args.hours)
+
+        rows, baseline = [], None
+        for workers in (int(w) for w in args.workers.split(",")):
+            path = os.path.join(tmp, "w{}.db".format(workers))
+            shutil.copy(seed, path)
+            dashboard.DB_FILE = path
+            started = time.perf_counter()
+            written = dashboard.recompute_rollups(since=since, until=until, workers=workers)
+            elapsed = time.perf_counter() - started
+            baseline = baseline or elapsed
+            rows.append(
+                [workers, written, "{:.2f}".format(elapsed), "{:.2f}x".format(baseline / elapsed), table_digest()]
+            )
+            dashboard.get_db().close()
+            dashboard._db_local.conn = None
+            os.remove(path)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    print_table(["workers", "hourly rows", "seconds", "speedup", "table sha256"], rows)
+
+
+if __name__ == "__main__":
+    main()
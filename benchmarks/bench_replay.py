@@ -0,0 +1,114 @@
+"""Replay throughput: rebuild history from a recording of days of polls.
+
+    python benchmarks/bench_replay.py [--fleet 1000] [--days 2] [--interval 10] [--change-rate 0.02]
+    python benchmarks/bench_replay.py --record-dir path/to/recording
+
+Without --record-dir a synthetic recording is generated first: one poll per
+--interval seconds, where a poll changes some balances with probability
+--change-rate and is otherwise byte-identical to the previous one (as the
+upstream is between ticket redemptions). The recording is then replayed
+into a fresh DB with replay_log(), and for comparison the first --naive-polls
+polls are processed one by one like the live collector does.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from _common import print_table, synthetic_fleet
+
+import recording
+import test_orchestrators as dashboard
+
+
+def build_recording(directory, fleet_size, days, interval, change_rate, seed=0):
+    rng = random.Random(seed)
+    fleet = synthetic_fleet(fleet_size, seed=seed)
+    recorder = recording.Recorder(directory)
+    start = datetime.now(timezone.utc) - timedelta(days=days)
+    polls = int(days * 86400 // interval)
+    sha = None
+    for step in range(polls):
+        if sha is None or rng.random() < change_rate:
+            for o in rng.sample(fleet, max(1, fleet_size // 20)):
+                o["balance_eth"] = round(max(0.0, o["balance_eth"] - rng.random() / 100), 8)
+            sha = recorder.store(json.dumps({"orchestrators": fleet}).encode())
+        taken_at = (start + timedelta(seconds=step * interval)).isoformat()
+        recorder.append(taken_at, [{"name": "default", "sha": sha, "fetched_at": taken_at}])
+    return polls
+
+
+def fresh_db(path):
+    if os.path.exists(path):
+        os.remove(path)
+    dashboard.DB_FILE = path
+    dashboard.init_db()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--record-dir", help="replay an existing recording instead")
+    parser.add_argument("--fleet", type=int, default=1000)
+    parser.add_argument("--days", type=float, default=2.0)
+    parser.add_argument("--interval", type=int, default=10, help="seconds between polls")
+    parser.add_argument("--change-rate", type=float, default=0.02)
+    parser.add_argument("--naive-polls", type=int, default=200)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench-replay-")
+    try:
+        record_dir = args.record_dir
+        if record_dir is None:
+            record_dir = os.path.join(tmp, "recording")
+            started = time.perf_counter()
+            build_recording(record_dir, args.fleet, args.days, args.interval, args.change_rate)
+            print("generated recording in {:.1f}s".format(time.perf_counter() - started))
+        size = sum(
+            os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(record_dir) for f in files
+        )
+
+        rows = []
+        fresh_db(os.path.join(tmp, "replay.db"))
+        started = time.perf_counter()
+        stats = dashboard.replay_log(record_dir)
+        elapsed = time.perf_counter() - started
+        rows.append(
+            ["replay_log", stats["polls"], stats["processed"], "{:.2f}".format(elapsed),
+             "{:.0f}".format(stats["polls"] / elapsed)]
+        )
+
+        fresh_db(os.path.join(tmp, "naive.db"))
+        log = recording.Recording(record_dir)
+        count = 0
+        started = time.perf_counter()
+        for entry in log.entries():
+            if count == args.naive_polls:
+                break
+            now = datetime.fromisoformat(entry["t"])
+            data = dashboard.merge_sources(
+                [(s["name"], log.payload(s["sha"], dashboard.parse_payload)) for s in entry["sources"]]
+            )
+            dashboard.process_fleet(data, now=now)
+            dashboard.cleanup_old_records(now=now)
+            count += 1
+        elapsed = time.perf_counter() - started
+        rows.append(
+            ["every poll", count, count, "{:.2f}".format(elapsed), "{:.0f}".format(count / elapsed)]
+        )
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    print(
+        "recording: {:.1f} MB, backend: {}".format(
+            size / 1e6, "columnar" if dashboard.use_columnar() else "loop"
+        )
+    )
+    print_table(["mode", "polls", "processed", "seconds", "polls/s"], rows)
+
+
+if __name__ == "__main__":
+    main()
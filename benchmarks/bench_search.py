@@ -0,0 +1,86 @@
+"""Lookup and update cost of the /api/search index.
+
+    python benchmarks/bench_search.py [--size 100000] [--churn 0.01] [--repeat 200]
+
+Builds a SearchIndex over a synthetic fleet of --size records and times
+search() for ID and address prefixes, substrings inside IDs and addresses,
+queries that match nothing, and repeated-character queries whose trigrams
+are all common (the slowest case, every candidate has to be checked). It
+also times the full build and an incremental update() in which a --churn
+fraction of the fleet leaves and as many new nodes join. Lookups should
+stay well under a millisecond.
+"""
+import argparse
+import time
+
+from _common import measure, print_table, synthetic_fleet
+
+import search
+
+
+def queries(fleet):
+    a, b = fleet[len(fleet) // 3], fleet[2 * len(fleet) // 3]
+    return [
+        ("id prefix", a["orchestrator_id"][:8]),
+        ("full id", a["orchestrator_id"]),
+        ("address prefix", a["address"][:8]),
+        ("full address", a["address"]),
+        ("id substring", b["orchestrator_id"][-4:]),
+        ("address substring", b["address"][17:27]),
+        ("short prefix", "or"),
+        ("miss", "zz-top"),
+        ("address miss", "0xdeadbeefdeadbeef"),
+        ("common trigrams", "0000000"),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=100000)
+    parser.add_argument("--churn", type=float, default=0.01)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    fleet = synthetic_fleet(args.size)
+    index = search.SearchIndex()
+    started = time.perf_counter()
+    index.update(fleet, 1)
+    build = time.perf_counter() - started
+
+    changed = int(args.size * args.churn)
+    joined = synthetic_fleet(args.size + changed, seed=1)[args.size:]
+    next_fleet = fleet[changed:] + joined
+    started = time.perf_counter()
+    added, removed = index.update(next_fleet, 2)
+    update = time.perf_counter() - started
+    started = time.perf_counter()
+    index.update(next_fleet, 3)
+    unchanged = time.perf_counter() - started
+
+    stats = index.stats()
+    print(
+        "{} entries, {} trigrams, {} postings; build {:.2f}s, update (+{} -{}) {:.0f} ms, "
+        "unchanged update {:.0f} ms".format(
+            stats["entries"], stats["grams"], stats["postings"], build, added, removed,
+            update * 1000, unchanged * 1000,
+        )
+    )
+
+    rows = []
+    for label, query in queries(next_fleet):
+        median, best = measure(lambda: index.search(query), args.repeat)
+        matches, truncated = index.search(query)
+        rows.append(
+            [
+                label,
+                query if len(query) <= 24 else query[:21] + "...",
+                "{}{}".format(len(matches), "+" if truncated else ""),
+                "{:.1f}".format(best * 1e6),
+                "{:.1f}".format(median * 1e6),
+            ]
+        )
+    print_table(["query", "q", "results", "best us", "median us"], rows)
+
+
+if __name__ == "__main__":
+    main()
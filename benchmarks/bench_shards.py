@@ -0,0 +1,98 @@
+"""Per-poll history work with balance_history in one file vs. K shards.
+
+    python benchmarks/bench_shards.py [--fleet 20000] [--polls 150] [--shards 1,2,4,8]
+
+For each shard count a fresh DB is filled by --polls synthetic poll cycles,
+10 minutes apart, where --change-rate of the fleet changes balance. Each
+cycle runs the collector's history steps: the batched 24h-ago lookup, the
+bulk insert and the retention cleanup (all shards for one file, one shard
+per cycle when sharded). The table has the median milliseconds per step
+over the last half of the cycles, once history has reached its retention
+window, and the rows left afterwards. Shards run in parallel threads, so
+gains need more than one core.
+"""
+import argparse
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from _common import print_table
+
+import test_orchestrators as dashboard
+
+
+def run(path, shards, fleet, polls, change_rate, seed=0):
+    rng = random.Random(seed)
+    dashboard.configure(
+        dashboard.load_config({"DB_FILE": path, "HISTORY_SHARDS": shards, "HISTORY_RETENTION_HOURS": 25})
+    )
+    dashboard.init_db()
+    store = dashboard.get_history_store()
+    balances = {"0x{:040x}".format(rng.getrandbits(160)): rng.uniform(0, 5) for _ in range(fleet)}
+    addresses = list(balances)
+    start = datetime.now(timezone.utc) - timedelta(minutes=10 * polls)
+    timings = {"lookup": [], "insert": [], "cleanup": []}
+    for step in range(polls):
+        now = start + timedelta(minutes=10 * step)
+        changed = addresses if step == 0 else rng.sample(addresses, int(fleet * change_rate))
+        rows = []
+        for address in changed:
+            balances[address] = max(0.0, balances[address] - rng.random() / 100)
+            rows.append((address, round(balances[address], 8), now.isoformat()))
+
+        started = time.perf_counter()
+        dashboard.get_balances_24h_ago_all(now)
+        timings["lookup"].append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        dashboard.save_balances(rows)
+        timings["insert"].append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        dashboard.cleanup_old_records(now=now, shards=store.next_cleanup())
+        timings["cleanup"].append(time.perf_counter() - started)
+    store.close()
+    return {name: statistics.median(values[polls // 2:]) * 1000 for name, values in timings.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fleet", type=int, default=20000)
+    parser.add_argument("--polls", type=int, default=150, help="cycles, 10 minutes apart")
+    parser.add_argument("--change-rate", type=float, default=0.05)
+    parser.add_argument("--shards", default="1,2,4,8", help="comma-separated shard counts")
+    args = parser.parse_args()
+
+    rows = []
+    tmp = tempfile.mkdtemp(prefix="bench-shards-")
+    try:
+        for shards in (int(k) for k in args.shards.split(",")):
+            path = os.path.join(tmp, "k{}.db".format(shards))
+            started = time.perf_counter()
+            ms = run(path, shards, args.fleet, args.polls, args.change_rate)
+            elapsed = time.perf_counter() - started
+            rows.append(
+                [
+                    shards,
+                    "{:.1f}".format(ms["lookup"]),
+                    "{:.1f}".format(ms["insert"]),
+                    "{:.1f}".format(ms["cleanup"]),
+                    "{:.1f}".format(sum(ms.values())),
+                    dashboard.count_history(),
+                    "{:.1f}".format(elapsed),
+                ]
+            )
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    print("fleet={} polls={} change_rate={} cpus={}".format(
+        args.fleet, args.polls, args.change_rate, os.cpu_count()))
+    print_table(["shards", "lookup ms", "insert ms", "cleanup ms", "total ms", "rows", "run s"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Cost of the 24h sparkline column at fleet scale.
+
+    python benchmarks/bench_sparklines.py [--sizes 1000,5000,10000] [--repeat 5]
+
+Each size gets a DB with 24 hourly closes per address and a published
+fleet. The table has the time fleet_sparklines() takes per new generation
+(hourly closes already loaded) with the per-row loop and the columnar
+backend, the time to reload the closes when the hour turns (columnar), and
+the time to render the full /?view=table page with and without the
+sparkline column, building the paths included. Paths and page are built
+once per generation and then served from the cache.
+"""
+import argparse
+import os
+import random
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+from _common import measure, print_table, synthetic_fleet
+
+import test_orchestrators as dashboard
+
+
+def seed(path, fleet, now, seed=0):
+    rng = random.Random(seed)
+    dashboard.configure(dashboard.load_config({"DB_FILE": path}))
+    dashboard.init_db()
+    rows = []
+    end = dashboard.floor_hour(now)
+    for o in fleet:
+        balance = o["balance_eth"] + 1
+        for k in range(24):
+            balance = max(0.0, balance - rng.random() / 20)
+            hour = (end - timedelta(hours=24 - k)).isoformat()
+            rows.append((o["address"], hour, balance, balance, balance, balance, 1))
+        o["balance_change_24h"] = o["balance_eth"] - balance
+    conn = dashboard.get_db()
+    conn.executemany("INSERT INTO balance_hourly VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+    conn.commit()
+    dashboard.publish_fleet(fleet, taken_at=now)
+
+
+def build(backend, reload=False):
+    dashboard.COLUMNAR_BACKEND = backend
+    dashboard._sparkline_cache = (None, None)
+    if reload:
+        dashboard._sparkline_closes = (None, None, None)
+    dashboard.fleet_sparklines()
+
+
+def render(client, with_sparklines):
+    dashboard._page_cache = {}
+    if with_sparklines:
+        dashboard._sparkline_cache = (None, None)
+        dashboard.fleet_sparklines()
+    else:
+        dashboard._sparkline_cache = (dashboard.data_generation, {})
+    client.get("/?view=table")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,5000,10000")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    now = datetime.now(timezone.utc)
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        app = dashboard.create_app({"DB_FILE": os.path.join(tmp, "app.db")})
+        client = app.test_client()
+        for size in [int(s) for s in args.sizes.split(",")]:
+            fleet = synthetic_fleet(size)
+            seed(os.path.join(tmp, "spark-{}.db".format(size)), fleet, now)
+            loop, _ = measure(lambda: build("off"), args.repeat)
+            reload, _ = measure(lambda: build("auto", reload=True), args.repeat)
+            vector, _ = measure(lambda: build("auto"), args.repeat)
+            plain, _ = measure(lambda: render(client, False), args.repeat)
+            sparks, _ = measure(lambda: render(client, True), args.repeat)
+            page = client.get("/?view=table").data
+            rows.append(
+                [
+                    size,
+                    "{:.1f}".format(loop * 1000),
+                    "{:.1f}".format(vector * 1000),
+                    "{:.1f}".format(reload * 1000),
+                    "{:.1f}".format(plain * 1000),
+                    "{:.1f}".format(sparks * 1000),
+                    "{:+.0f}%".format((sparks / plain - 1) * 100),
+                    "{:.0f}".format(len(page) / 1024),
+                ]
+            )
+    print_table(
+        [
+            "orchestrators", "build loop ms", "build columnar ms", "hourly reload ms",
+            "page ms", "page+sparklines ms", "overhead", "page KB",
+        ],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Import, app-construction and first-request latency.
+
+    python benchmarks/bench_startup.py [--fleet 1000] [--repeat 5]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from _common import ROOT, print_table, synthetic_fleet
+
+IMPORT_SNIPPET = (
+    "import time; t = time.perf_counter(); import test_orchestrators; "
+    "print(time.perf_counter() - t)"
+)
+
+
+def time_import(repeat):
+    samples = []
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-c", IMPORT_SNIPPET],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        samples.append(float(out.strip()))
+    return sorted(samples)[len(samples) // 2]
+
+
+def time_first_requests(fleet_size):
+    import test_orchestrators as dashboard
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = os.path.join(tmp, "bench.db")
+        dashboard.DB_FILE = db_file
+        dashboard.init_db()
+        fleet = synthetic_fleet(fleet_size)
+        for o in fleet:
+            o["balance_change_24h"] = 0.0
+        dashboard.save_snapshot(fleet, "2024-01-01T00:00:00+00:00", 1)
+
+        start = time.perf_counter()
+        app = dashboard.create_app({"DB_FILE": db_file})
+        create_s = time.perf_counter() - start
+
+        client = app.test_client()
+        start = time.perf_counter()
+        client.get("/")
+        first_s = time.perf_counter() - start
+        start = time.perf_counter()
+        client.get("/")
+        warm_s = time.perf_counter() - start
+    return create_s, first_s, warm_s
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--fleet", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    import_s = time_import(args.repeat)
+    create_s, first_s, warm_s = time_first_requests(args.fleet)
+    print_table(
+        ["stage", "ms"],
+        [
+            ["import test_orchestrators", "{:.1f}".format(import_s * 1000)],
+            ["create_app (restore {} rows)".format(args.fleet), "{:.1f}".format(create_s * 1000)],
+            ["first GET /", "{:.1f}".format(first_s * 1000)],
+            ["second GET / (cached)", "{:.2f}".format(warm_s * 1000)],
+        ],
+    )
+
+
+if __name__ == "__main__":
+    main()
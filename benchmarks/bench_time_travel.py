@@ -0,0 +1,123 @@
+"""Response time of point-in-time fleet views (/?at=).
+
+    python benchmarks/bench_time_travel.py [--size 5000] [--weeks 3] [--interval 2] [--repeat 5]
+
+Seeds a fleet of --size addresses with a balance_history row every
+--interval hours for --weeks, a status change per address every few days
+and the matching balance_hourly rollups, then times fleet_as_of() (cold,
+the query plus building the records) and the /?at= table page and the
+columns API, cold and cached, for instants one hour, one week and
+(weeks - 1) weeks back. "raw" keeps the whole history in balance_history;
+"rollup" first thins it out to the default HISTORY_RETENTION_HOURS the way
+cleanup does, so older instants are answered from the hourly closes.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from _common import measure, print_table, synthetic_fleet
+
+import test_orchestrators as dashboard
+
+
+def seed(fleet, now, weeks, interval, seed=0):
+    rng = random.Random(seed)
+    start = dashboard.floor_hour(now) - timedelta(weeks=weeks)
+    steps = int(weeks * 7 * 24 / interval)
+    history, events = [], []
+    for o in fleet:
+        balance, status = o["balance_eth"] + 5, 0
+        for k in range(steps):
+            moment = (start + timedelta(hours=k * interval)).isoformat()
+            balance = max(0.0, balance - rng.random() / 50)
+            history.append((o["address"], balance, moment))
+            if k % 40 == 0:
+                events.append((o["address"], moment, status))
+                status = rng.randrange(3)
+    store = dashboard.get_history_store()
+    for shard, rows in store.split(history).items():
+        conn = store.connection(shard)
+        conn.executemany("INSERT INTO balance_history (address, balance, timestamp) VALUES (?, ?, ?)", rows)
+        conn.commit()
+    for shard, rows in store.split(events).items():
+        conn = store.connection(shard)
+        conn.executemany("INSERT INTO status_events VALUES (?, ?, ?)", rows)
+        conn.commit()
+    dashboard.roll_up_hours(now=now, since=start)
+    dashboard.publish_fleet(fleet, taken_at=now)
+    dashboard.save_poll_stats(now.isoformat(), {})  # instants before it are cached
+    return len(history)
+
+
+def cold(fn):
+    def run():
+        dashboard._as_of_cache = None
+        fn()
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=5000)
+    parser.add_argument("--weeks", type=int, default=3)
+    parser.add_argument("--interval", type=int, default=2, help="hours between history rows")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    now = datetime.now(timezone.utc)
+    ago = [("1h", timedelta(hours=1)), ("1w", timedelta(weeks=1)), ("{}w".format(args.weeks - 1), timedelta(weeks=args.weeks - 1))]
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        app = dashboard.create_app(
+            {
+                "DB_FILE": os.path.join(tmp, "history.db"),
+                "HISTORY_RETENTION_HOURS": args.weeks * 7 * 24 + 48,
+                "ROLLUP_RETENTION_DAYS": args.weeks * 7 + 2,
+            }
+        )
+        client = app.test_client()
+        started = time.perf_counter()
+        count = seed(synthetic_fleet(args.size), now, args.weeks, args.interval)
+        print("seeded {} history rows in {:.1f}s".format(count, time.perf_counter() - started))
+
+        for mode in ("raw", "rollup"):
+            if mode == "rollup":
+                dashboard.HISTORY_RETENTION_HOURS = 25
+                dashboard.cleanup_old_records(now=now)
+                print("thinned to {} history rows".format(dashboard.count_history()))
+            for label, delta in ago:
+                at = now - delta
+                value = at.isoformat()
+                page = {"at": value, "view": "table"}
+                columns = {"at": value, "format": "columns"}
+                query, _ = measure(cold(lambda: dashboard.fleet_as_of(at)), args.repeat)
+                page_cold, _ = measure(cold(lambda: client.get("/", query_string=page)), args.repeat)
+                page_hot, _ = measure(lambda: client.get("/", query_string=page), args.repeat)
+                api_cold, _ = measure(cold(lambda: client.get("/api/orchestrators", query_string=columns)), args.repeat)
+                api_hot, _ = measure(lambda: client.get("/api/orchestrators", query_string=columns), args.repeat)
+                rows.append(
+                    [
+                        mode,
+                        label,
+                        len(dashboard.fleet_as_of(at)),
+                        "{:.1f}".format(query * 1000),
+                        "{:.1f}".format(page_cold * 1000),
+                        "{:.1f}".format(page_hot * 1000),
+                        "{:.1f}".format(api_cold * 1000),
+                        "{:.1f}".format(api_hot * 1000),
+                    ]
+                )
+    print_table(
+        [
+            "history", "at", "orchestrators", "as-of query ms", "page cold ms",
+            "page cached ms", "api cold ms", "api cached ms",
+        ],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
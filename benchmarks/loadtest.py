@@ -0,0 +1,443 @@
+"""Load test the dashboard under gunicorn.
+
+    python benchmarks/loadtest.py --fleet 2000 --configs 1x1,3x1,2x4 --clients 32 --duration 15
+
+For every WORKERSxTHREADS configuration this script:
+
+1. serves a synthetic fleet from a stand-in upstream API on localhost,
+2. seeds a temporary DB (history + warm-start snapshot) of that fleet size,
+3. starts `gunicorn test_orchestrators:app` with the repo's gunicorn.conf.py
+   pointed at the stand-in API and the seeded DB,
+4. drives the paths in --paths from --clients keep-alive connections spread
+   over several client processes for --duration seconds,
+
+and prints throughput, p50/p95/p99 latency and RSS per worker. Admission
+control is switched off (ADMISSION_OFF) so the numbers show what the
+server can do rather than the limits; any 429 and 503 responses are
+counted in their own columns, not as served requests.
+
+    python benchmarks/loadtest.py --flood --configs 1x4 --clients 64 --duration 60 --update-interval 5
+
+--flood runs every configuration twice, with admission control switched
+off and with the defaults (see admission.py), against pages that mostly
+miss the caches (detail pages, as-of views) unless --paths is given, while
+a watcher follows
+/api/status. It prints the responses by status and the poll cadence under
+the flood: polls completed, the mean and largest gap between them (the
+schedule is --update-interval plus the cycle) and the median cycle time.
+"""
+import argparse
+import http.client
+import http.server
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from _common import ROOT, print_table, synthetic_fleet
+
+DEFAULT_PATHS = "/,/api/orchestrators?format=columns,/api/summary,/api/status"
+FLOOD_PATHS = "/,/?view=table,/api/orchestrators?format=columns,/api/summary"
+ADMISSION_OFF = {"ROUTE_CONCURRENCY": "0", "CLIENT_RATE": "0", "POLL_CONCURRENCY": "0"}
+SHED = (429, 503)  # turned away by admission control
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_upstream(fleet):
+    """Serve the fleet as the orchestrator API, with small balance drift."""
+    lock = threading.Lock()
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            with lock:
+                for o in random.sample(fleet, max(1, len(fleet) // 50)):
+                    o["balance_eth"] = round(max(0.0, o["balance_eth"] - random.random() / 1000), 8)
+                body = json.dumps({"orchestrators": fleet}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", free_port()), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def seed_db(db_file, fleet):
+    import test_orchestrators as dashboard
+
+    dashboard.DB_FILE = db_file
+    dashboard.init_db()
+    now = datetime.now(timezone.utc)
+    rows = []
+    for o in fleet:
+        rows.append((o["address"], o["balance_eth"] + 0.01, (now - timedelta(hours=30)).isoformat()))
+        rows.append((o["address"], o["balance_eth"], (now - timedelta(hours=3)).isoformat()))
+    dashboard.save_balances(rows)
+    data = [dict(o) for o in fleet]
+    dashboard.process_fleet(data, now=now)
+    dashboard.publish_fleet(data)
+    dashboard.get_db().close()
+    dashboard._db_local.conn = None
+
+
+def start_gunicorn(port, workers, threads, env):
+    cmd = [
+        sys.executable, "-m", "gunicorn",
+        "-c", os.path.join(ROOT, "gunicorn.conf.py"),
+        "-w", str(workers),
+        "--threads", str(threads),
+        "-b", "127.0.0.1:{}".format(port),
+        "--log-level", "warning",
+        "test_orchestrators:app",
+    ]
+    return wait_for_server(subprocess.Popen(cmd, cwd=ROOT, env=env), port)
+
+
+def wait_for_server(proc, port, timeout=30):
+    """Return proc once it answers /api/status on port; kill it otherwise."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            conn.request("GET", "/api/status")
+            if conn.getresponse().status == 200:
+                conn.close()
+                return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("server did not come up on port {}".format(port))
+
+
+def worker_pids(master_pid):
+    pids = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open("/proc/{}/stat".format(entry)) as fh:
+                fields = fh.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == master_pid:
+            pids.append(int(entry))
+    return pids
+
+
+def rss_mb(pid):
+    try:
+        with open("/proc/{}/status".format(pid)) as fh:
+            for line in fh:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    return 0.0
+
+
+def client_process(port, paths, threads, duration, results):
+    """Run `threads` keep-alive clients; put (path, seconds, status) samples on results.
+
+    Status is 0 for a failed connection.
+    """
+    stop_at = time.time() + duration
+    samples = []
+    lock = threading.Lock()
+
+    def run(seed):
+        rng = random.Random(seed)
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        local = []
+        while time.time() < stop_at:
+            path = rng.choice(paths)
+            start = time.perf_counter()
+            try:
+                conn.request("GET", path, headers={"Accept-Encoding": "gzip"})
+                response = conn.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException):
+                status = 0
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+            local.append((path, time.perf_counter() - start, status))
+        with lock:
+            samples.extend(local)
+
+    pool = [threading.Thread(target=run, args=(os.getpid() * 1000 + i,)) for i in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    results.put(samples)
+
+
+def drive(port, paths, clients, procs, duration):
+    procs = max(1, min(procs, clients))
+    results = multiprocessing.Queue()
+    per_proc = [clients // procs + (1 if i < clients % procs else 0) for i in range(procs)]
+    workers = [
+        multiprocessing.Process(target=client_process, args=(port, paths, n, duration, results))
+        for n in per_proc
+    ]
+    for w in workers:
+        w.start()
+    samples = []
+    for _ in workers:
+        samples.extend(results.get())
+    for w in workers:
+        w.join()
+    return samples
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return float("nan")
+    k = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+
+def ok(status):
+    """Served: not a failed connection, a server error or a shed request."""
+    return 0 < status < 500 and status not in SHED
+
+
+def error(status):
+    return not ok(status) and status not in SHED
+
+
+def summarize(samples, duration):
+    latencies = sorted(s[1] for s in samples if ok(s[2]))
+    statuses = [s[2] for s in samples]
+    return {
+        "rps": len(latencies) / duration,
+        "p50": percentile(latencies, 50) * 1000,
+        "p95": percentile(latencies, 95) * 1000,
+        "p99": percentile(latencies, 99) * 1000,
+        "429": statuses.count(429),
+        "503": statuses.count(503),
+        "errors": sum(1 for status in statuses if error(status)),
+    }
+
+
+def watch_polls(port, stop, polls, interval=0.25):
+    """Record {finished_at: cycle ms} of every poll /api/status reports until stop."""
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    while not stop.is_set():
+        try:
+            conn.request("GET", "/api/status")
+            last = json.loads(conn.getresponse().read()).get("last_poll")
+            if last:
+                polls[last["finished_at"]] = last["timings_ms"].get("total")
+        except (OSError, ValueError, http.client.HTTPException):
+            conn.close()
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        stop.wait(interval)
+    conn.close()
+
+
+def cadence(polls):
+    """(polls, mean gap s, max gap s, median cycle ms) from watch_polls()."""
+    stamps = sorted(datetime.fromisoformat(t) for t in polls)
+    gaps = [(b - a).total_seconds() for a, b in zip(stamps, stamps[1:])]
+    cycles = sorted(ms for ms in polls.values() if ms is not None)
+    return (
+        len(stamps),
+        sum(gaps) / len(gaps) if gaps else float("nan"),
+        max(gaps) if gaps else float("nan"),
+        percentile(cycles, 50),
+    )
+
+
+def flood_paths(fleet, count=200):
+    """Cached pages plus detail pages and as-of views that mostly miss the caches."""
+    rng = random.Random(1)
+    now = datetime.now(timezone.utc)
+    paths = FLOOD_PATHS.split(",")
+    paths += ["/orchestrator/" + o["address"] for o in rng.sample(fleet, min(count, len(fleet)))]
+    paths += [
+        "/api/orchestrators?at=" + (now - timedelta(minutes=rng.randint(1, 29 * 60))).strftime("%Y-%m-%dT%H:%M:%S")
+        for _ in range(count)
+    ]
+    return paths
+
+
+def flood(args, fleet, api_url, seed, tmp):
+    paths = args.paths.split(",") if args.paths != DEFAULT_PATHS else flood_paths(fleet)
+    rows = []
+    for workers, threads in parse_configs(args.configs):
+        for mode in ("off", "on"):
+            label = "{}x{}".format(workers, threads)
+            db_file = os.path.join(tmp, "{}-{}.db".format(label, mode))
+            shutil.copy(seed, db_file)
+            env = dict(
+                os.environ,
+                DB_FILE=db_file,
+                API_URL=api_url,
+                UPDATE_INTERVAL=str(args.update_interval),
+            )
+            if mode == "off":
+                env.update(ADMISSION_OFF)
+            port = free_port()
+            proc = start_gunicorn(port, workers, threads, env)
+            polls, stop = {}, threading.Event()
+            watcher = threading.Thread(target=watch_polls, args=(port, stop, polls))
+            watcher.start()
+            try:
+                samples = drive(port, paths, args.clients, args.client_procs, args.duration)
+            finally:
+                stop.set()
+                watcher.join()
+                proc.send_signal(signal.SIGTERM)
+                proc.wait(timeout=30)
+
+            statuses = [s[2] for s in samples]
+            served = sorted(s[1] for s in samples if 200 <= s[2] < 400)
+            count, mean_gap, max_gap, cycle_ms = cadence(polls)
+            rows.append(
+                [
+                    label,
+                    mode,
+                    "{:.0f}".format(len(served) / args.duration),
+                    statuses.count(429),
+                    statuses.count(503),
+                    sum(1 for s in statuses if error(s)),
+                    "{:.1f}".format(percentile(served, 50) * 1000),
+                    "{:.1f}".format(percentile(served, 99) * 1000),
+                    count,
+                    "{:.1f}".format(mean_gap),
+                    "{:.1f}".format(max_gap),
+                    "{:.0f}".format(cycle_ms),
+                ]
+            )
+    print("fleet={} clients={} duration={}s update_interval={}s".format(
+        args.fleet, args.clients, args.duration, args.update_interval))
+    print_table(
+        [
+            "config", "admission", "served/s", "429", "503", "errors", "p50 ms", "p99 ms",
+            "polls", "mean gap s", "max gap s", "cycle ms",
+        ],
+        rows,
+    )
+
+
+def parse_configs(text):
+    configs = []
+    for item in text.split(","):
+        workers, _, threads = item.partition("x")
+        configs.append((int(workers), int(threads or 1)))
+    return configs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fleet", type=int, default=2000, help="synthetic fleet size")
+    parser.add_argument("--configs", default="1x1,3x1,2x4", help="WORKERSxTHREADS list")
+    parser.add_argument("--clients", type=int, default=32, help="concurrent connections")
+    parser.add_argument("--client-procs", type=int, default=min(4, os.cpu_count() or 1))
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds per config")
+    parser.add_argument("--paths", default=DEFAULT_PATHS, help="comma-separated paths")
+    parser.add_argument("--update-interval", type=int, default=10)
+    parser.add_argument("--flood", action="store_true", help="compare poll cadence with admission control off/on")
+    args = parser.parse_args()
+
+    paths = args.paths.split(",")
+    fleet = synthetic_fleet(args.fleet)
+    upstream = start_upstream(fleet)
+    api_url = "http://127.0.0.1:{}/api/orchestrators".format(upstream.server_address[1])
+
+    tmp = tempfile.mkdtemp(prefix="loadtest-")
+    seed = os.path.join(tmp, "seed.db")
+    seed_db(seed, fleet)
+
+    if args.flood:
+        try:
+            flood(args, fleet, api_url, seed, tmp)
+        finally:
+            upstream.shutdown()
+            shutil.rmtree(tmp, ignore_errors=True)
+        return
+
+    overall, per_path = [], []
+    try:
+        for workers, threads in parse_configs(args.configs):
+            label = "{}x{}".format(workers, threads)
+            db_file = os.path.join(tmp, "{}.db".format(label))
+            shutil.copy(seed, db_file)
+            env = dict(
+                os.environ,
+                DB_FILE=db_file,
+                API_URL=api_url,
+                UPDATE_INTERVAL=str(args.update_interval),
+                **ADMISSION_OFF
+            )
+            port = free_port()
+            proc = start_gunicorn(port, workers, threads, env)
+            try:
+                samples = drive(port, paths, args.clients, args.client_procs, args.duration)
+                rss = [rss_mb(pid) for pid in worker_pids(proc.pid)]
+            finally:
+                proc.send_signal(signal.SIGTERM)
+                proc.wait(timeout=30)
+
+            stats = summarize(samples, args.duration)
+            overall.append(
+                [
+                    label,
+                    "{:.0f}".format(stats["rps"]),
+                    "{:.1f}".format(stats["p50"]),
+                    "{:.1f}".format(stats["p95"]),
+                    "{:.1f}".format(stats["p99"]),
+                    stats["429"],
+                    stats["503"],
+                    stats["errors"],
+                    " ".join("{:.0f}".format(r) for r in rss),
+                ]
+            )
+            for path in paths:
+                path_stats = summarize([s for s in samples if s[0] == path], args.duration)
+                per_path.append(
+                    [
+                        label,
+                        path,
+                        "{:.0f}".format(path_stats["rps"]),
+                        "{:.1f}".format(path_stats["p50"]),
+                        "{:.1f}".format(path_stats["p95"]),
+                        "{:.1f}".format(path_stats["p99"]),
+                    ]
+                )
+    finally:
+        upstream.shutdown()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    print("fleet={} clients={} duration={}s".format(args.fleet, args.clients, args.duration))
+    print_table(
+        ["config", "req/s", "p50 ms", "p95 ms", "p99 ms", "429", "503", "errors", "worker RSS MB"], overall
+    )
+    print()
+    print_table(["config", "path", "req/s", "p50 ms", "p95 ms", "p99 ms"], per_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Optional NumPy-backed columnar view of the fleet.
+
+A FleetFrame keeps one typed array per field of the current fleet, aligned
+with the list of records it was built from, so 24h deltas, drain
+projections, aggregates and filters are single vectorized operations
+instead of Python loops over dicts. Everything here is optional: when
+NumPy is not installed `available()` is False and callers fall back to the
+per-record code in test_orchestrators.
+"""
+import math
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised when NumPy is absent
+    np = None
+
+
+def available():
+    return np is not None
+
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class FleetFrame:
+    """Columnar view of a list of orchestrator records.
+
+    Arrays are indexed by position in `records`; `index` maps an address
+    back to its position.
+    """
+
+    def __init__(self, records):
+        n = len(records)
+        self.records = records
+        self.addresses = [o.get("address", "") for o in records]
+        self.index = {addr: i for i, addr in enumerate(self.addresses)}
+        self.balance = np.fromiter(
+            (_float(o.get("balance_eth", 0.0)) for o in records), np.float64, n
+        )
+        self.healthy = np.fromiter(
+            (bool(o.get("last_healthy_at")) for o in records), np.bool_, n
+        )
+        self.eligible = np.fromiter(
+            (o.get("eligible_for_payments") is True for o in records), np.bool_, n
+        )
+        self.cooldown = np.fromiter(
+            (bool(o.get("cooldown_active")) for o in records), np.bool_, n
+        )
+        self.top_100 = np.fromiter(
+            (o.get("is_top_100") is True for o in records), np.bool_, n
+        )
+        # Already-processed records carry their change; fresh ones start at 0.
+        self.change_24h = np.fromiter(
+            (_float(o.get("balance_change_24h", 0.0)) for o in records), np.float64, n
+        )
+
+    def __len__(self):
+        return len(self.records)
+
+    def align(self, mapping, default=math.nan):
+        """Return mapping[address] for every row as a float array."""
+        get = mapping.get
+        return np.fromiter(
+            (get(addr, default) for addr in self.addresses), np.float64, len(self)
+        )
+
+    def align_text(self, mapping, default=""):
+        """Return mapping[address] for every row as a fixed-width string array.
+
+        ISO-8601 timestamps in one format compare correctly as strings, so
+        the result can be compared against a cutoff directly.
+        """
+        get = mapping.get
+        return np.array([get(addr, default) or default for addr in self.addresses], dtype=str)
+
+    def compute_deltas(self, previous):
+        """Set change_24h from an aligned array of earlier balances (NaN = none)."""
+        self.change_24h = np.where(np.isnan(previous), 0.0, self.balance - previous)
+        return self.change_24h
+
+    def drain_hours(self):
+        """Hours until the balance reaches zero at the last 24h burn rate.
+
+        NaN for nodes whose balance did not go down.
+        """
+        burn_per_hour = -self.change_24h / 24.0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(burn_per_hour > 0, self.balance / burn_per_hour, math.nan)
+
+    def status_codes(self):
+        """0 = Active, 1 = Cooldown, 2 = Inactive (see STATUS_LABELS)."""
+        return np.where(
+            self.eligible & ~self.cooldown, 0, np.where(self.cooldown, 1, 2)
+        ).astype(np.int8)
+
+    def summary(self, drain_warning_hours=24.0):
+        drain = self.drain_hours()
+        draining = ~np.isnan(drain)
+        return {
+            "total": len(self),
+            "healthy": int(self.healthy.sum()),
+            "eligible": int(self.eligible.sum()),
+            "top_100": int(self.top_100.sum()),
+            "total_balance_eth": float(self.balance.sum()),
+            "total_change_24h": float(self.change_24h.sum()),
+            "draining": int(draining.sum()),
+            "draining_soon": int((draining & (drain < drain_warning_hours)).sum()),
+        }
+
+    def select(self, mask):
+        """Return the records where the boolean mask is set."""
+        return [self.records[i] for i in np.flatnonzero(mask)]
+
+
+def sparkline_paths(values, height=16):
+    """SVG path data for each row of a (rows, points) balance matrix.
+
+    NaN marks hours without data. Points are 2 units apart; each row is
+    scaled to its own min/max so the shape shows, with a 1 unit margin,
+    and a flat row is drawn mid-height. Matches
+    test_orchestrators.sparkline_path() point for point.
+    """
+    rows, points = values.shape
+    if not rows:
+        return []
+    missing = np.isnan(values)
+    with np.errstate(invalid="ignore"):
+        low = np.nanmin(np.where(missing, np.inf, values), axis=1, keepdims=True)
+        high = np.nanmax(np.where(missing, -np.inf, values), axis=1, keepdims=True)
+        span = high - low
+        scaled = np.where(
+            span > 0, 1 + (high - values) / np.where(span > 0, span, 1) * (height - 2), height / 2
+        )
+    y = np.rint(np.where(missing, -1, scaled)).astype(np.int64)
+    # One pre-formatted "x y" token per (point, y) pair; a path joins tokens.
+    tokens = [
+        ["{} {}".format(2 * x, level) for level in range(height + 1)] for x in range(points)
+    ]
+    paths = []
+    for row in y.tolist():
+        parts = [tokens[x][level] for x, level in enumerate(row) if level >= 0]
+        paths.append("M" + "L".join(parts) if parts else "")
+    return paths
@@ -0,0 +1,14 @@
+# Picked up automatically when gunicorn is started from the project
+# directory, e.g. `gunicorn -w 3 -b 127.0.0.1:5000 test_orchestrators:app`.
+#
+# With preload the app (compiled template, restored snapshot) is built once
+# in the master and shared copy-on-write with the workers. Threads do not
+# survive fork, so the collector is started per worker in post_fork; only
+# one worker wins the collector lock and polls the upstream API.
+preload_app = True
+
+
+def post_fork(server, worker):
+    import test_orchestrators
+
+    test_orchestrators.start_collector()
@@ -0,0 +1,176 @@
+"""Maintenance commands for the dashboard database.
+
+    python manage.py replay RECORD_DIR [--db orchestrators.db] [--fresh] [--until ISO]
+    python manage.py recompute [--db orchestrators.db] [--workers N] [--shards N] [--since ISO] [--until ISO] [--restart]
+    python manage.py export [--table history|hourly] [--address ADDR] [--since ISO] [--until ISO] [--output FILE]
+    python manage.py reshard --shards K [--db orchestrators.db] [--drop-source]
+
+Configuration (DB_FILE, HISTORY_SHARDS, SNAPSHOT_POLICY, ...) is read from the environment
+and .env like the app itself; --db overrides DB_FILE.
+"""
+import argparse
+import csv
+import logging
+import sys
+import time
+from datetime import datetime, timezone
+
+import test_orchestrators as dashboard
+
+
+def setup(args):
+    overrides = {"RECORD_DIR": ""}
+    if args.db:
+        overrides["DB_FILE"] = args.db
+    dashboard.configure(dashboard.load_config(overrides))
+    dashboard.init_db()
+
+
+def cmd_replay(args):
+    """Rebuild balance_history and the served snapshot from a recording."""
+    setup(args)
+    existing = dashboard.count_history()
+    if existing and not args.fresh:
+        sys.exit(
+            "{} already has {} balance rows; pass --fresh to replace them".format(
+                dashboard.DB_FILE, existing
+            )
+        )
+    if args.fresh:
+        dashboard.clear_history()
+        conn = dashboard.get_db()
+        conn.execute("DELETE FROM fleet_snapshot")
+        conn.commit()
+
+    until = parse_time(args.until)
+    started = time.perf_counter()
+    stats = dashboard.replay_log(args.record_dir, until=until)
+    elapsed = time.perf_counter() - started
+    print(
+        "Replayed {polls} polls ({processed} processed, {skipped} unchanged) "
+        "in {elapsed:.2f}s into {db}: {rows} balance rows".format(
+            elapsed=elapsed, db=dashboard.DB_FILE, rows=dashboard.count_history(), **stats
+        )
+    )
+
+
+def parse_time(value):
+    if not value:
+        return None
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment
+
+
+def cmd_recompute(args):
+    """Rebuild balance_hourly from balance_history on a process pool."""
+    setup(args)
+    started = time.perf_counter()
+
+    def progress(done, total, rows):
+        elapsed = time.perf_counter() - started
+        sys.stderr.write(
+            "\rshard {}/{}  {} rows  {:.1f}s".format(done, total, rows, elapsed)
+        )
+        sys.stderr.flush()
+
+    rows = dashboard.recompute_rollups(
+        since=dashboard.floor_hour(parse_time(args.since)) if args.since else None,
+        until=dashboard.floor_hour(parse_time(args.until)) if args.until else None,
+        workers=args.workers,
+        shards=args.shards,
+        restart=args.restart,
+        progress=progress,
+    )
+    sys.stderr.write("\n")
+    print(
+        "Recomputed {} hourly rows in {:.2f}s".format(rows, time.perf_counter() - started)
+    )
+
+
+def cmd_export(args):
+    """Write balance history or hourly rollups as CSV, across shards."""
+    setup(args)
+    if args.table == "hourly":
+        header = ["address", "hour", "open", "high", "low", "close", "samples"]
+        rows = dashboard.iter_hourly(args.address, parse_time(args.since), parse_time(args.until))
+    else:
+        header = ["address", "balance", "timestamp"]
+        rows = dashboard.iter_history(args.address, parse_time(args.since), parse_time(args.until))
+    out = open(args.output, "w", newline="") if args.output else sys.stdout
+    try:
+        writer = csv.writer(out)
+        writer.writerow(header)
+        writer.writerows(rows)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+def cmd_reshard(args):
+    """Copy history into a different number of shard files."""
+    setup(args)
+    target = max(1, args.shards)
+
+    def progress(table, copied):
+        sys.stderr.write("\r{}: {} rows".format(table, copied))
+        sys.stderr.flush()
+
+    started = time.perf_counter()
+    try:
+        copied = dashboard.reshard_history(target, drop_source=args.drop_source, progress=progress)
+    except ValueError as exc:
+        sys.exit(str(exc))
+    sys.stderr.write("\n")
+    print(
+        "Copied {} balance rows and {} hourly rows into {} shard(s) in {:.2f}s; "
+        "set HISTORY_SHARDS={} before restarting the dashboard".format(
+            copied["balance_history"], copied["balance_hourly"], target,
+            time.perf_counter() - started, target if target > 1 else 0,
+        )
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    replay = commands.add_parser("replay", help=cmd_replay.__doc__)
+    replay.add_argument("record_dir", help="directory written with RECORD_DIR set")
+    replay.add_argument("--db", help="database to rebuild (default: DB_FILE)")
+    replay.add_argument("--fresh", action="store_true", help="clear existing history first")
+    replay.add_argument("--until", help="stop after the poll at this ISO 8601 time")
+    replay.set_defaults(func=cmd_replay)
+
+    recompute = commands.add_parser("recompute", help=cmd_recompute.__doc__)
+    recompute.add_argument("--db", help="database to update (default: DB_FILE)")
+    recompute.add_argument("--workers", type=int, help="processes (default: CPU count, 0: serial)")
+    recompute.add_argument("--shards", type=int, help="address ranges (default: 4 per worker)")
+    recompute.add_argument("--since", help="first hour (default: oldest complete hour)")
+    recompute.add_argument("--until", help="end hour, exclusive (default: current hour)")
+    recompute.add_argument("--restart", action="store_true", help="ignore an interrupted run")
+    recompute.set_defaults(func=cmd_recompute)
+
+    export = commands.add_parser("export", help=cmd_export.__doc__)
+    export.add_argument("--db", help="database to read (default: DB_FILE)")
+    export.add_argument("--table", choices=["history", "hourly"], default="history")
+    export.add_argument("--address", help="only this address")
+    export.add_argument("--since", help="first timestamp/hour, inclusive")
+    export.add_argument("--until", help="last timestamp/hour, exclusive")
+    export.add_argument("--output", help="CSV file (default: stdout)")
+    export.set_defaults(func=cmd_export)
+
+    reshard = commands.add_parser("reshard", help=cmd_reshard.__doc__)
+    reshard.add_argument("--db", help="database to reshard (default: DB_FILE)")
+    reshard.add_argument("--shards", type=int, required=True, help="target shard count (1: single file)")
+    reshard.add_argument("--drop-source", action="store_true", help="remove the old rows afterwards")
+    reshard.set_defaults(func=cmd_reshard)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""Opt-in profiling and always-on stage timings for poll cycles and requests.
+
+Stage timings: poll_once() runs inside record_timings() and wraps each stage
+in span("fetch"), span("persist"), ...; the per-stage seconds end up in the
+dict that record_timings() yields. Inside a trace (see tracing.py) each
+span() is also a child span carrying its attributes. Outside both span()
+does nothing beyond two thread-local lookups.
+
+Profiles: Profiler.arm("poll", 3) makes the next three poll cycles run under
+cProfile (.pstats, open with `python -m pstats`) or a stack sampler
+(.collapsed, one "frame;frame;frame count" line per stack, ready for
+flamegraph.pl or speedscope). Work handed to other threads through
+Profiler.wrap() (the source fetches, the per-shard queries) is profiled
+too and lands in the same file. An unarmed profiler costs one dict lookup.
+"""
+import collections
+import cProfile
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import tracing
+
+PROFILE_MODES = ("cprofile", "sample")
+
+_local = threading.local()
+
+
+@contextmanager
+def record_timings():
+    """Collect span() timings made on this thread into the yielded dict."""
+    timings = {}
+    previous = getattr(_local, "timings", None)
+    _local.timings = timings
+    try:
+        yield timings
+    finally:
+        _local.timings = previous
+
+
+@contextmanager
+def span(name, **attributes):
+    """Time a named stage of the current recording (no-op without one).
+
+    Also a child span of the current trace, if any; the yielded span takes
+    attributes known only at the end with .set(key=value).
+    """
+    timings = getattr(_local, "timings", None)
+    child = tracing.start_span(name, attributes)
+    if timings is None and child is None:
+        yield tracing.NOOP
+        return
+    start = time.perf_counter()
+    try:
+        yield child or tracing.NOOP
+    except BaseException as exc:
+        if child is not None:
+            child.error(exc)
+        raise
+    finally:
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+        if child is not None:
+            tracing.end_span(child)
+
+
+def add_timing(name, seconds):
+    """Add time measured elsewhere (e.g. accumulated in a loop) to a stage."""
+    timings = getattr(_local, "timings", None)
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+class _StackSampler:
+    """Samples some threads' stacks at a fixed interval into collapsed stacks."""
+
+    def __init__(self, thread_id, interval=0.005):
+        self.thread_ids = {thread_id}
+        self.interval = interval
+        self.counts = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def add_thread(self, thread_id):
+        self.thread_ids = self.thread_ids | {thread_id}
+
+    def remove_thread(self, thread_id):
+        self.thread_ids = self.thread_ids - {thread_id}
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for thread_id in self.thread_ids:
+                frame = frames.get(thread_id)
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(
+                        "{} ({}:{})".format(
+                            code.co_name, os.path.basename(code.co_filename), code.co_firstlineno
+                        )
+                    )
+                    frame = frame.f_back
+                if stack:
+                    self.counts[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def dump(self, path):
+        with open(path, "w") as fh:
+            for stack, count in self.counts.most_common():
+                fh.write("{} {}\n".format(stack, count))
+
+
+class _Run:
+    """One profile in progress: the thread that started it plus its helpers."""
+
+    def __init__(self, kind, seq, profiler):
+        self.kind = kind
+        self.seq = seq
+        self.profiler = profiler
+        self.workers = []  # finished cProfile.Profile of helper threads
+        self.done = False
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def follow(self):
+        """Profile the calling thread as part of this run until the block ends."""
+        ident = threading.get_ident()
+        if isinstance(self.profiler, _StackSampler):
+            self.profiler.add_thread(ident)
+            try:
+                yield
+            finally:
+                self.profiler.remove_thread(ident)
+            return
+        worker = cProfile.Profile()
+        try:
+            worker.enable()
+        except ValueError:
+            # Python 3.12+ allows one profiler per process, and the run's
+            # own profiler already sees every thread.
+            worker = None
+        try:
+            yield
+        finally:
+            if worker is not None:
+                worker.disable()
+                with self.lock:
+                    if not self.done:  # a helper outliving the run is left out
+                        self.workers.append(worker)
+
+
+def check_arm(kind, mode=None):
+    """Raise ValueError unless Profiler.arm() accepts kind and mode."""
+    if kind not in ("poll", "request"):
+        raise ValueError("kind must be 'poll' or 'request'")
+    if mode is not None and mode not in PROFILE_MODES:
+        raise ValueError("mode must be one of {}".format(", ".join(PROFILE_MODES)))
+
+
+class Profiler:
+    """Profiles the next N poll cycles or requests, writing one file each."""
+
+    def __init__(self, directory="profiles", mode="cprofile"):
+        self.directory = directory
+        self.mode = mode
+        self.remaining = {"poll": 0, "request": 0}
+        self.written = []
+        self._lock = threading.Lock()
+        # cProfile allows one active profiler per process on newer Pythons,
+        # so concurrent requests are profiled one at a time.
+        self._active = threading.Lock()
+        self._seq = 0
+
+    def arm(self, kind, count, directory=None, mode=None):
+        check_arm(kind, mode)
+        with self._lock:
+            self.remaining[kind] = max(0, int(count))
+            if directory:
+                self.directory = directory
+            if mode:
+                self.mode = mode
+
+    def status(self):
+        with self._lock:
+            return {
+                "directory": self.directory,
+                "mode": self.mode,
+                "remaining": dict(self.remaining),
+                "written": list(self.written[-20:]),
+            }
+
+    def _claim(self, kind):
+        if not self.remaining[kind]:
+            return False
+        if not self._active.acquire(blocking=False):
+            return False
+        with self._lock:
+            if self.remaining[kind] <= 0:
+                self._active.release()
+                return False
+            self.remaining[kind] -= 1
+            self._seq += 1
+            return True
+
+    def start(self, kind):
+        """Start profiling the current thread if armed; returns a token or None."""
+        if not self._claim(kind):
+            return None
+        if self.mode == "sample":
+            profiler = _StackSampler(threading.get_ident())
+            profiler.start()
+        else:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        run = _Run(kind, self._seq, profiler)
+        _local.run = run
+        return run
+
+    def wrap(self, fn):
+        """fn bound to this thread's running profile, for another thread.
+
+        Returns fn itself when nothing is being profiled.
+        """
+        run = getattr(_local, "run", None)
+        if run is None:
+            return fn
+
+        def profiled(*args, **kwargs):
+            with run.follow():
+                return fn(*args, **kwargs)
+
+        return profiled
+
+    def stop(self, token, label=""):
+        """Stop a profile started by start() and write it out."""
+        if token is None:
+            return None
+        if getattr(_local, "run", None) is token:
+            _local.run = None
+        kind, seq, profiler = token.kind, token.seq, token.profiler
+        with token.lock:
+            token.done = True
+            workers = list(token.workers)
+        try:
+            if isinstance(profiler, _StackSampler):
+                profiler.stop()
+                ext = "collapsed"
+            else:
+                profiler.disable()
+                ext = "pstats"
+            os.makedirs(self.directory, exist_ok=True)
+            stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+            slug = "".join(c if c.isalnum() else "_" for c in label).strip("_")
+            name = "{}-{}-{}-{}{}.{}".format(
+                kind, stamp, os.getpid(), seq, "-" + slug if slug else "", ext
+            )
+            path = os.path.join(self.directory, name)
+            if ext == "collapsed":
+                profiler.dump(path)
+            elif workers:
+                stats = pstats.Stats(profiler)
+                for worker in workers:
+                    stats.add(worker)
+                stats.dump_stats(path)
+            else:
+                profiler.dump_stats(path)
+            with self._lock:
+                self.written.append(path)
+            logging.info("Wrote %s profile to %s", kind, path)
+            return path
+        except Exception:
+            logging.exception("Error writing %s profile", kind)
+            return None
+        finally:
+            self._active.release()
+
+    @contextmanager
+    def profile(self, kind, label=""):
+        token = self.start(kind)
+        try:
+            yield
+        finally:
+            self.stop(token, label)
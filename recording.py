@@ -0,0 +1,99 @@
+"""Append-only recording of raw upstream payloads, for replay.
+
+A recording directory holds:
+
+    blobs/ab/<sha256>.json.gz   one gzip file per distinct payload
+    index.jsonl.gz              one JSON line per published poll cycle
+
+Payloads are content-addressed by the SHA-256 of the raw response body, so
+a response identical to an earlier one costs only an index line. Each index
+line is appended as its own gzip member, which gzip readers treat as one
+stream; a line cut short by a crash ends the log instead of corrupting it.
+
+Index line: {"t": poll time (ISO 8601), "sources": [{"name", "sha",
+"fetched_at"}, ...]}, listing the payload each source contributed to that
+poll cycle's merge.
+"""
+import collections
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import zlib
+
+INDEX_FILE = "index.jsonl.gz"
+
+
+class Recorder:
+    """Writes payload blobs and index lines under `directory`."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(directory, "blobs"), exist_ok=True)
+
+    def blob_path(self, sha):
+        return os.path.join(self.directory, "blobs", sha[:2], sha + ".json.gz")
+
+    def store(self, raw):
+        """Store a raw payload unless already present; return its sha."""
+        sha = hashlib.sha256(raw).hexdigest()
+        path = self.blob_path(sha)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = "{}.{}.{}.tmp".format(path, os.getpid(), threading.get_ident())
+            with gzip.open(tmp, "wb", compresslevel=6) as fh:
+                fh.write(raw)
+            os.replace(tmp, path)
+        return sha
+
+    def append(self, taken_at, sources):
+        """Append one poll cycle: [{"name", "sha", "fetched_at"}, ...]."""
+        line = json.dumps({"t": taken_at, "sources": sources}, separators=(",", ":"))
+        with self._lock:
+            with gzip.open(os.path.join(self.directory, INDEX_FILE), "ab") as fh:
+                fh.write(line.encode("utf-8") + b"\n")
+
+
+class Recording:
+    """Read side of a recording directory."""
+
+    def __init__(self, directory, cache_size=8):
+        self.directory = directory
+        self._payloads = collections.OrderedDict()
+        self._cache_size = cache_size
+
+    def entries(self):
+        """Yield index entries in the order they were recorded."""
+        path = os.path.join(self.directory, INDEX_FILE)
+        if not os.path.exists(path):
+            return
+        with gzip.open(path, "rt", encoding="utf-8") as fh:
+            try:
+                for line in fh:
+                    if line.endswith("\n"):
+                        yield json.loads(line)
+            except (EOFError, zlib.error, gzip.BadGzipFile):
+                logging.warning("Recording %s ends in a truncated entry", path)
+
+    def raw(self, sha):
+        path = os.path.join(self.directory, "blobs", sha[:2], sha + ".json.gz")
+        with gzip.open(path, "rb") as fh:
+            return fh.read()
+
+    def payload(self, sha, parse):
+        """parse(raw) for a blob, memoized for the most recent blobs.
+
+        Callers must not mutate the result; merge_sources() copies records.
+        """
+        data = self._payloads.get(sha)
+        if data is None:
+            data = parse(self.raw(sha))
+            self._payloads[sha] = data
+            if len(self._payloads) > self._cache_size:
+                self._payloads.popitem(last=False)
+        else:
+            self._payloads.move_to_end(sha)
+        return data
@@ -0,0 +1,186 @@
+"""Prefix and substring search over orchestrator IDs and addresses.
+
+SearchIndex keeps two lowercased keys per record (orchestrator_id and the
+full address) in a sorted list, so a prefix lookup is a bisect plus a walk
+over the matching run. Substrings of at least GRAM characters go through a
+trigram index: every trigram of every key maps to the ascending slots of
+the records containing it. A query's candidates are the shortest posting
+list among its trigrams, each checked with `in`, and the walk stops as
+soon as `limit` + 1 matches are found.
+
+update() is incremental: records that appeared, disappeared or changed
+their ID are inserted into or removed from the sorted keys with bisect,
+and new slots are appended to the postings. Removed slots are only marked
+dead (postings skip them) until they outnumber the live ones, at which
+point, or when most of the fleet changed at once, the index is rebuilt.
+Searches keep running against the previous state while update() works
+out the changes or rebuilds; they only wait for the changes to be applied
+or the rebuilt index to be swapped in.
+"""
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+
+GRAM = 3
+_EMPTY = array("I")
+
+
+def _grams(key):
+    return {key[i:i + GRAM] for i in range(len(key) - GRAM + 1)}
+
+
+def _keys(entry):
+    _, _, id_key, address_key = entry
+    return (id_key, address_key) if id_key and id_key != address_key else (address_key,)
+
+
+class SearchIndex:
+    def __init__(self):
+        self.generation = None
+        self._lock = threading.Lock()  # held by searches and while changing the index
+        self._update_lock = threading.Lock()  # one update() at a time
+        self._clear()
+
+    def _clear(self):
+        self._entries = []  # slot -> (orchestrator_id, address, id key, address key) or None
+        self._slots = {}  # address key -> slot
+        self._keys = []  # sorted lowercased keys
+        self._key_slots = []  # slot of each key in _keys
+        self._postings = {}  # trigram -> array of slots, ascending
+        self._dead = 0
+
+    def __len__(self):
+        return len(self._slots)
+
+    def update(self, records, generation=None):
+        """Bring the index in line with `records`; return (added, removed)."""
+        wanted = {}
+        for o in records:
+            address = str(o.get("address") or "")
+            orchestrator_id = str(o.get("orchestrator_id") or "")
+            if address:
+                key = address.lower()
+                wanted[key] = (orchestrator_id, address, orchestrator_id.lower(), key)
+        with self._update_lock:
+            # Only update() changes the index, so it can be read unlocked here.
+            removed = [
+                slot
+                for key, slot in self._slots.items()
+                if self._entries[slot] != wanted.get(key)
+            ]
+            added = [
+                entry
+                for key, entry in wanted.items()
+                if key not in self._slots or self._entries[self._slots[key]] != entry
+            ]
+            if len(removed) + len(added) > max(64, len(wanted) // 4) or \
+                    self._dead + len(removed) > len(wanted):
+                fresh = SearchIndex()
+                fresh._build(wanted.values())
+                with self._lock:
+                    for name in ("_entries", "_slots", "_keys", "_key_slots", "_postings", "_dead"):
+                        setattr(self, name, getattr(fresh, name))
+                    self.generation = generation
+            else:
+                with self._lock:
+                    for slot in removed:
+                        self._remove(slot)
+                    for entry in added:
+                        self._add(entry)
+                    self.generation = generation
+        return len(added), len(removed)
+
+    def _build(self, entries):
+        pairs = []
+        postings = defaultdict(list)
+        for slot, entry in enumerate(entries):
+            self._entries.append(entry)
+            self._slots[entry[3]] = slot
+            keys = _keys(entry)
+            grams = set()
+            for key in keys:
+                pairs.append((key, slot))
+                grams.update(key[i:i + GRAM] for i in range(len(key) - GRAM + 1))
+            for gram in grams:
+                postings[gram].append(slot)
+        pairs.sort()
+        self._keys = [key for key, _ in pairs]
+        self._key_slots = [slot for _, slot in pairs]
+        self._postings = {gram: array("I", slots) for gram, slots in postings.items()}
+
+    def _post(self, entry, slot):
+        grams = set()
+        for key in _keys(entry):
+            grams |= _grams(key)
+        postings = self._postings
+        for gram in grams:
+            posting = postings.get(gram)
+            if posting is None:
+                posting = postings[gram] = array("I")
+            posting.append(slot)
+
+    def _add(self, entry):
+        slot = len(self._entries)
+        self._entries.append(entry)
+        self._slots[entry[3]] = slot
+        for key in _keys(entry):
+            i = bisect_right(self._keys, key)
+            self._keys.insert(i, key)
+            self._key_slots.insert(i, slot)
+        self._post(entry, slot)
+
+    def _remove(self, slot):
+        entry = self._entries[slot]
+        for key in _keys(entry):
+            i = bisect_left(self._keys, key)
+            while self._key_slots[i] != slot:
+                i += 1
+            del self._keys[i]
+            del self._key_slots[i]
+        del self._slots[entry[3]]
+        self._entries[slot] = None
+        self._dead += 1
+
+    def search(self, query, limit=20):
+        """Up to `limit` matches for `query`, prefix matches first.
+
+        Returns ([(orchestrator_id, address, "prefix" | "substring"), ...],
+        truncated).
+        """
+        query = query.strip().lower()
+        if not query or limit < 1:
+            return [], False
+        found, seen = [], set()
+        with self._lock:
+            keys, key_slots, entries = self._keys, self._key_slots, self._entries
+            i = bisect_left(keys, query)
+            while i < len(keys) and len(found) <= limit and keys[i].startswith(query):
+                slot = key_slots[i]
+                if slot not in seen:
+                    seen.add(slot)
+                    found.append((entries[slot][0], entries[slot][1], "prefix"))
+                i += 1
+            if len(found) <= limit and len(query) >= GRAM:
+                postings = self._postings
+                candidates = min((postings.get(g, _EMPTY) for g in _grams(query)), key=len)
+                for slot in candidates:
+                    entry = entries[slot]
+                    if entry is None or slot in seen:
+                        continue
+                    if query in entry[2] or query in entry[3]:
+                        found.append((entry[0], entry[1], "substring"))
+                        if len(found) > limit:
+                            break
+        return found[:limit], len(found) > limit
+
+    def stats(self):
+        with self._lock:
+            return {
+                "generation": self.generation,
+                "entries": len(self._slots),
+                "dead_slots": self._dead,
+                "keys": len(self._keys),
+                "grams": len(self._postings),
+                "postings": sum(len(p) for p in self._postings.values()),
+            }
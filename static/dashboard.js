@@ -0,0 +1,256 @@
+(function () {
+    // Keep the "Last updated" age and stale marker current, and follow new
+    // generations over /api/events.
+    var el = document.getElementById("data-age");
+    var updated = Date.parse(el.dataset.updated);
+    var generation = parseInt(el.dataset.generation, 10);
+    var staleAfter = parseInt(el.dataset.staleAfter, 10);
+    function tick() {
+        if (isNaN(updated)) return;
+        var s = Math.max(0, Math.floor((Date.now() - updated) / 1000));
+        var text = s < 60 ? s + "s ago"
+            : s < 3600 ? Math.floor(s / 60) + "m ago"
+            : s < 86400 ? Math.floor(s / 3600) + "h " + Math.floor(s % 3600 / 60) + "m ago"
+            : Math.floor(s / 86400) + "d " + Math.floor(s % 86400 / 3600) + "h ago";
+        document.getElementById("data-age-text").textContent = text;
+        el.classList.toggle("stale", s > staleAfter);
+    }
+    tick();
+    setInterval(tick, 15000);
+
+    if (!window.EventSource || !el.dataset.events) return;
+    new EventSource(el.dataset.events).addEventListener("generation", function (e) {
+        var msg = JSON.parse(e.data);
+        if (msg.generation === generation) return;
+        generation = msg.generation;
+        updated = Date.parse(msg.last_update);
+        tick();
+        // The virtual table reloads itself and cancels the event; the
+        // server-rendered table offers a reload instead.
+        var ev = new CustomEvent("dashboard:generation", { detail: msg, cancelable: true });
+        if (document.dispatchEvent(ev)) document.getElementById("data-new").hidden = false;
+    });
+})();
+
+(function () {
+    // Windowed table for large fleets (rendered with ?view=virtual).
+    var viewport = document.getElementById("vt-viewport");
+    if (!viewport || !viewport.classList.contains("vt-viewport")) return;
+    var ROW_HEIGHT = 45, OVERSCAN = 10;
+    var PAGE_SIZE = parseInt(viewport.dataset.pageSize, 10);
+    var API = viewport.dataset.api, DETAIL = viewport.dataset.detail, SHOW_SOURCE = viewport.dataset.showSource === "1";
+    var STATUS = [
+        '<span class="badge badge-success">Active</span>',
+        '<span class="badge badge-warning">Cooldown</span>',
+        '<span class="badge badge-danger">Inactive</span>'
+    ];
+    var body = document.getElementById("vt-body");
+    var countEl = document.getElementById("vt-count");
+    var cols = null, haystack = [], view = [], total = 0, generation = null;
+    var sortCol = null, sortDir = 1, query = "", pending = false;
+    var loading = false, outdated = false;
+
+    function esc(v) {
+        return String(v == null ? "" : v).replace(/[&<>"']/g, function (c) {
+            return "&#" + c.charCodeAt(0) + ";";
+        });
+    }
+
+    function fmtTime(v) {
+        if (!v) return "N/A";
+        var d = new Date(v);
+        return isNaN(d) ? esc(v) : d.toUTCString().slice(5, 22) + " UTC";
+    }
+
+    function rowHtml(i) {
+        var addr = cols.address[i] || "", change = cols.balance_change_24h[i] || 0;
+        var cls = change > 0 ? "balance-positive" : change < 0 ? "balance-negative" : "balance-zero";
+        return '<tr><td><div class="orch-name">' + esc(cols.orchestrator_id[i]) + "</div></td>" +
+            '<td><a class="address" href="' + esc(DETAIL + encodeURIComponent(addr)) + '" title="' + esc(addr) + '">' + esc(addr.slice(0, 10)) + "..." + esc(addr.slice(-8)) + "</a></td>" +
+            "<td>" + (cols.balance_eth[i] || 0).toFixed(8) + "</td>" +
+            '<td><span class="' + cls + '">' + (change >= 0 ? "+" : "") + change.toFixed(8) + "</span></td>" +
+            '<td class="sparkline">' + (cols.sparkline && cols.sparkline[i] ? '<svg viewBox="0 0 48 16" aria-hidden="true"><path d="' + esc(cols.sparkline[i]) + '"/></svg>' : "") + "</td>" +
+            "<td>" + STATUS[cols.status[i]] + "</td>" +
+            "<td>" + fmtTime(cols.last_healthy_at[i]) + "</td>" +
+            (SHOW_SOURCE ? "<td>" + esc(cols.source[i]) + "</td>" : "") + "</tr>";
+    }
+
+    function spacer(px) {
+        return px > 0 ? '<tr class="vt-spacer" style="height:' + px + 'px"><td colspan="8"></td></tr>' : "";
+    }
+
+    function render() {
+        pending = false;
+        if (!cols) return;
+        var first = Math.max(0, Math.floor(viewport.scrollTop / ROW_HEIGHT) - OVERSCAN);
+        var last = Math.min(view.length, first + Math.ceil(viewport.clientHeight / ROW_HEIGHT) + 2 * OVERSCAN);
+        var html = spacer(first * ROW_HEIGHT);
+        for (var k = first; k < last; k++) html += rowHtml(view[k]);
+        body.innerHTML = html + spacer((view.length - last) * ROW_HEIGHT);
+    }
+
+    function schedule() {
+        if (!pending) {
+            pending = true;
+            window.requestAnimationFrame(render);
+        }
+    }
+
+    function rebuild() {
+        var n = cols ? cols.address.length : 0, q = query.toLowerCase();
+        view = [];
+        for (var i = 0; i < n; i++) {
+            if (!q || haystack[i].indexOf(q) !== -1) view.push(i);
+        }
+        if (sortCol) {
+            var c = cols[sortCol];
+            view.sort(function (a, b) {
+                var x = c[a], y = c[b];
+                if (x == null) return y == null ? a - b : 1;
+                if (y == null) return -1;
+                return x < y ? -sortDir : x > y ? sortDir : a - b;
+            });
+        }
+        countEl.textContent = view.length === total
+            ? total + " orchestrators"
+            : view.length + " of " + total + " orchestrators";
+        schedule();
+    }
+
+    function reload() {
+        cols = null;
+        haystack = [];
+        generation = null;
+        load(0);
+    }
+
+    function load(offset) {
+        loading = true;
+        fetch(API + (API.indexOf("?") < 0 ? "?" : "&") + "format=columns&offset=" + offset + "&limit=" + PAGE_SIZE)
+            .then(function (r) { return r.json(); })
+            .then(function (page) {
+                if (generation !== null && page.generation !== generation) return reload();
+                generation = page.generation;
+                total = page.total;
+                if (!cols) cols = {};
+                page.columns.forEach(function (name, j) {
+                    cols[name] = (cols[name] || []).concat(page.data[j]);
+                });
+                for (var i = offset; i < cols.address.length; i++) {
+                    haystack.push(((cols.orchestrator_id[i] || "") + " " + (cols.address[i] || "")).toLowerCase());
+                }
+                rebuild();
+                if (cols.address.length < total) return load(cols.address.length);
+                loading = false;
+                if (outdated) {
+                    outdated = false;
+                    reload();
+                }
+            })
+            .catch(function () { loading = false; });
+    }
+
+    document.addEventListener("dashboard:generation", function (e) {
+        e.preventDefault();
+        if (e.detail.generation === generation) return;
+        if (loading) outdated = true;
+        else reload();
+    });
+
+    Array.prototype.forEach.call(document.querySelectorAll("th[data-col]"), function (th) {
+        th.addEventListener("click", function () {
+            var col = th.getAttribute("data-col");
+            sortDir = sortCol === col ? -sortDir : 1;
+            sortCol = col;
+            rebuild();
+        });
+    });
+    document.getElementById("vt-search").addEventListener("input", function (e) {
+        query = e.target.value.trim();
+        rebuild();
+    });
+    viewport.addEventListener("scroll", schedule);
+    window.addEventListener("resize", schedule);
+    load(0);
+})();
+
+(function () {
+    // Search box: asks /api/search once typing pauses and lists the matches
+    // as links to their detail pages. Arrow keys move, Enter opens.
+    var box = document.getElementById("search");
+    if (!box) return;
+    var API = box.dataset.api, DEBOUNCE_MS = 150;
+    var input = document.getElementById("search-input");
+    var list = document.getElementById("search-results");
+    var timer = null, seq = 0, active = -1;
+
+    function esc(v) {
+        return String(v == null ? "" : v).replace(/[&<>"']/g, function (c) {
+            return "&#" + c.charCodeAt(0) + ";";
+        });
+    }
+
+    function links() {
+        return list.querySelectorAll("a");
+    }
+
+    function highlight(k) {
+        var items = links();
+        if (!items.length) return;
+        active = (k + items.length) % items.length;
+        Array.prototype.forEach.call(items, function (a, i) {
+            a.classList.toggle("active", i === active);
+        });
+        items[active].scrollIntoView({ block: "nearest" });
+    }
+
+    function show(page) {
+        active = -1;
+        var html = page.results.map(function (r) {
+            return '<li><a href="' + esc(r.url) + '">' + esc(r.orchestrator_id || "(no ID)") +
+                (r.status ? " &middot; " + esc(r.status) : "") +
+                (r.balance_eth != null ? " &middot; " + Number(r.balance_eth).toFixed(4) + " ETH" : "") +
+                '<span class="address">' + esc(r.address) + "</span></a></li>";
+        }).join("");
+        if (!page.results.length) html = '<li class="note">No matches</li>';
+        else if (page.truncated) html += '<li class="note">More matches: keep typing to narrow down</li>';
+        list.innerHTML = html;
+        list.hidden = false;
+    }
+
+    function run() {
+        var q = input.value.trim(), mine = ++seq;
+        if (!q) {
+            list.hidden = true;
+            return;
+        }
+        fetch(API + "?q=" + encodeURIComponent(q))
+            .then(function (r) { return r.json(); })
+            .then(function (page) {
+                if (mine === seq) show(page);
+            })
+            .catch(function () {});
+    }
+
+    input.addEventListener("input", function () {
+        clearTimeout(timer);
+        timer = setTimeout(run, DEBOUNCE_MS);
+    });
+    input.addEventListener("keydown", function (e) {
+        if (e.key === "ArrowDown" || e.key === "ArrowUp") {
+            e.preventDefault();
+            highlight(active + (e.key === "ArrowDown" ? 1 : -1));
+        } else if (e.key === "Enter") {
+            var items = links();
+            if (items.length) window.location.href = items[Math.max(active, 0)].href;
+        } else if (e.key === "Escape") {
+            list.hidden = true;
+        }
+    });
+    document.addEventListener("click", function (e) {
+        if (!box.contains(e.target)) list.hidden = true;
+    });
+    input.addEventListener("focus", function () {
+        if (input.value.trim() && list.innerHTML) list.hidden = false;
+    });
+})();
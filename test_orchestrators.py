@@ -1,77 +1,620 @@
-from flask import Flask, render_template_string
-import requests
+from flask import Blueprint, Flask, abort, current_app, g, jsonify, request, url_for
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
 import threading
 import time
 import sqlite3
 from datetime import datetime, timedelta, timezone
+import gzip
+import hashlib
+import heapq
+import hmac
+import json
 import logging
+import mimetypes
 import os
+import zlib
+from urllib.parse import quote
+from urllib.request import pathname2url
 
-# Optionally load variables from a .env file
-try:
-    from dotenv import load_dotenv
-    load_dotenv()
-except Exception:
-    pass
+import admission
+import profiling
+import recording
+import search
+import tracing
+from profiling import add_timing, span
 
-# Configuration
-ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
-API_URL = os.environ.get("API_URL", "http://3.141.111.200:8081/api/orchestrators")
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process collector election
+    fcntl = None
 
-DB_FILE = os.environ.get(
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+# Configuration defaults. Nothing is read from the environment at import
+# time; create_app() overlays .env / environment values and explicit
+# overrides on top of these.
+ADMIN_TOKEN = ""
+API_URL = "http://3.141.111.200:8081/api/orchestrators"
+DB_FILE = os.path.join(os.path.dirname(__file__), "orchestrators.db")
+UPDATE_INTERVAL = 10  # seconds
+# JSON list of {"name", "url", "token"} objects for several regional APIs.
+# Empty means a single source built from API_URL / ADMIN_TOKEN.
+API_SOURCES = ""
+SOURCE_TIMEOUT = 10  # seconds
+# Fleets larger than this get the windowed table fed from the columnar API.
+VIRTUAL_TABLE_THRESHOLD = 1000
+API_PAGE_SIZE = 5000
+# "auto" processes polls with the NumPy columnar backend when NumPy is
+# installed; "off" always uses the per-record loop.
+COLUMNAR_BACKEND = "auto"
+# When a poll writes a balance_history row: "change" (balance moved, or
+# HEARTBEAT_INTERVAL seconds since the last row), "hourly" or "every".
+SNAPSHOT_POLICY = "change"
+HEARTBEAT_INTERVAL = 6 * 3600  # seconds, 0 disables heartbeat rows
+HISTORY_RETENTION_HOURS = 25
+ROLLUP_RETENTION_DAYS = 90  # balance_hourly rows kept after raw history is gone
+# Spread balance_history/balance_hourly over this many SQLite files, hashed
+# by address (see HistoryStore); 0 or 1 keeps them in DB_FILE.
+HISTORY_SHARDS = 0
+# Opt-in profiling: capture the next N poll cycles / requests into
+# PROFILE_DIR as .pstats (PROFILE_MODE=cprofile) or .collapsed (sample).
+PROFILE_DIR = os.path.join(os.path.dirname(__file__), "profiles")
+PROFILE_MODE = "cprofile"
+PROFILE_POLLS = 0
+PROFILE_REQUESTS = 0
+# Token for the dashboard's own admin endpoints; empty disables them.
+DASHBOARD_TOKEN = ""
+# POST /refresh polls at most this often (seconds), whatever the callers.
+# Scheduled polls do not count against it.
+REFRESH_MIN_INTERVAL = 30
+
+# Directory for per-poll and per-request traces in OpenTelemetry JSON (see
+# tracing.py); empty disables tracing. Each process writes its own file,
+# rotated at TRACE_MAX_BYTES with TRACE_BACKUPS old files kept.
+TRACE_DIR = ""
+TRACE_MAX_BYTES = 10 * 1024 * 1024
+TRACE_BACKUPS = 5
+
+# Directory for the raw payload recorder (see recording.py); empty disables
+# it. `python manage.py replay` feeds a recording back through the pipeline.
+RECORD_DIR = ""
+
+# Admission control (see admission.py). Concurrent requests per route (0 =
+# unlimited), JSON {"endpoint": N} overrides such as {"index": 2}, how many
+# requests may wait for a slot per route and for how long (seconds), the
+# per-client rate (requests/second, 0 disables) and burst, and how many
+# requests may be in flight in total while a poll cycle runs (0 = no limit).
+ROUTE_CONCURRENCY = 8
+ROUTE_LIMITS = ""
+ROUTE_QUEUE = 32
+QUEUE_TIMEOUT = 5
+CLIENT_RATE = 20
+CLIENT_BURST = 60
+POLL_CONCURRENCY = 2
+# Reverse proxies in front of the app that append the client to
+# X-Forwarded-For (1 for the Nginx setup in README.md). The per-client rate
+# is charged to the address the outermost of them saw; 0 uses the peer.
+TRUSTED_PROXIES = 0
+
+# ASGI mode (asgi.py): threads for routes bridged to the Flask app, and how
+# often an idle /api/events stream sends a keep-alive comment.
+ASGI_THREADS = 8
+EVENTS_KEEPALIVE = 15  # seconds
+
+# Orchestrator detail pages kept in memory per process (LRU, see ResponseCache).
+DETAIL_CACHE_SIZE = 256
+# Point-in-time fleet views (/?at=) kept in memory per process.
+AS_OF_CACHE_SIZE = 32
+# Most matches /api/search returns for one query.
+SEARCH_LIMIT = 20
+
+STATIC_DIR = os.path.join(os.path.dirname(__file__), "static")
+
+CONFIG_KEYS = (
+    "ADMIN_TOKEN",
+    "API_URL",
     "DB_FILE",
-    os.path.join(os.path.dirname(__file__), "orchestrators.db"),
+    "UPDATE_INTERVAL",
+    "API_SOURCES",
+    "SOURCE_TIMEOUT",
+    "VIRTUAL_TABLE_THRESHOLD",
+    "API_PAGE_SIZE",
+    "COLUMNAR_BACKEND",
+    "SNAPSHOT_POLICY",
+    "HEARTBEAT_INTERVAL",
+    "HISTORY_RETENTION_HOURS",
+    "ROLLUP_RETENTION_DAYS",
+    "HISTORY_SHARDS",
+    "PROFILE_DIR",
+    "PROFILE_MODE",
+    "PROFILE_POLLS",
+    "PROFILE_REQUESTS",
+    "TRACE_DIR",
+    "TRACE_MAX_BYTES",
+    "TRACE_BACKUPS",
+    "DASHBOARD_TOKEN",
+    "REFRESH_MIN_INTERVAL",
+    "RECORD_DIR",
+    "ROUTE_CONCURRENCY",
+    "ROUTE_LIMITS",
+    "ROUTE_QUEUE",
+    "QUEUE_TIMEOUT",
+    "CLIENT_RATE",
+    "CLIENT_BURST",
+    "POLL_CONCURRENCY",
+    "TRUSTED_PROXIES",
+    "ASGI_THREADS",
+    "EVENTS_KEEPALIVE",
+    "DETAIL_CACHE_SIZE",
+    "AS_OF_CACHE_SIZE",
+    "SEARCH_LIMIT",
 )
 
-try:
-    UPDATE_INTERVAL = int(os.environ.get("UPDATE_INTERVAL", "10"))  # seconds
-except Exception:
-    UPDATE_INTERVAL = 60
+# Columns of the compact array-of-columns API payload, in order.
+API_COLUMNS = (
+    "orchestrator_id",
+    "address",
+    "balance_eth",
+    "balance_change_24h",
+    "status",
+    "last_healthy_at",
+    "source",
+    "sparkline",
+)
+STATUS_LABELS = ("Active", "Cooldown", "Inactive")
+# Paths outside admission control: cheap or needed to watch an overload.
+# /refresh has its token and REFRESH_MIN_INTERVAL, and has to join a
+# running poll cycle rather than wait behind it.
+ADMISSION_EXEMPT = ("/static/", "/api/status", "/api/events", "/refresh")
 
 db_initialized = False
 last_update = None
+data_generation = 0
 
-app = Flask(__name__)
 orchestrators_data = []
+last_poll_timings = {}
+
+profiler = profiling.Profiler()
+
+bp = Blueprint("dashboard", __name__)
+
+_dotenv_loaded = False
+_default_app = None
+_applied_config = None  # settings of the last create_app()
+_http_local = threading.local()
+_source_executor = None
+_source_lock = threading.Lock()
+_source_results = {}  # name -> (orchestrators, fetched_at, blob sha) of last success
+_source_futures = {}  # name -> future still running from an earlier cycle
+_merged_stamps = {}  # name -> fetched_at of the results last merged
+_last_merged = []  # [{"name", "sha", "fetched_at"}] behind the last merge
+_recorder = None
+_record_local = threading.local()  # blob sha of this thread's last fetch
+source_status = {}
+_db_local = threading.local()
+_history_store = None
+_assets = None  # file name and fingerprinted name -> asset dict
+_page_cache = {}  # view -> (page_version(), rendered html)
+_columns_cache = (None, None)  # (generation, {column: values})
+_sparkline_cache = (None, None)  # (generation, {address: SVG path data})
+_sparkline_closes = (None, None, None)  # (window end, {address: row}, closes)
+_rows_cache = (None, None)  # (generation, serialized JSON rows)
+_address_index = (None, None)  # (generation, {lowercased address: record})
+_search_index = search.SearchIndex()
+_search_executor = None
+_search_future = None  # latest background update of _search_index
+_search_lock = threading.Lock()
+_detail_cache = None
+_as_of_cache = None
+_admission = (None, None)  # (settings, AdmissionController)
+
+_collector_lock = threading.Lock()
+_collector_pid = None
+_collector_lock_file = None
+collector_owner = False
+_follow_checked_at = 0.0
+_poll_finished = (float("-inf"), None)  # (monotonic time read, finished_at of last poll)
+
+_poll_mutex = threading.Lock()
+_collector_wakeup = threading.Event()
+_collector_stop = threading.Event()
+
+
+def _load_dotenv():
+    """Optionally load variables from a .env file (once per process)."""
+    global _dotenv_loaded
+    if _dotenv_loaded:
+        return
+    _dotenv_loaded = True
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except Exception:
+        pass
+
+
+def load_config(overrides=None):
+    """Resolve configuration: overrides > environment > current defaults."""
+    _load_dotenv()
+    config = {}
+    for key in CONFIG_KEYS:
+        default = globals()[key]
+        value = os.environ.get(key)
+        if value is None:
+            value = default
+        elif isinstance(default, int):
+            try:
+                value = int(value)
+            except ValueError:
+                logging.warning("Invalid %s=%r, using %r", key, value, default)
+                value = default
+        config[key] = value
+    config.update(overrides or {})
+    return config
+
+
+def configure(config):
+    """Apply a resolved configuration to the module settings."""
+    for key in CONFIG_KEYS:
+        if key in config:
+            globals()[key] = config[key]
+
+
+def create_app(config=None):
+    """Build the Flask app.
+
+    There is one dashboard per process: settings, the served fleet and the
+    caches are module globals, not per-app state. Calling create_app()
+    again with other settings retargets every app built before it (a
+    warning is logged); load a fresh copy of the module for an independent
+    one, as the tests do.
+
+    Safe to call from a gunicorn master with --preload: the template is
+    compiled and the last snapshot restored here so forked workers share
+    them copy-on-write. The collector thread is started separately by
+    start_collector(), after the fork.
+    """
+    global _applied_config
+    config = load_config(config)
+    if _applied_config is not None and config != _applied_config:
+        logging.warning(
+            "create_app() called again with different settings; "
+            "apps built earlier in this process now use them too"
+        )
+    configure(config)
+    _applied_config = config
+    app = Flask(__name__, static_folder=None)
+    app.register_blueprint(bp)
+    app.jinja_env.globals["asset_url"] = asset_url
+    init_db()
+    restore_snapshot()
+    profiler.directory = PROFILE_DIR
+    profiler.mode = PROFILE_MODE
+    if PROFILE_POLLS:
+        profiler.arm("poll", PROFILE_POLLS)
+    if PROFILE_REQUESTS:
+        profiler.arm("request", PROFILE_REQUESTS)
+    configure_tracing()
+    load_assets()
+    with app.app_context():
+        get_template()
+        get_template("detail")
+    return app
+
+
+def configure_tracing():
+    """Export traces to TRACE_DIR, or switch tracing off; returns the exporter."""
+    exporter = tracing.get_exporter()
+    settings = (TRACE_DIR, TRACE_MAX_BYTES, TRACE_BACKUPS)
+    if exporter is not None and (exporter.directory, exporter.max_bytes, exporter.backups) == settings:
+        return exporter
+    new = tracing.FileExporter(TRACE_DIR, TRACE_MAX_BYTES, TRACE_BACKUPS) if TRACE_DIR else None
+    tracing.configure(new)
+    if exporter is not None:
+        exporter.close()
+    return new
+
+
+def __getattr__(name):
+    # `test_orchestrators:app` keeps working for gunicorn/waitress while a
+    # plain import stays cheap; the app is only built on first access.
+    global _default_app
+    if name == "app":
+        if _default_app is None:
+            _default_app = create_app()
+        return _default_app
+    raise AttributeError(name)
+
+
+def get_http_session():
+    """Return this thread's requests session, importing requests on first use."""
+    session = getattr(_http_local, "session", None)
+    if session is None:
+        import requests
+        session = requests.Session()
+        _http_local.session = session
+    return session
+
+
+def get_db():
+    """Return this thread's SQLite connection to DB_FILE, opening it lazily."""
+    conn = getattr(_db_local, "conn", None)
+    if conn is None or _db_local.path != DB_FILE:
+        if conn is not None:
+            conn.close()
+        conn = sqlite3.connect(DB_FILE)
+        _db_local.conn = conn
+        _db_local.path = DB_FILE
+    return conn
+
+
+class HistoryStore:
+    """Where balance_history and balance_hourly live.
+
+    With one shard both tables are in DB_FILE and use get_db(). With more,
+    each address is assigned to one of `shards` files next to DB_FILE
+    (<name>.shard-K-of-N.db) by crc32; every file has its own WAL and its
+    own connection per thread, and map() runs a function on all shards in
+    parallel.
+    """
+
+    def __init__(self, db_file, shards):
+        self.db_file = db_file
+        self.shards = max(1, int(shards or 1))
+        self.sharded = self.shards > 1
+        if self.sharded:
+            root, ext = os.path.splitext(db_file)
+            self.paths = [
+                "{}.shard-{}-of-{}{}".format(root, k, self.shards, ext or ".db")
+                for k in range(self.shards)
+            ]
+        else:
+            self.paths = [db_file]
+        self._local = threading.local()
+        self._executor = None
+        self._next_cleanup = 0
+
+    def shard_of(self, address):
+        if not self.sharded:
+            return 0
+        return zlib.crc32(address.encode("utf-8")) % self.shards
+
+    def connection(self, shard):
+        """This thread's connection to one shard."""
+        if not self.sharded:
+            return get_db()
+        conns = getattr(self._local, "conns", None)
+        if conns is None:
+            conns = self._local.conns = {}
+        conn = conns.get(shard)
+        if conn is None:
+            conn = conns[shard] = sqlite3.connect(self.paths[shard])
+        return conn
+
+    def for_address(self, address):
+        return self.connection(self.shard_of(address))
+
+    def map(self, fn, shards=None):
+        """Return [fn(connection, shard) ...] for the given (default: all) shards."""
+        shards = list(range(self.shards) if shards is None else shards)
+        if len(shards) <= 1:
+            return [fn(self.connection(k), k) for k in shards]
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.shards, thread_name_prefix="history")
+        run = profiler.wrap(tracing.wrap(lambda k: fn(self.connection(k), k)))
+        return list(self._executor.map(run, shards))
+
+    def split(self, rows):
+        """Group rows whose first field is an address by shard: {shard: rows}."""
+        if not self.sharded:
+            return {0: rows} if rows else {}
+        groups = {}
+        for row in rows:
+            groups.setdefault(self.shard_of(row[0]), []).append(row)
+        return groups
+
+    def next_cleanup(self):
+        """Shards for this poll's retention pass: one per poll, in turn."""
+        if not self.sharded:
+            return None
+        shard = self._next_cleanup
+        self._next_cleanup = (shard + 1) % self.shards
+        return [shard]
+
+    def close(self):
+        """Close this thread's shard connections."""
+        for conn in getattr(self._local, "conns", {}).values():
+            conn.close()
+        self._local.conns = {}
+
+
+def get_history_store():
+    """The HistoryStore for the current DB_FILE and HISTORY_SHARDS."""
+    global _history_store
+    store = _history_store
+    if store is None or store.db_file != DB_FILE or store.shards != max(1, HISTORY_SHARDS):
+        store = _history_store = HistoryStore(DB_FILE, HISTORY_SHARDS)
+    return store
+
+
+def create_history_tables(conn):
+    """Create balance_history, balance_hourly and status_events on a connection."""
+    cursor = conn.cursor()
+    # Shard files are created empty, where this still takes effect; it lets
+    # cleanup_old_records() return freed pages a shard at a time.
+    cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS balance_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            address TEXT NOT NULL,
+            balance REAL NOT NULL,
+            timestamp TEXT NOT NULL
+        )
+        """
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_address_timestamp "
+        "ON balance_history(address, timestamp)"
+    )
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS balance_hourly (
+            address TEXT NOT NULL,
+            hour TEXT NOT NULL,
+            open REAL NOT NULL,
+            high REAL NOT NULL,
+            low REAL NOT NULL,
+            close REAL NOT NULL,
+            samples INTEGER NOT NULL,
+            PRIMARY KEY (address, hour)
+        ) WITHOUT ROWID
+        """
+    )
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS status_events (
+            address TEXT NOT NULL,
+            changed_at TEXT NOT NULL,
+            status INTEGER NOT NULL,
+            PRIMARY KEY (address, changed_at)
+        ) WITHOUT ROWID
+        """
+    )
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    conn.commit()
+
+
+def get_template(name="dashboard"):
+    """Return a compiled page template, compiling it once per app.
+
+    "dashboard" is the fleet table, "detail" the per-orchestrator page.
+    """
+    key = "{}_template".format(name)
+    template = current_app.extensions.get(key)
+    if template is None:
+        source = DETAIL_TEMPLATE if name == "detail" else HTML_TEMPLATE
+        template = current_app.jinja_env.from_string(source)
+        current_app.extensions[key] = template
+    return template
+
+
+def load_assets():
+    """Fingerprint and precompress the files in static/, once per process.
+
+    Each asset is reachable under its own name and under a content-hashed
+    name (dashboard.<sha256[:12]>.css). The hashed URL can be cached
+    forever because any edit changes it. gzip and, when the brotli package
+    is installed, br encodings are built up front.
+    """
+    global _assets
+    if _assets is not None:
+        return _assets
+    assets = {}
+    for name in sorted(os.listdir(STATIC_DIR)):
+        path = os.path.join(STATIC_DIR, name)
+        if not os.path.isfile(path):
+            continue
+        with open(path, "rb") as fh:
+            body = fh.read()
+        digest = hashlib.sha256(body).hexdigest()[:12]
+        stem, ext = os.path.splitext(name)
+        encodings = {"identity": body, "gzip": gzip.compress(body, 9, mtime=0)}
+        if brotli is not None:
+            encodings["br"] = brotli.compress(body)
+        asset = {
+            "name": name,
+            "hashed": "{}.{}{}".format(stem, digest, ext),
+            "digest": digest,
+            "mimetype": mimetypes.guess_type(name)[0] or "application/octet-stream",
+            "encodings": encodings,
+        }
+        assets[name] = asset
+        assets[asset["hashed"]] = asset
+    _assets = assets
+    return _assets
+
+
+def asset_url(name):
+    """URL of the fingerprinted copy of a static file."""
+    return url_for("dashboard.static_asset", filename=load_assets()[name]["hashed"])
 
 
 def init_db():
     """Initialize the SQLite database."""
     global db_initialized
     try:
-        conn = sqlite3.connect(DB_FILE)
+        conn = get_db()
         cursor = conn.cursor()
         cursor.execute(
             """
-            CREATE TABLE IF NOT EXISTS balance_history (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                address TEXT NOT NULL,
-                balance REAL NOT NULL,
-                timestamp TEXT NOT NULL
+            CREATE TABLE IF NOT EXISTS fleet_snapshot (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                generation INTEGER NOT NULL,
+                taken_at TEXT NOT NULL,
+                payload BLOB NOT NULL
+            )
+            """
+        )
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS source_status (
+                name TEXT PRIMARY KEY,
+                status TEXT NOT NULL
             )
             """
         )
         cursor.execute(
-            "CREATE INDEX IF NOT EXISTS idx_address_timestamp "
-            "ON balance_history(address, timestamp)"
+            """
+            CREATE TABLE IF NOT EXISTS poll_stats (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                finished_at TEXT NOT NULL,
+                timings TEXT NOT NULL
+            )
+            """
+        )
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS refresh_stats (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                finished_at TEXT NOT NULL
+            )
+            """
+        )
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS poll_profile_request (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                count INTEGER NOT NULL,
+                mode TEXT
+            )
+            """
         )
         cursor.execute("PRAGMA journal_mode=WAL")
         cursor.execute("PRAGMA synchronous=NORMAL")
         conn.commit()
-        conn.close()
+        store = get_history_store()
+        for shard in range(store.shards):
+            create_history_tables(store.connection(shard))
         db_initialized = True
         logging.info("Database initialized at %s", DB_FILE)
     except Exception:
         logging.exception("Database init error")
 
 
-def get_balance_24h_ago(address):
+def get_balance_24h_ago(address, reference_time=None):
     """Return the balance closest to 24 hours ago for a given address."""
     try:
-        conn = sqlite3.connect(DB_FILE)
+        conn = get_history_store().for_address(address)
         cursor = conn.cursor()
 
-        target_time = (datetime.now(timezone.utc) - timedelta(hours=24)).isoformat()
+        reference_time = reference_time or datetime.now(timezone.utc)
+        target_time = (reference_time - timedelta(hours=24)).isoformat()
 
         # Try snapshot at or before target_time
         cursor.execute(
@@ -85,7 +628,6 @@ def get_balance_24h_ago(address):
         )
         row = cursor.fetchone()
         if row:
-            conn.close()
             return row[0]
 
         # If no older snapshot, return oldest available snapshot
@@ -99,7 +641,6 @@ def get_balance_24h_ago(address):
             (address,),
         )
         row = cursor.fetchone()
-        conn.close()
         return row[0] if row else None
 
     except Exception:
@@ -107,26 +648,73 @@ def get_balance_24h_ago(address):
         return None
 
 
-def save_balance(address, balance):
-    """Save only one balance snapshot per address per hour."""
+class SnapshotPolicy:
+    """Decides whether a polled balance gets a balance_history row.
+
+    Each row is valid from its timestamp until the next row for the same
+    address, so "balance at T" is the latest row at or before T. A row is
+    written when the address has none yet, when `on_change` is set and the
+    balance differs from the latest row, or when the latest row is at least
+    `max_age` old (a heartbeat).
+    """
+
+    def __init__(self, on_change, max_age=None):
+        self.on_change = on_change
+        self.max_age = max_age
+
+    def due(self, latest, balance, now):
+        """latest is the (balance, timestamp) of the newest row, or None."""
+        if latest is None:
+            return True
+        if self.on_change and latest[0] != balance:
+            return True
+        return self.max_age is not None and latest[1] <= (now - self.max_age).isoformat()
+
+    def due_mask(self, balance, latest_balance, latest_timestamp, now):
+        """Vectorized due(): NumPy arrays in, boolean array out.
+
+        Addresses without a row have a NaN balance and an empty timestamp.
+        """
+        import numpy as np
+
+        due = latest_timestamp == ""
+        if self.on_change:
+            due |= latest_balance != balance
+        if self.max_age is not None:
+            due |= latest_timestamp <= (now - self.max_age).isoformat()
+        return np.asarray(due)
+
+
+def get_snapshot_policy():
+    """Return the SnapshotPolicy selected by SNAPSHOT_POLICY."""
+    if SNAPSHOT_POLICY == "every":
+        return SnapshotPolicy(on_change=False, max_age=timedelta(0))
+    if SNAPSHOT_POLICY == "hourly":
+        return SnapshotPolicy(on_change=False, max_age=timedelta(hours=1))
+    if SNAPSHOT_POLICY != "change":
+        logging.warning("Unknown SNAPSHOT_POLICY %r, using 'change'", SNAPSHOT_POLICY)
+    heartbeat = timedelta(seconds=HEARTBEAT_INTERVAL) if HEARTBEAT_INTERVAL else None
+    return SnapshotPolicy(on_change=True, max_age=heartbeat)
+
+
+def save_balance(address, balance, timestamp=None):
+    """Save a balance snapshot if the snapshot policy says one is due."""
     try:
-        conn = sqlite3.connect(DB_FILE)
+        conn = get_history_store().for_address(address)
         cursor = conn.cursor()
 
-        now = datetime.now(timezone.utc)
-        one_hour_ago = (now - timedelta(hours=1)).isoformat()
+        now = timestamp or datetime.now(timezone.utc)
 
-        # Check if we already saved within the last hour for this address
         cursor.execute(
             """
-            SELECT 1 FROM balance_history
-            WHERE address = ? AND timestamp >= ?
+            SELECT balance, timestamp FROM balance_history
+            WHERE address = ?
+            ORDER BY timestamp DESC
             LIMIT 1
             """,
-            (address, one_hour_ago),
+            (address,),
         )
-        if cursor.fetchone():
-            conn.close()
+        if not get_snapshot_policy().due(cursor.fetchone(), balance, now):
             return
 
         cursor.execute(
@@ -137,25 +725,760 @@ def save_balance(address, balance):
             (address, balance, now.isoformat()),
         )
         conn.commit()
-        conn.close()
     except Exception:
-        logging.exception("Error saving hourly balance for %s", address)
+        logging.exception("Error saving balance for %s", address)
+
+
+def get_balances_24h_ago_all(reference_time=None):
+    """Batched get_balance_24h_ago for every address: {address: balance}.
+
+    Two grouped queries over idx_address_timestamp replace one round trip
+    per address. SQLite returns the bare `balance` column from the row that
+    holds the MAX()/MIN() timestamp. Shards are queried in parallel.
+    """
+    reference_time = reference_time or datetime.now(timezone.utc)
+    target_time = (reference_time - timedelta(hours=24)).isoformat()
+
+    def query(conn, shard):
+        with tracing.span("db.balances_24h_ago", shard=shard) as trace:
+            balances = {
+                addr: bal
+                for addr, bal, _ in conn.execute(
+                    """
+                    SELECT address, balance, MIN(timestamp) FROM balance_history
+                    WHERE timestamp > ? GROUP BY address
+                    """,
+                    (target_time,),
+                )
+            }
+            balances.update(
+                (addr, bal)
+                for addr, bal, _ in conn.execute(
+                    """
+                    SELECT address, balance, MAX(timestamp) FROM balance_history
+                    WHERE timestamp <= ? GROUP BY address
+                    """,
+                    (target_time,),
+                )
+            )
+            trace.set(rows=len(balances))
+        return balances
 
+    try:
+        balances = {}
+        for part in get_history_store().map(query):
+            balances.update(part)
+        return balances
+    except Exception:
+        logging.exception("Error fetching 24h-ago balances")
+        return {}
+
+
+def get_latest_all():
+    """Return {address: (balance, timestamp)} of each address's newest row."""
+
+    def query(conn, shard):
+        with tracing.span("db.latest_history", shard=shard) as trace:
+            latest = {
+                addr: (bal, ts)
+                for addr, bal, ts in conn.execute(
+                    """
+                    SELECT address, balance, MAX(timestamp) FROM balance_history
+                    GROUP BY address
+                    """
+                )
+            }
+            trace.set(rows=len(latest))
+        return latest
 
-def cleanup_old_records():
-    """Remove records older than 25 hours."""
     try:
-        conn = sqlite3.connect(DB_FILE)
-        cursor = conn.cursor()
-        time_25h_ago = (datetime.now(timezone.utc) - timedelta(hours=25)).isoformat()
-        cursor.execute(
-            "DELETE FROM balance_history WHERE timestamp < ?",
-            (time_25h_ago,),
+        latest = {}
+        for part in get_history_store().map(query):
+            latest.update(part)
+        return latest
+    except Exception:
+        logging.exception("Error fetching latest snapshots")
+        return {}
+
+
+def save_balances(rows):
+    """Insert (address, balance, timestamp) rows, one transaction per shard."""
+    store = get_history_store()
+    groups = store.split(rows)
+
+    def write(conn, shard):
+        with tracing.span("db.insert_history", shard=shard, rows=len(groups[shard])):
+            conn.executemany(
+                "INSERT INTO balance_history (address, balance, timestamp) VALUES (?, ?, ?)",
+                groups[shard],
+            )
+            conn.commit()
+
+    try:
+        store.map(write, shards=groups)
+    except Exception:
+        logging.exception("Error saving %d balance snapshots", len(rows))
+
+
+def cleanup_old_records(now=None, shards=None):
+    """Remove records older than HISTORY_RETENTION_HOURS.
+
+    The newest row at or before the cutoff is kept for every address: it is
+    still the valid balance at the cutoff, and as-of lookups need it.
+    Status transitions follow ROLLUP_RETENTION_DAYS, keeping each address's
+    status at that cutoff the same way. `shards` limits the pass to some history shards (default: all); the
+    collector cleans one shard per poll so retention never locks the whole
+    fleet at once, and returns the freed pages of sharded files.
+    """
+    store = get_history_store()
+    now = now or datetime.now(timezone.utc)
+    cutoff = (now - timedelta(hours=HISTORY_RETENTION_HOURS)).isoformat()
+    rollup_cutoff = (now - timedelta(days=ROLLUP_RETENTION_DAYS)).isoformat()
+
+    def clean(conn, shard):
+        with tracing.span("db.cleanup", shard=shard) as trace:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                DELETE FROM balance_history
+                WHERE timestamp < :cutoff AND EXISTS (
+                    SELECT 1 FROM balance_history AS newer
+                    WHERE newer.address = balance_history.address
+                      AND newer.timestamp > balance_history.timestamp
+                      AND newer.timestamp <= :cutoff
+                )
+                """,
+                {"cutoff": cutoff},
+            )
+            trace.set(history_rows=cursor.rowcount)
+            cursor.execute("DELETE FROM balance_hourly WHERE hour < ?", (rollup_cutoff,))
+            trace.set(hourly_rows=cursor.rowcount)
+            cursor.execute(
+                """
+                DELETE FROM status_events
+                WHERE changed_at < :cutoff AND EXISTS (
+                    SELECT 1 FROM status_events AS newer
+                    WHERE newer.address = status_events.address
+                      AND newer.changed_at > status_events.changed_at
+                      AND newer.changed_at <= :cutoff
+                )
+                """,
+                {"cutoff": rollup_cutoff},
+            )
+            trace.set(status_rows=cursor.rowcount)
+            conn.commit()
+            if store.sharded:
+                cursor.execute("PRAGMA incremental_vacuum")
+
+    try:
+        store.map(clean, shards=shards)
+    except Exception:
+        logging.exception("Error cleaning up old records")
+
+
+def _history_query(table, time_column, address=None, since=None, until=None):
+    where, params = [], []
+    if address is not None:
+        where.append("address = ?")
+        params.append(address)
+    if since is not None:
+        where.append("{} >= ?".format(time_column))
+        params.append(since.isoformat())
+    if until is not None:
+        where.append("{} < ?".format(time_column))
+        params.append(until.isoformat())
+    sql = "SELECT * FROM {}".format(table)
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    return sql + " ORDER BY address, {}".format(time_column), params
+
+
+def _iter_sharded(table, time_column, address, since, until, columns):
+    store = get_history_store()
+    sql, params = _history_query(table, time_column, address, since, until)
+    sql = sql.replace("*", columns, 1)
+    if address is not None:
+        return iter(store.for_address(address).execute(sql, params))
+    cursors = [store.connection(k).execute(sql, params) for k in range(store.shards)]
+    position = columns.split(", ").index(time_column)
+    return heapq.merge(*cursors, key=lambda row: (row[0], row[position]))
+
+
+def iter_history(address=None, since=None, until=None):
+    """Yield (address, balance, timestamp) rows sorted by address and time.
+
+    Works across history shards (merged in order); `since`/`until` bound
+    the timestamp as [since, until).
+    """
+    return _iter_sharded(
+        "balance_history", "timestamp", address, since, until, "address, balance, timestamp"
+    )
+
+
+def iter_hourly(address=None, since=None, until=None):
+    """Yield balance_hourly rows sorted by address and hour, across shards."""
+    return _iter_sharded(
+        "balance_hourly", "hour", address, since, until,
+        "address, hour, open, high, low, close, samples",
+    )
+
+
+def count_history():
+    """Number of balance_history rows over all shards."""
+    return sum(
+        get_history_store().map(
+            lambda conn, shard: conn.execute("SELECT COUNT(*) FROM balance_history").fetchone()[0]
         )
+    )
+
+
+def clear_history():
+    """Delete every balance_history, balance_hourly and status_events row."""
+
+    def clear(conn, shard):
+        conn.execute("DELETE FROM balance_history")
+        conn.execute("DELETE FROM balance_hourly")
+        conn.execute("DELETE FROM status_events")
         conn.commit()
+
+    get_history_store().map(clear)
+
+
+def reshard_history(target_shards, drop_source=False, batch_size=50000, progress=None):
+    """Copy history from the current layout into `target_shards` shards.
+
+    The target must be empty. Run with the collector stopped, then set
+    HISTORY_SHARDS to the target. With drop_source the old rows (and old
+    shard files) are removed afterwards. progress(table, copied) is called
+    per batch. Returns {table: rows copied}.
+    """
+    source = get_history_store()
+    target = HistoryStore(DB_FILE, target_shards)
+    if target.shards == source.shards:
+        raise ValueError("history already has {} shard(s)".format(source.shards))
+    for shard in range(target.shards):
+        create_history_tables(target.connection(shard))
+        for table in ("balance_history", "balance_hourly", "status_events"):
+            if target.connection(shard).execute("SELECT 1 FROM {} LIMIT 1".format(table)).fetchone():
+                raise ValueError("{} in {} is not empty".format(table, target.paths[shard]))
+
+    copied = {}
+    for table, columns in (
+        ("balance_history", "address, balance, timestamp"),
+        ("balance_hourly", "address, hour, open, high, low, close, samples"),
+        ("status_events", "address, changed_at, status"),
+    ):
+        insert = "INSERT INTO {} ({}) VALUES ({})".format(
+            table, columns, ", ".join("?" * len(columns.split(", ")))
+        )
+        copied[table] = 0
+        for shard in range(source.shards):
+            cursor = source.connection(shard).execute("SELECT {} FROM {}".format(columns, table))
+            while True:
+                batch = cursor.fetchmany(batch_size)
+                if not batch:
+                    break
+                for k, rows in target.split(batch).items():
+                    target.connection(k).executemany(insert, rows)
+                copied[table] += len(batch)
+                if progress:
+                    progress(table, copied[table])
+        for shard in range(target.shards):
+            target.connection(shard).commit()
+
+    if drop_source:
+        if source.sharded:
+            source.close()
+            for path in source.paths:
+                for suffix in ("", "-wal", "-shm"):
+                    if os.path.exists(path + suffix):
+                        os.remove(path + suffix)
+        else:
+            clear_history()
+    target.close()
+    return copied
+
+
+def floor_hour(moment):
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def complete_history_since(now):
+    """First hour from which balance_history is complete at `now`.
+
+    cleanup_old_records() keeps only the newest row before its cutoff, so
+    earlier hours can no longer be rolled up exactly.
+    """
+    cutoff = now - timedelta(hours=HISTORY_RETENTION_HOURS)
+    start = floor_hour(cutoff)
+    return start if start == cutoff else start + timedelta(hours=1)
+
+
+HOURLY_ROLLUP_QUERY = """
+    SELECT address, balance, MAX(timestamp) FROM balance_history
+    WHERE timestamp < :since AND address BETWEEN :lo AND :hi GROUP BY address
+    UNION ALL
+    SELECT address, balance, timestamp FROM balance_history
+    WHERE timestamp >= :since AND timestamp < :until AND address BETWEEN :lo AND :hi
+    ORDER BY 1, 3
+"""
+
+
+def hourly_rollup(rows, since, until):
+    """Roll (address, balance, timestamp) rows up into balance_hourly rows.
+
+    `rows` are sorted by address and timestamp and hold, per address, the
+    last row before `since` (if any) and every row in [since, until). A row
+    is valid until the next one, so an hour's open is the balance carried in
+    from before it, and high/low span the open and every row in the hour.
+    Yields (address, hour, open, high, low, close, samples) for each hour
+    in [since, until) from the first one with data.
+    """
+    hours = []
+    hour = since
+    while hour < until:
+        hours.append(hour.isoformat())
+        hour += timedelta(hours=1)
+    if not hours:
+        return
+    ends = hours[1:] + [until.isoformat()]
+    address, values = None, []
+    for addr, balance, timestamp in rows:
+        if addr != address:
+            if address is not None:
+                yield from _rollup_address(address, values, hours, ends)
+            address, values = addr, []
+        values.append((timestamp, balance))
+    if address is not None:
+        yield from _rollup_address(address, values, hours, ends)
+
+
+def _rollup_address(address, values, hours, ends):
+    i, prev = 0, None
+    count = len(values)
+    while i < count and values[i][0] < hours[0]:
+        prev = values[i][1]
+        i += 1
+    for hour, end in zip(hours, ends):
+        first = i
+        while i < count and values[i][0] < end:
+            i += 1
+        if first == i:
+            if prev is not None:
+                yield (address, hour, prev, prev, prev, prev, 0)
+            continue
+        in_hour = [balance for _, balance in values[first:i]]
+        open_ = prev if prev is not None else in_hour[0]
+        prev = in_hour[-1]
+        yield (address, hour, open_, max(open_, *in_hour), min(open_, *in_hour), prev, len(in_hour))
+
+
+def _rollup_shard(db_file, lo, hi, since, until):
+    """Compute the balance_hourly rows of addresses in [lo, hi].
+
+    Runs in recompute worker processes over a read-only connection.
+    """
+    conn = sqlite3.connect("file:{}?mode=ro".format(pathname2url(db_file)), uri=True)
+    try:
+        rows = conn.execute(
+            HOURLY_ROLLUP_QUERY,
+            {"since": since.isoformat(), "until": until.isoformat(), "lo": lo, "hi": hi},
+        )
+        return list(hourly_rollup(rows, since, until))
+    finally:
         conn.close()
+
+
+def roll_up_hours(now=None, since=None):
+    """Add balance_hourly rows for the hours completed before `now`.
+
+    Without `since`, picks up after the newest hour already rolled up (per
+    history shard).
+    """
+    now = now or datetime.now(timezone.utc)
+    until = floor_hour(now)
+
+    def roll_up(conn, shard):
+        start = since
+        if start is None:
+            start = complete_history_since(now)
+            row = conn.execute("SELECT MAX(hour) FROM balance_hourly").fetchone()
+            if row[0]:
+                start = max(start, datetime.fromisoformat(row[0]) + timedelta(hours=1))
+        if start >= until:
+            return
+        with tracing.span("db.rollup", shard=shard, since=start.isoformat()) as trace:
+            rows = conn.execute(
+                HOURLY_ROLLUP_QUERY,
+                {
+                    "since": start.isoformat(),
+                    "until": until.isoformat(),
+                    "lo": "",
+                    "hi": "\U0010ffff",  # sorts after any address
+                },
+            ).fetchall()
+            hourly = list(hourly_rollup(rows, start, until))
+            conn.executemany(
+                "INSERT OR REPLACE INTO balance_hourly VALUES (?, ?, ?, ?, ?, ?, ?)", hourly
+            )
+            conn.commit()
+            trace.set(history_rows=len(rows), hourly_rows=len(hourly))
+
+    try:
+        get_history_store().map(roll_up)
     except Exception:
-        logging.exception("Error cleaning up old records")
+        logging.exception("Error rolling up hourly balances")
+
+
+def _create_recompute_tables(conn):
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS recompute_job (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            since TEXT NOT NULL,
+            until TEXT NOT NULL
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS recompute_shards (
+            shard INTEGER PRIMARY KEY,
+            lo TEXT NOT NULL,
+            hi TEXT NOT NULL,
+            done INTEGER NOT NULL DEFAULT 0
+        )
+        """
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS balance_hourly_staging AS SELECT * FROM balance_hourly WHERE 0"
+    )
+
+
+def recompute_rollups(since=None, until=None, workers=None, shards=None, restart=False, progress=None):
+    """Rebuild balance_hourly for [since, until) from balance_history.
+
+    Addresses are split into `shards` contiguous ranges computed on a pool
+    of `workers` processes (0: in this process, the serial path); each
+    worker reads over its own read-only connection and returns its rows.
+    This process is the only writer: each finished range goes into a
+    staging table together with its checkpoint, and one transaction swaps
+    the staged rows in at the end. With sharded history every history file
+    gets its share of the ranges, its own checkpoints and its own swap, so
+    the swap is atomic per file. An interrupted run resumes from its
+    checkpoints (with its original range) unless `restart` is set.
+    progress(done, total, rows) is called after every range. Returns the
+    number of rows written.
+    """
+    workers = os.cpu_count() if workers is None else workers
+    store = get_history_store()
+    conns = [store.connection(k) for k in range(store.shards)]
+    for conn in conns:
+        _create_recompute_tables(conn)
+    jobs = [conn.execute("SELECT since, until FROM recompute_job").fetchone() for conn in conns]
+    job = next((job for job in jobs if job), None)
+    if job and not restart:
+        since, until = (datetime.fromisoformat(value) for value in job)
+        logging.info("Resuming recompute of %s .. %s", job[0], job[1])
+        # Files without a job were already swapped in.
+        active = [k for k, job in enumerate(jobs) if job]
+    else:
+        now = datetime.now(timezone.utc)
+        since = since or complete_history_since(now)
+        until = until or floor_hour(now)
+        shards = shards or max(1, workers) * 4
+        per_store = -(-shards // store.shards)
+        for conn in conns:
+            addresses = [
+                row[0]
+                for row in conn.execute("SELECT DISTINCT address FROM balance_history ORDER BY address")
+            ]
+            size = -(-len(addresses) // per_store) or 1
+            ranges = [
+                (k, chunk[0], chunk[-1])
+                for k, chunk in enumerate(
+                    addresses[i:i + size] for i in range(0, len(addresses), size)
+                )
+            ]
+            with conn:
+                conn.execute("DELETE FROM recompute_job")
+                conn.execute("DELETE FROM recompute_shards")
+                conn.execute("DELETE FROM balance_hourly_staging")
+                conn.execute(
+                    "INSERT INTO recompute_job VALUES (1, ?, ?)",
+                    (since.isoformat(), until.isoformat()),
+                )
+                conn.executemany("INSERT INTO recompute_shards (shard, lo, hi) VALUES (?, ?, ?)", ranges)
+        active = list(range(store.shards))
+
+    total = done = written = 0
+    todo = []
+    for k in active:
+        conn = conns[k]
+        units = conn.execute("SELECT COUNT(*) FROM recompute_shards").fetchone()[0]
+        pending = conn.execute(
+            "SELECT shard, lo, hi FROM recompute_shards WHERE done = 0 ORDER BY shard"
+        ).fetchall()
+        total += units
+        done += units - len(pending)
+        written += conn.execute("SELECT COUNT(*) FROM balance_hourly_staging").fetchone()[0]
+        todo.extend((k, shard, lo, hi) for shard, lo, hi in pending)
+
+    def finish(k, shard, rows):
+        nonlocal done, written
+        conn = conns[k]
+        with conn:
+            conn.executemany("INSERT INTO balance_hourly_staging VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            conn.execute("UPDATE recompute_shards SET done = 1 WHERE shard = ?", (shard,))
+        done += 1
+        written += len(rows)
+        if progress:
+            progress(done, total, written)
+
+    if workers:
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(_rollup_shard, store.paths[k], lo, hi, since, until): (k, shard)
+                for k, shard, lo, hi in todo
+            }
+            for future in as_completed(futures):
+                finish(*futures[future], future.result())
+    else:
+        for k, shard, lo, hi in todo:
+            finish(k, shard, _rollup_shard(store.paths[k], lo, hi, since, until))
+
+    for k in active:
+        with conns[k] as conn:
+            conn.execute(
+                "DELETE FROM balance_hourly WHERE hour >= ? AND hour < ?",
+                (since.isoformat(), until.isoformat()),
+            )
+            conn.execute(
+                "INSERT INTO balance_hourly SELECT * FROM balance_hourly_staging ORDER BY address, hour"
+            )
+            conn.execute("DELETE FROM balance_hourly_staging")
+            conn.execute("DELETE FROM recompute_shards")
+            conn.execute("DELETE FROM recompute_job")
+    return written
+
+
+def save_snapshot(data, taken_at, generation):
+    """Persist the processed fleet as zlib-compressed JSON for warm starts."""
+    try:
+        payload = zlib.compress(
+            json.dumps(data, separators=(",", ":")).encode("utf-8"), 6
+        )
+        conn = get_db()
+        with tracing.span("db.save_snapshot", rows=len(data), bytes=len(payload)):
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO fleet_snapshot (id, generation, taken_at, payload)
+                VALUES (1, ?, ?, ?)
+                """,
+                (generation, taken_at, payload),
+            )
+            conn.commit()
+    except Exception:
+        logging.exception("Error saving fleet snapshot")
+
+
+def load_snapshot():
+    """Return (data, taken_at, generation) of the last persisted fleet, or None."""
+    try:
+        conn = get_db()
+        row = conn.execute(
+            "SELECT payload, taken_at, generation FROM fleet_snapshot WHERE id = 1"
+        ).fetchone()
+        if not row:
+            return None
+        data = json.loads(zlib.decompress(row[0]).decode("utf-8"))
+        return data, row[1], row[2]
+    except Exception:
+        logging.exception("Error loading fleet snapshot")
+        return None
+
+
+def save_source_status():
+    """Persist per-source status so every worker can report it."""
+    with _source_lock:
+        rows = [(name, json.dumps(st)) for name, st in source_status.items()]
+    try:
+        conn = get_db()
+        conn.executemany(
+            "INSERT OR REPLACE INTO source_status (name, status) VALUES (?, ?)",
+            rows,
+        )
+        conn.commit()
+    except Exception:
+        logging.exception("Error saving source status")
+
+
+def load_source_status():
+    """Return the persisted status of the configured sources, in config order."""
+    try:
+        rows = dict(get_db().execute("SELECT name, status FROM source_status"))
+    except Exception:
+        logging.exception("Error loading source status")
+        rows = {}
+    now = datetime.now(timezone.utc)
+    statuses = []
+    for source in get_sources():
+        status = json.loads(rows.get(source["name"], "null")) or {
+            "name": source["name"],
+            "url": source["url"],
+            "ok": None,
+        }
+        age = None
+        if status.get("last_success"):
+            taken = datetime.fromisoformat(status["last_success"])
+            age = max(0, int((now - taken).total_seconds()))
+        status["age_seconds"] = age
+        statuses.append(status)
+    return statuses
+
+
+def save_poll_stats(finished_at, timings):
+    """Persist the stage timings of the last poll cycle."""
+    global _poll_finished
+    try:
+        conn = get_db()
+        conn.execute(
+            "INSERT OR REPLACE INTO poll_stats (id, finished_at, timings) VALUES (1, ?, ?)",
+            (finished_at, json.dumps(timings)),
+        )
+        conn.commit()
+    except Exception:
+        logging.exception("Error saving poll stats")
+    _poll_finished = (time.monotonic(), finished_at)
+
+
+def last_poll_finished(reread=True):
+    """finished_at of the last poll cycle in any process, or None.
+
+    Exact in the process that polled; others re-read it at most once per
+    second. With reread=False the value last read is returned without
+    touching the database (for asgi.py's event loop).
+    """
+    global _poll_finished
+    checked, finished = _poll_finished
+    now = time.monotonic()
+    if reread and now - checked >= 1.0:
+        stats = load_poll_stats()
+        finished = stats["finished_at"] if stats else None
+        _poll_finished = (now, finished)
+    return finished
+
+
+def load_poll_stats():
+    """Return {"finished_at", "timings_ms"} of the last poll cycle, or None."""
+    try:
+        row = get_db().execute(
+            "SELECT finished_at, timings FROM poll_stats WHERE id = 1"
+        ).fetchone()
+    except Exception:
+        logging.exception("Error loading poll stats")
+        return None
+    if not row:
+        return None
+    return {"finished_at": row[0], "timings_ms": json.loads(row[1])}
+
+
+def request_poll_profiles(count, mode=None):
+    """Ask whichever process runs the next poll cycle to profile `count` cycles.
+
+    Poll cycles run in the collector, usually not the worker that answered
+    /admin/profile, so the request is left in the database.
+    """
+    conn = get_db()
+    conn.execute(
+        "INSERT OR REPLACE INTO poll_profile_request (id, count, mode) VALUES (1, ?, ?)",
+        (max(0, int(count)), mode),
+    )
+    conn.commit()
+
+
+def pending_poll_profiles():
+    """Poll profiles requested but not yet taken up by a polling process."""
+    try:
+        row = get_db().execute("SELECT count FROM poll_profile_request WHERE id = 1").fetchone()
+    except Exception:
+        logging.exception("Error reading poll profile request")
+        return 0
+    return row[0] if row else 0
+
+
+def claim_poll_profiles():
+    """Arm this process's profiler with a pending request_poll_profiles()."""
+    try:
+        conn = get_db()
+        row = conn.execute("SELECT count, mode FROM poll_profile_request WHERE id = 1").fetchone()
+        if row is None:
+            return
+        claimed = conn.execute(
+            "DELETE FROM poll_profile_request WHERE id = 1 AND count = ? AND mode IS ?", row
+        ).rowcount
+        conn.commit()
+    except Exception:
+        logging.exception("Error claiming poll profile request")
+        return
+    if claimed:
+        profiler.arm("poll", row[0], mode=row[1])
+
+
+def snapshot_generation():
+    """Return the generation of the persisted snapshot (0 if none)."""
+    try:
+        row = get_db().execute(
+            "SELECT generation FROM fleet_snapshot WHERE id = 1"
+        ).fetchone()
+        return row[0] if row else 0
+    except Exception:
+        logging.exception("Error reading snapshot generation")
+        return 0
+
+
+def restore_snapshot():
+    """Serve the last processed fleet until the first poll completes."""
+    global orchestrators_data, last_update, data_generation
+    snapshot = load_snapshot()
+    if snapshot is None:
+        return False
+    orchestrators_data, last_update, data_generation = snapshot
+    logging.info(
+        "Restored %d orchestrators from snapshot taken at %s",
+        len(orchestrators_data),
+        last_update,
+    )
+    return True
+
+
+def data_age_seconds(now=None):
+    """Seconds since the data currently being served was fetched."""
+    if not last_update:
+        return None
+    try:
+        taken = datetime.fromisoformat(last_update)
+    except ValueError:
+        return None
+    if taken.tzinfo is None:
+        taken = taken.replace(tzinfo=timezone.utc)
+    now = now or datetime.now(timezone.utc)
+    return max(0, int((now - taken).total_seconds()))
+
+
+def format_age(seconds):
+    """Format an age in seconds as a short human string."""
+    if seconds is None:
+        return "never"
+    if seconds < 60:
+        return "{}s ago".format(seconds)
+    if seconds < 3600:
+        return "{}m ago".format(seconds // 60)
+    if seconds < 86400:
+        return "{}h {}m ago".format(seconds // 3600, (seconds % 3600) // 60)
+    return "{}d {}h ago".format(seconds // 86400, (seconds % 86400) // 3600)
 
 
 def format_timestamp(timestamp_str):
@@ -171,388 +1494,698 @@ def format_timestamp(timestamp_str):
         return timestamp_str
 
 
-def fetch_orchestrators():
-    """Background loop that fetches orchestrator data and updates balances."""
-    global orchestrators_data, last_update
+def get_sources():
+    """Return the configured upstream sources as a list of dicts."""
+    if API_SOURCES:
+        try:
+            sources = json.loads(API_SOURCES)
+            return [
+                {
+                    "name": str(src.get("name") or "source-{}".format(i + 1)),
+                    "url": src["url"],
+                    "token": src.get("token", ""),
+                }
+                for i, src in enumerate(sources)
+            ]
+        except (ValueError, TypeError, KeyError, AttributeError):
+            logging.exception("Invalid API_SOURCES, falling back to API_URL")
+    return [{"name": "default", "url": API_URL, "token": ADMIN_TOKEN}]
+
+
+def get_recorder():
+    """The payload recorder for RECORD_DIR, or None when recording is off."""
+    global _recorder
+    if not RECORD_DIR:
+        return None
+    if _recorder is None or _recorder.directory != RECORD_DIR:
+        _recorder = recording.Recorder(RECORD_DIR)
+    return _recorder
+
+
+def parse_payload(raw):
+    """Decode an upstream response body into its list of orchestrators."""
+    data = json.loads(raw)
+    if isinstance(data, dict) and "orchestrators" in data:
+        data = data["orchestrators"]
+    elif not isinstance(data, list):
+        data = []
+    return data
+
+
+def fetch_source(source):
+    """Fetch one upstream API and return its list of orchestrators."""
+    headers = {"X-Admin-Token": source["token"]}
+    attributes = {"source": source["name"], "http.url": source["url"]}
+    with tracing.span("upstream", tracing.CLIENT, **attributes) as call:
+        response = get_http_session().get(
+            source["url"], headers=headers, timeout=SOURCE_TIMEOUT
+        )
+        call.set(**{
+            "http.status_code": response.status_code,
+            "http.response_content_length": len(response.content),
+        })
+    if response.status_code != 200:
+        raise RuntimeError("HTTP {}".format(response.status_code))
+    recorder = get_recorder()
+    if recorder is not None:
+        try:
+            _record_local.sha = recorder.store(response.content)
+        except OSError:
+            logging.exception("Error recording payload from %s", source["name"])
+    with span("parse", bytes=len(response.content)) as decode:
+        data = parse_payload(response.content)
+        decode.set(orchestrators=len(data))
+    return data
+
+
+def _run_source(source):
+    """Fetch one source in a worker thread and record the outcome."""
+    name = source["name"]
+    started = time.monotonic()
+    data, error = None, None
+    _record_local.sha = None
+    with profiling.record_timings() as timings:
+        try:
+            data = fetch_source(source)
+        except Exception as exc:
+            error = exc
+    latency_ms = round((time.monotonic() - started) * 1000, 1)
+    now = datetime.now(timezone.utc).isoformat()
+    with _source_lock:
+        _source_futures.pop(name, None)
+        status = source_status.setdefault(name, {"name": name})
+        status["url"] = source["url"]
+        status["latency_ms"] = latency_ms
+        status["parse_ms"] = round(timings.get("parse", 0.0) * 1000, 1)
+        status["last_attempt"] = now
+        if error is None:
+            _source_results[name] = (data, now, _record_local.sha)
+            status.update(ok=True, last_success=now, last_error=None, count=len(data))
+        else:
+            status.update(ok=False, last_error=str(error))
+    if error is not None:
+        logging.warning("Source %s failed: %s", name, error)
+
+
+def fetch_sources():
+    """Fetch every source concurrently and merge the results.
+
+    Each source gets at most SOURCE_TIMEOUT seconds. A source that is slow
+    or failing keeps contributing its last good result, and a request still
+    running from an earlier cycle is not started again. A source this
+    process has not fetched successfully yet (after a restart, or on a
+    /refresh in a worker other than the collector) keeps the records it
+    contributed to the fleet being served. Returns None when no source
+    produced anything new this cycle.
+    """
+    global _source_executor
+    sources = get_sources()
+    if _source_executor is None:
+        _source_executor = ThreadPoolExecutor(
+            max_workers=max(4, len(sources)), thread_name_prefix="source"
+        )
 
-    # Wait for DB initialization
-    while not db_initialized:
-        time.sleep(1)
+    pending = []
+    for source in sources:
+        with _source_lock:
+            future = _source_futures.get(source["name"])
+            if future is None:
+                future = _source_executor.submit(profiler.wrap(tracing.wrap(_run_source)), source)
+                _source_futures[source["name"]] = future
+        pending.append(future)
+    wait(pending, timeout=SOURCE_TIMEOUT)
+
+    with _source_lock:
+        stamps = {name: r[1] for name, r in _source_results.items()}
+        if stamps == _merged_stamps:
+            return None
+        for name, stamp in stamps.items():
+            if _merged_stamps.get(name) != stamp:
+                add_timing("parse", source_status[name].get("parse_ms", 0.0) / 1000)
+        _merged_stamps.clear()
+        _merged_stamps.update(stamps)
+        results = []
+        del _last_merged[:]
+        for src in sources:
+            name = src["name"]
+            if name in _source_results:
+                data, fetched_at, sha = _source_results[name]
+            else:
+                data = [o for o in orchestrators_data if o.get("source") == name]
+                fetched_at, sha = None, None
+                if not data:
+                    continue
+            results.append((name, data))
+            _last_merged.append({"name": name, "sha": sha, "fetched_at": fetched_at})
+    return merge_sources(results)
+
+
+def merge_sources(results):
+    """Merge (source name, orchestrators) pairs, deduplicating by address.
+
+    When an address is reported by several sources the copy with the most
+    recent last_healthy_at wins, ties going to the earlier source.
+    """
+    merged = {}
+    for name, orchestrators in results:
+        for o in orchestrators:
+            o = dict(o)
+            o["source"] = name
+            addr = o.get("address", "")
+            current = merged.get(addr)
+            if current is None or (o.get("last_healthy_at") or "") > (
+                current.get("last_healthy_at") or ""
+            ):
+                merged[addr] = o
+    return list(merged.values())
+
+
+def use_columnar():
+    """True when polls should be processed with the NumPy backend."""
+    if COLUMNAR_BACKEND == "off":
+        return False
+    import columnar
+    return columnar.available()
+
+
+def drain_hours(balance, change_24h):
+    """Hours until empty at the last 24h burn rate, or None if not draining."""
+    if change_24h >= 0:
+        return None
+    return balance / (-change_24h / 24.0)
+
+
+def process_fleet(data, now=None):
+    """Compute 24h changes, store snapshots and sort the fleet in place."""
+    now = now or datetime.now(timezone.utc)
+    if use_columnar():
+        _process_fleet_columnar(data, now)
+    else:
+        delta_s = persist_s = 0.0
+        clock = time.perf_counter
+        for o in data:
+            addr = o.get("address", "")
+            current_balance = float(o.get("balance_eth", 0.0))
+
+            started = clock()
+            bal_24 = get_balance_24h_ago(addr, reference_time=now)
+            if bal_24 is None:
+                balance_change = 0.0
+            else:
+                balance_change = current_balance - bal_24
+
+            o["balance_change_24h"] = balance_change
+            o["drain_hours"] = drain_hours(current_balance, balance_change)
+
+            saved = clock()
+            save_balance(addr, current_balance, timestamp=now)
+            delta_s += saved - started
+            persist_s += clock() - saved
+
+            # Pre-format health timestamp
+            o["last_healthy_at_formatted"] = format_timestamp(o.get("last_healthy_at"))
+        add_timing("delta", delta_s)
+        add_timing("persist", persist_s)
+
+    with span("status"):
+        record_status_changes(data, now)
+
+    # Sort orchestrators by health status then by ID
+    with span("sort", orchestrators=len(data)):
+        data.sort(
+            key=lambda x: (
+                x.get("last_healthy_at") is None,
+                x.get("orchestrator_id", "").lower(),
+            )
+        )
 
-    while True:
-        try:
-            headers = {"X-Admin-Token": ADMIN_TOKEN}
-            response = requests.get(API_URL, headers=headers, timeout=10)
-
-            if response.status_code == 200:
-                data = response.json()
-                if isinstance(data, dict) and "orchestrators" in data:
-                    data = data["orchestrators"]
-                elif not isinstance(data, list):
-                    data = []
-
-                for o in data:
-                    addr = o.get("address", "")
-                    current_balance = float(o.get("balance_eth", 0.0))
-
-                    bal_24 = get_balance_24h_ago(addr)
-                    if bal_24 is None:
-                        balance_change = 0.0
-                    else:
-                        balance_change = current_balance - bal_24
-
-                    o["balance_change_24h"] = balance_change
-
-                    # Save hourly snapshot
-                    save_balance(addr, current_balance)
-
-                    # Pre-format health timestamp
-                    o["last_healthy_at_formatted"] = format_timestamp(
-                        o.get("last_healthy_at")
-                    )
-
-                # Sort orchestrators by health status then by ID
-                data.sort(
-                    key=lambda x: (
-                        x.get("last_healthy_at") is None,
-                        x.get("orchestrator_id", "").lower(),
-                    )
+
+def record_status_changes(data, now):
+    """Add a status_events row for each address whose status changed.
+
+    The first poll that sees an address records its initial status.
+    """
+    store = get_history_store()
+
+    def latest(conn, shard):
+        with tracing.span("db.latest_status", shard=shard) as trace:
+            known = {
+                addr: status
+                for addr, status, _ in conn.execute(
+                    "SELECT address, status, MAX(changed_at) FROM status_events GROUP BY address"
+                )
+            }
+            trace.set(rows=len(known))
+        return known
+
+    try:
+        known = {}
+        for part in store.map(latest):
+            known.update(part)
+        changed_at = now.isoformat()
+        rows = []
+        for o in data:
+            addr, status = o.get("address", ""), status_code(o)
+            if known.get(addr) != status:
+                rows.append((addr, changed_at, status))
+        if not rows:
+            return
+        groups = store.split(rows)
+
+        def write(conn, shard):
+            with tracing.span("db.insert_status", shard=shard, rows=len(groups[shard])):
+                conn.executemany(
+                    "INSERT OR REPLACE INTO status_events (address, changed_at, status) VALUES (?, ?, ?)",
+                    groups[shard],
                 )
+                conn.commit()
+
+        store.map(write, shards=groups)
+    except Exception:
+        logging.exception("Error recording status changes")
+
+
+def _process_fleet_columnar(data, now):
+    """Vectorized process_fleet: batched history reads, one batched write."""
+    import columnar
+    import numpy as np
+
+    with span("delta"):
+        frame = columnar.FleetFrame(data)
+        change = frame.compute_deltas(frame.align(get_balances_24h_ago_all(now)))
+        drain = frame.drain_hours()
+
+    with span("persist"):
+        latest = get_latest_all()
+        due = get_snapshot_policy().due_mask(
+            frame.balance,
+            frame.align({addr: row[0] for addr, row in latest.items()}),
+            frame.align_text({addr: row[1] for addr, row in latest.items()}),
+            now,
+        )
+        timestamp = now.isoformat()
+        save_balances(
+            [
+                (frame.addresses[i], float(frame.balance[i]), timestamp)
+                for i in np.flatnonzero(due)
+            ]
+        )
 
-                orchestrators_data = data
-                last_update = datetime.now(timezone.utc).isoformat()
+    for o, delta, hours in zip(data, change.tolist(), drain.tolist()):
+        o["balance_change_24h"] = delta
+        o["drain_hours"] = None if hours != hours else hours
+        o["last_healthy_at_formatted"] = format_timestamp(o.get("last_healthy_at"))
+
+
+def fleet_summary(fleet, drain_warning_hours=24.0):
+    """Fleet-wide aggregates, vectorized when the columnar backend is on."""
+    if use_columnar():
+        import columnar
+
+        return columnar.FleetFrame(fleet).summary(drain_warning_hours)
+
+    summary = dict(fleet_stats(fleet))
+    summary.update(
+        total_balance_eth=0.0, total_change_24h=0.0, draining=0, draining_soon=0
+    )
+    for o in fleet:
+        balance = float(o.get("balance_eth", 0.0))
+        change = o.get("balance_change_24h", 0.0)
+        summary["total_balance_eth"] += balance
+        summary["total_change_24h"] += change
+        hours = drain_hours(balance, change)
+        if hours is not None:
+            summary["draining"] += 1
+            if hours < drain_warning_hours:
+                summary["draining_soon"] += 1
+    return summary
+
+
+def publish_fleet(data, taken_at=None):
+    """Persist the processed fleet and make it the one being served."""
+    global orchestrators_data, last_update, data_generation
+    taken_at = (taken_at or datetime.now(timezone.utc)).isoformat()
+    with span("persist"):
+        save_snapshot(data, taken_at, data_generation + 1)
+    orchestrators_data = data
+    last_update = taken_at
+    data_generation += 1
+
+
+def poll_once():
+    """Run one poll cycle; return True when a new fleet was published.
+
+    Stage timings (fetch, parse, delta, persist, status, sort,
+    search_index, rollup, sparklines, cleanup) are kept in
+    last_poll_timings and reported by /api/status. With TRACE_DIR set the
+    cycle is also exported as one "poll_cycle" trace (see tracing.py).
+    """
+    global last_poll_timings
+    claim_poll_profiles()
+    with profiler.profile("poll"), profiling.record_timings() as timings, \
+            tracing.trace("poll_cycle") as cycle:
+        started = time.perf_counter()
+        with span("fetch"):
+            data = fetch_sources()
+        save_source_status()
+        published = data is not None
+        cycle.set(published=published)
+        if published:
+            now = datetime.now(timezone.utc)
+            record_poll(now)
+            # The fetch above mostly waits on the network; hold web requests
+            # back only for the CPU and database work from here on.
+            with get_admission().collector_priority():
+                process_fleet(data, now=now)
+                publish_fleet(data, taken_at=now)
                 logging.info(
                     "Fetched %d orchestrators (last_update=%s)",
                     len(data),
                     last_update,
                 )
+                cycle.set(orchestrators=len(data), generation=data_generation)
+                with span("search_index"):
+                    update_search_index()
+                with span("rollup"):
+                    roll_up_hours(now)
+                with span("sparklines"):
+                    fleet_sparklines()
+                with span("cleanup"):
+                    cleanup_old_records(now=now, shards=get_history_store().next_cleanup())
+        timings["total"] = time.perf_counter() - started
+    last_poll_timings = {name: round(sec * 1000, 2) for name, sec in timings.items()}
+    save_poll_stats(datetime.now(timezone.utc).isoformat(), last_poll_timings)
+    return published
+
+
+def record_poll(now):
+    """Append the payloads behind this poll cycle to the recording."""
+    recorder = get_recorder()
+    if recorder is None:
+        return
+    with _source_lock:
+        sources = [dict(entry) for entry in _last_merged]
+    if any(entry["sha"] is None for entry in sources):
+        # A payload fetched before recording was switched on.
+        logging.warning("Not recording poll at %s: payload missing", now.isoformat())
+        return
+    try:
+        recorder.append(now.isoformat(), sources)
+    except OSError:
+        logging.exception("Error recording poll")
 
-                cleanup_old_records()
 
-        except Exception:
-            logging.exception("Error fetching orchestrators")
+def next_snapshot_due():
+    """Earliest time the snapshot policy writes a row for an unchanged balance.
 
-        time.sleep(UPDATE_INTERVAL)
+    None when it never does (change-only without heartbeat).
+    """
+    policy = get_snapshot_policy()
+    if policy.max_age is None:
+        return None
+    oldest = [
+        row[0]
+        for row in get_history_store().map(
+            lambda conn, shard: conn.execute(
+                """
+                SELECT MIN(latest) FROM (
+                    SELECT MAX(timestamp) AS latest FROM balance_history GROUP BY address
+                )
+                """
+            ).fetchone()
+        )
+        if row and row[0] is not None
+    ]
+    if not oldest:
+        return datetime.min.replace(tzinfo=timezone.utc)
+    return datetime.fromisoformat(min(oldest)) + policy.max_age
+
+
+def replay_log(directory, until=None):
+    """Feed a recording through the poll pipeline on its own clock.
+
+    Every recorded poll is merged and processed with now= its recorded time,
+    so balance_history comes out as if the polls had just happened under
+    the current delta logic and snapshot policy. A poll whose payloads are
+    identical to the previous one can only write rows through the policy's
+    heartbeat, so it is skipped until one comes due. The last poll is
+    published as the served fleet and every replayed hour is rolled up into
+    balance_hourly. Returns counts of processed and skipped polls.
+    """
+    log = recording.Recording(directory)
+    stats = {"polls": 0, "processed": 0, "skipped": 0}
+    previous = data = now = first = None
+    next_due = None
+    pending = None  # last entry when it was skipped
+    for entry in log.entries():
+        taken_at = datetime.fromisoformat(entry["t"])
+        if until is not None and taken_at > until:
+            break
+        now = taken_at
+        first = first or now
+        stats["polls"] += 1
+        key = [(src["name"], src["sha"]) for src in entry["sources"]]
+        if key == previous and (next_due is None or now < next_due):
+            stats["skipped"] += 1
+            pending = entry
+            continue
+        data = merge_sources(
+            [(src["name"], log.payload(src["sha"], parse_payload)) for src in entry["sources"]]
+        )
+        process_fleet(data, now=now)
+        stats["processed"] += 1
+        previous, pending = key, None
+        next_due = next_snapshot_due()
+    if pending is not None:
+        # Re-derive the 24h changes as of the last poll; writes nothing.
+        data = merge_sources(
+            [(src["name"], log.payload(src["sha"], parse_payload)) for src in pending["sources"]]
+        )
+        process_fleet(data, now=now)
+    if data is not None:
+        publish_fleet(data, taken_at=now)
+        # History is complete until the cleanup below, so every replayed
+        # hour can be rolled up.
+        roll_up_hours(now, since=floor_hour(first))
+        cleanup_old_records(now=now)
+    return stats
+
+
+def seconds_since_last_poll():
+    """Seconds since any process finished a poll cycle (None if never)."""
+    stats = load_poll_stats()
+    if not stats:
+        return None
+    finished = datetime.fromisoformat(stats["finished_at"])
+    return (datetime.now(timezone.utc) - finished).total_seconds()
 
 
-HTML_TEMPLATE = """
-<!DOCTYPE html>
-<html lang="en">
-<head>
-<meta charset="UTF-8">
-<meta name="viewport" content="width=device-width, initial-scale=1.0">
-<title>Orchestrators ETH Balances</title>
-<link href="https://fonts.googleapis.com/css2?family=Inter:wght@300;400;600;700&display=swap" rel="stylesheet">
-<style>
-* {
-    margin: 0;
-    padding: 0;
-    box-sizing: border-box;
-}
-
-body {
-    font-family: 'Inter', -apple-system, 'Segoe UI', Roboto, 'Helvetica Neue', Arial, sans-serif;
-    background: linear-gradient(135deg, #0f172a 0%, #1e293b 100%);
-    color: #e2e8f0;
-    padding: 20px;
-    min-height: 100vh;
-}
-
-.container {
-    max-width: 1600px;
-    margin: 0 auto;
-}
-
-.header {
-    background: rgba(255, 255, 255, 0.05);
-    backdrop-filter: blur(10px);
-    border: 1px solid rgba(255, 255, 255, 0.1);
-    border-radius: 16px;
-    padding: 30px;
-    margin: 0 auto 30px;
-    max-width: 1100px;
-    box-shadow: 0 20px 60px rgba(0, 0, 0, 0.3);
-    display: flex;
-    flex-direction: column;
-    align-items: center;
-    justify-content: center;
-    text-align: center;
-}
-
-.header h1 {
-    font-size: 28px;
-    font-weight: 700;
-    color: #f1f5f9;
-    margin-bottom: 8px;
-}
-
-.header .subtitle {
-    color: #94a3b8;
-    font-size: 14px;
-}
-
-.stats {
-    display: grid;
-    grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
-    gap: 20px;
-    margin-bottom: 30px;
-}
-
-.stats, .table-container {
-    max-width: 1100px;
-    margin: 0 auto 30px;
-}
-
-.stat-card {
-    background: rgba(255, 255, 255, 0.05);
-    backdrop-filter: blur(10px);
-    border: 1px solid rgba(255, 255, 255, 0.08);
-    border-radius: 14px;
-    padding: 10px 16px;
-    box-shadow: 0 6px 26px rgba(0, 0, 0, 0.18);
-    text-align: center;
-}
-
-.stat-card .label {
-    color: #94a3b8;
-    font-size: 12px;
-    font-weight: 600;
-    text-transform: uppercase;
-    letter-spacing: 0.5px;
-    margin-bottom: 4px;
-}
-
-.stat-card .value {
-    color: #f1f5f9;
-    font-size: 26px;
-    font-weight: 700;
-}
-
-.table-container {
-    background: rgba(255, 255, 255, 0.05);
-    backdrop-filter: blur(10px);
-    border: 1px solid rgba(255, 255, 255, 0.1);
-    border-radius: 16px;
-    overflow: hidden;
-    box-shadow: 0 20px 60px rgba(0, 0, 0, 0.3);
-}
-
-table {
-    width: 100%;
-    border-collapse: collapse;
-}
-
-thead {
-    background: rgba(255, 255, 255, 0.08);
-}
-
-th {
-    padding: 14px 16px;
-    text-align: left;
-    font-weight: 600;
-    font-size: 12px;
-    color: #cbd5e1;
-    text-transform: uppercase;
-    letter-spacing: 0.5px;
-    border-bottom: 1px solid rgba(255, 255, 255, 0.1);
-}
-
-td {
-    padding: 12px 16px;
-    color: #e2e8f0;
-    font-size: 14px;
-    border-bottom: 1px solid rgba(255, 255, 255, 0.05);
-}
-
-tbody tr {
-    transition: all 0.2s ease;
-}
-
-tbody tr:hover {
-    background: rgba(255, 255, 255, 0.08);
-}
-
-tbody tr:last-child td {
-    border-bottom: none;
-}
-
-.badge {
-    display: inline-block;
-    padding: 4px 10px;
-    border-radius: 8px;
-    font-size: 12px;
-    font-weight: 600;
-}
-
-.badge-success {
-    background: rgba(34, 197, 94, 0.2);
-    color: #86efac;
-    border: 1px solid rgba(34, 197, 94, 0.3);
-}
-
-.badge-danger {
-    background: rgba(239, 68, 68, 0.2);
-    color: #fca5a5;
-    border: 1px solid rgba(239, 68, 68, 0.3);
-}
-
-.badge-warning {
-    background: rgba(251, 191, 36, 0.2);
-    color: #fde047;
-    border: 1px solid rgba(251, 191, 36, 0.3);
-}
-
-.address {
-    font-family: 'Courier New', monospace;
-    color: #94a3b8;
-    font-size: 13px;
-}
-
-.balance-positive {
-    color: #86efac;
-    font-weight: 600;
-}
-
-.balance-negative {
-    color: #fca5a5;
-    font-weight: 600;
-}
-
-.balance-zero {
-    color: #94a3b8;
-}
-
-.orch-name {
-    font-weight: 600;
-    color: #f1f5f9;
-}
-
-@media (max-width: 768px) {
-    .header h1 {
-        font-size: 20px;
-    }
+def seconds_since_last_refresh():
+    """Seconds since any process finished a POST /refresh poll (None if never)."""
+    try:
+        row = get_db().execute("SELECT finished_at FROM refresh_stats WHERE id = 1").fetchone()
+    except Exception:
+        logging.exception("Error loading refresh stats")
+        return None
+    if not row:
+        return None
+    finished = datetime.fromisoformat(row[0])
+    return (datetime.now(timezone.utc) - finished).total_seconds()
 
-    table {
-        font-size: 12px;
-    }
 
-    th, td {
-        padding: 10px 8px;
-    }
+def save_refresh_stats(finished_at):
+    try:
+        conn = get_db()
+        conn.execute(
+            "INSERT OR REPLACE INTO refresh_stats (id, finished_at) VALUES (1, ?)", (finished_at,)
+        )
+        conn.commit()
+    except Exception:
+        logging.exception("Error saving refresh stats")
+
+
+class _PollFileLock:
+    """Exclusive lock shared by every process polling into DB_FILE."""
+
+    def __enter__(self):
+        self.file = open(DB_FILE + ".poll.lock", "a")
+        if fcntl is not None:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+        self.file.close()
+
+
+def run_poll(requested_at=None, min_interval=None):
+    """Run one poll cycle unless another one makes it unnecessary.
+
+    Poll cycles are serialized across threads and gunicorn workers. A caller
+    that had to wait while another cycle ran, and that cycle finished after
+    `requested_at`, shares its result instead of fetching again
+    ("coalesced"). A `min_interval` marks a manual refresh: nothing is
+    fetched ("throttled") if the last manual refresh polled less than
+    `min_interval` seconds ago, scheduled polls not counting. Returns
+    "polled", "coalesced" or "throttled".
+    """
+    requested_at = requested_at or datetime.now(timezone.utc)
+    with _poll_mutex, _PollFileLock():
+        stats = load_poll_stats()
+        since_refresh = seconds_since_last_refresh() if min_interval else None
+        if stats and datetime.fromisoformat(stats["finished_at"]) >= requested_at:
+            outcome = "coalesced"
+        elif since_refresh is not None and since_refresh < min_interval:
+            outcome = "throttled"
+        else:
+            # Another worker may have published since this one last did (a
+            # /refresh, or the collector): start from its fleet so the new
+            # generation follows it instead of repeating its number.
+            if snapshot_generation() > data_generation:
+                restore_snapshot()
+            poll_once()
+            if min_interval is not None:
+                save_refresh_stats(datetime.now(timezone.utc).isoformat())
+            outcome = "polled"
+    if outcome != "polled" and snapshot_generation() > data_generation:
+        restore_snapshot()
+    return outcome
 
-    .stat-card .value {
-        font-size: 20px;
-    }
-}
 
-@media (max-width: 1024px) {
-    .header {
-        max-width: 95%;
-    }
-    .stats, .table-container {
-        max-width: 95%;
-    }
-}
+def fetch_orchestrators():
+    """Background loop that fetches orchestrator data and updates balances.
 
-@media (max-width: 768px) {
-    .stats {
-        grid-template-columns: 1fr;
-        gap: 12px;
-    }
+    The next cycle is due UPDATE_INTERVAL after the last one finished in
+    any process, so a manual refresh pushes the schedule back.
+    """
+    # Wait for DB initialization
+    while not db_initialized:
+        time.sleep(1)
 
-    .header {
-        padding: 18px;
-        border-radius: 12px;
-    }
+    while not _collector_stop.is_set():
+        since = seconds_since_last_poll()
+        if since is not None and since < UPDATE_INTERVAL:
+            _collector_wakeup.wait(UPDATE_INTERVAL - since)
+            _collector_wakeup.clear()
+            continue
+        try:
+            run_poll()
+        except Exception:
+            logging.exception("Error fetching orchestrators")
+            _collector_stop.wait(UPDATE_INTERVAL)
 
-    .stat-card .value {
-        font-size: 20px;
-    }
 
-    .table-container {
-        overflow-x: auto;
-        -webkit-overflow-scrolling: touch;
-    }
+def take_collector_wakeup():
+    """True, once, after a /refresh asked the collector to reschedule."""
+    if _collector_wakeup.is_set():
+        _collector_wakeup.clear()
+        return True
+    return False
 
-    table {
-        min-width: 720px;
-    }
 
-    th, td {
-        padding: 10px 8px;
-        font-size: 13px;
-    }
+def stop_collector():
+    """Make fetch_orchestrators() return once its current cycle is done."""
+    _collector_stop.set()
+    _collector_wakeup.set()
 
-    .address {
-        display: inline-block;
-        max-width: 130px;
-        white-space: nowrap;
-        overflow: hidden;
-        text-overflow: ellipsis;
-        vertical-align: middle;
-    }
-}
 
-@media (max-width: 420px) {
-    .header h1 {
-        font-size: 18px;
-    }
-    .header .subtitle {
-        font-size: 12px;
-    }
-    .stat-card .value {
-        font-size: 18px;
-    }
-    table { min-width: 640px; }
-}
-</style>
+HTML_TEMPLATE = """
+<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="UTF-8">
+<meta name="viewport" content="width=device-width, initial-scale=1.0">
+<title>Orchestrators ETH Balances</title>
+<link rel="stylesheet" href="{{ asset_url('dashboard.css') }}">
+<script src="{{ asset_url('dashboard.js') }}" defer></script>
 </head>
 <body>
 <div class="container">
     <div class="header">
         <h1>Livepeer Orchestrators Monitor</h1>
         <div class="subtitle">Real-time ETH balance tracking with 24-hour change analysis</div>
+        <div class="data-age{% if data_stale %} stale{% endif %}" id="data-age" data-updated="{{ last_update_iso or '' }}" data-stale-after="{{ stale_after }}" data-events="{{ events_url }}" data-generation="{{ generation }}">
+            {% if as_of %}
+            Showing the fleet as of {{ as_of_fmt }} &middot; <a href="{{ index_url }}">back to live data</a>
+            {% else %}
+            Last updated: {{ last_update }} (<span id="data-age-text">{{ data_age }}</span>){% if data_stale %} &middot; showing stale data{% endif %}<span id="data-new" hidden> &middot; <a href="">new data available</a></span>
+            {% endif %}
+        </div>
+        <form class="as-of" method="get" action="{{ index_url }}">
+            <label>View as of <input type="datetime-local" name="at" step="1" value="{{ (as_of or '')[:19] }}"> UTC</label>
+            <button type="submit">Go</button>
+        </form>
+        {% if search_url %}
+        <div class="search" id="search" data-api="{{ search_url }}">
+            <input type="search" id="search-input" placeholder="Find an orchestrator by ID or address" autocomplete="off" aria-controls="search-results">
+            <ul id="search-results" hidden></ul>
+        </div>
+        {% endif %}
     </div>
 
     <div class="stats">
         <div class="stat-card">
             <div class="label">Total Orchestrators</div>
-            <div class="value">{{ orchestrators|length }}</div>
+            <div class="value">{{ stats.total }}</div>
         </div>
         <div class="stat-card">
             <div class="label">Healthy Nodes</div>
-            <div class="value">{{ orchestrators|selectattr('last_healthy_at')|list|length }}</div>
+            <div class="value">{{ stats.healthy if stats.healthy is not none else '-' }}</div>
         </div>
         <div class="stat-card">
             <div class="label">Eligible for Payments</div>
-            <div class="value">{{ orchestrators|selectattr('eligible_for_payments', 'equalto', true)|list|length }}</div>
+            <div class="value">{{ stats.eligible }}</div>
         </div>
         <div class="stat-card">
             <div class="label">Top 100</div>
-            <div class="value">{{ orchestrators|selectattr('is_top_100', 'equalto', true)|list|length }}</div>
+            <div class="value">{{ stats.top_100 if stats.top_100 is not none else '-' }}</div>
+        </div>
+    </div>
+
+    {% if sources|length > 1 %}
+    <div class="sources">
+        {% for src in sources %}
+        <div class="source{% if src.ok == false %} failing{% endif %}" title="{{ src.last_error or src.url }}">
+            <span class="name">{{ src.name }}</span>
+            &middot; {{ src.count if src.count is not none else '-' }} nodes
+            &middot; {{ src.latency_ms if src.latency_ms is not none else '-' }} ms
+            &middot; {{ format_age(src.age_seconds) }}
         </div>
+        {% endfor %}
+    </div>
+    {% endif %}
+
+    {% if virtual %}
+    <div class="vt-toolbar">
+        <input type="search" id="vt-search" placeholder="Filter by orchestrator or address" autocomplete="off">
+        <span id="vt-count"></span>
     </div>
+    {% endif %}
 
-    <div class="table-container">
+    <div class="table-container{% if virtual %} vt-viewport{% endif %}" id="vt-viewport"
+         data-api="{{ api_url }}" data-detail="{{ detail_url }}" data-page-size="{{ page_size }}" data-show-source="{{ 1 if sources|length > 1 else 0 }}">
         <table>
             <thead>
                 <tr>
-                    <th>Orchestrator</th>
-                    <th>Address</th>
-                    <th>Balance (ETH)</th>
-                    <th>24h Change</th>
-                    <th>Status</th>
-                    <th>Last Health Check</th>
+                    <th data-col="orchestrator_id">Orchestrator</th>
+                    <th data-col="address">Address</th>
+                    <th data-col="balance_eth">Balance (ETH)</th>
+                    <th data-col="balance_change_24h">24h Change</th>
+                    <th>24h Trend</th>
+                    <th data-col="status">Status</th>
+                    <th data-col="last_healthy_at">Last Health Check</th>
+                    {% if sources|length > 1 %}<th data-col="source">Source</th>{% endif %}
                 </tr>
             </thead>
-            <tbody>
-                {% for o in orchestrators %}
+            <tbody id="vt-body">
+                {% for o in ([] if virtual else orchestrators) %}
                 <tr>
                     <td>
                         <div class="orch-name">{{ o.orchestrator_id }}</div>
                     </td>
                     <td>
-                        <span class="address">{{ o.address[:10] }}...{{ o.address[-8:] }}</span>
+                        <a class="address" href="{{ detail_url }}{{ o.address|urlencode }}" title="{{ o.address }}">{{ o.address[:10] }}...{{ o.address[-8:] }}</a>
                     </td>
                     <td>{{ o.balance_eth_fmt }}</td>
                     <td>
@@ -564,6 +2197,7 @@ tbody tr:last-child td {
                             <span class="balance-zero">{{ o.balance_change_24h_fmt }}</span>
                         {% endif %}
                     </td>
+                    <td class="sparkline">{% set path = sparklines.get(o.address) %}{% if path %}<svg viewBox="0 0 48 16" aria-hidden="true"><path d="{{ path }}"/></svg>{% endif %}</td>
                     <td>
                         {% if o.eligible_for_payments and not o.cooldown_active %}
                             <span class="badge badge-success">Active</span>
@@ -574,20 +2208,1101 @@ tbody tr:last-child td {
                         {% endif %}
                     </td>
                     <td>{{ o.last_healthy_at_formatted }}</td>
+                    {% if sources|length > 1 %}<td>{{ o.source }}</td>{% endif %}
+                </tr>
+                {% endfor %}
+            </tbody>
+        </table>
+    </div>
+</div>
+</body>
+</html>
+"""
+
+
+DETAIL_TEMPLATE = """
+<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="UTF-8">
+<meta name="viewport" content="width=device-width, initial-scale=1.0">
+<title>{{ record.orchestrator_id or detail.address }} - Orchestrators ETH Balances</title>
+<link rel="stylesheet" href="{{ asset_url('dashboard.css') }}">
+</head>
+<body>
+<div class="container">
+    <div class="header">
+        <h1>{{ record.orchestrator_id or "Unknown orchestrator" }}</h1>
+        <div class="subtitle address-full">{{ detail.address }}</div>
+        <div class="data-age">
+            As of {{ format_timestamp(detail.as_of) }}{% if not record %} &middot; not in the current fleet{% endif %}
+            &middot; <a href="{{ url_for('dashboard.index') }}">back to the fleet</a>
+        </div>
+    </div>
+
+    <div class="stats">
+        <div class="stat-card">
+            <div class="label">Balance (ETH)</div>
+            <div class="value">{{ "%.6f"|format(detail.balance_eth) }}</div>
+        </div>
+        <div class="stat-card">
+            <div class="label">Burn Rate 24h (ETH/h)</div>
+            <div class="value">{{ "%.6f"|format(detail.burn_rate_24h) if detail.burn_rate_24h is not none else "-" }}</div>
+        </div>
+        <div class="stat-card">
+            <div class="label">Burn Rate 7d (ETH/h)</div>
+            <div class="value">{{ "%.6f"|format(detail.burn_rate_7d) if detail.burn_rate_7d is not none else "-" }}</div>
+        </div>
+        <div class="stat-card">
+            <div class="label">Projected Drain</div>
+            <div class="value">{{ format_age(detail.drain_hours * 3600) if detail.drain_hours else "-" }}</div>
+        </div>
+    </div>
+
+    {% if record %}
+    <div class="table-container detail-section">
+        <h2>Metadata{% if status %} <span class="badge {{ {'Active': 'badge-success', 'Cooldown': 'badge-warning'}.get(status, 'badge-danger') }}">{{ status }}</span>{% endif %}</h2>
+        <table>
+            <tbody>
+                {% for key, value in metadata %}
+                <tr><th>{{ key }}</th><td>{{ value if value is not none else "-" }}</td></tr>
+                {% endfor %}
+            </tbody>
+        </table>
+    </div>
+    {% endif %}
+
+    <div class="table-container detail-section">
+        <h2>Status Changes</h2>
+        <table>
+            <thead><tr><th>Since</th><th>Status</th></tr></thead>
+            <tbody>
+                {% for e in events %}
+                <tr><td>{{ format_timestamp(e.changed_at) }}</td><td>{{ e.status }}</td></tr>
+                {% else %}
+                <tr><td colspan="2">No status recorded yet</td></tr>
+                {% endfor %}
+            </tbody>
+        </table>
+    </div>
+
+    <div class="table-container detail-section">
+        <h2>Balance History</h2>
+        <table>
+            <thead><tr><th>Time</th><th>Balance (ETH)</th></tr></thead>
+            <tbody>
+                {% for h in history %}
+                <tr><td>{{ format_timestamp(h.timestamp) }}</td><td>{{ "%.8f"|format(h.balance) }}</td></tr>
+                {% else %}
+                <tr><td colspan="2">No balance history</td></tr>
+                {% endfor %}
+            </tbody>
+        </table>
+    </div>
+
+    {% if hourly %}
+    <div class="table-container detail-section">
+        <h2>Hourly (7 days)</h2>
+        <table>
+            <thead><tr><th>Hour</th><th>Open</th><th>High</th><th>Low</th><th>Close</th><th>Samples</th></tr></thead>
+            <tbody>
+                {% for h in hourly %}
+                <tr>
+                    <td>{{ format_timestamp(h.hour) }}</td>
+                    <td>{{ "%.8f"|format(h.open) }}</td>
+                    <td>{{ "%.8f"|format(h.high) }}</td>
+                    <td>{{ "%.8f"|format(h.low) }}</td>
+                    <td>{{ "%.8f"|format(h.close) }}</td>
+                    <td>{{ h.samples }}</td>
                 </tr>
                 {% endfor %}
             </tbody>
         </table>
     </div>
+    {% endif %}
 </div>
 </body>
 </html>
 """
 
 
-@app.route("/")
+def elect_collector():
+    """Decide, once per process, whether this process runs the collector.
+
+    A non-blocking file lock next to DB_FILE elects one process to poll the
+    API; the others follow the snapshot it persists. Returns a pair
+    (collector_owner, newly_elected).
+    """
+    global _collector_pid, _collector_lock_file, collector_owner
+    with _collector_lock:
+        if _collector_pid == os.getpid():
+            return collector_owner, False
+        _collector_pid = os.getpid()
+        collector_owner = True
+        if fcntl is not None:
+            lock_file = open(DB_FILE + ".collector.lock", "a")
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                _collector_lock_file = lock_file
+            except OSError:
+                lock_file.close()
+                collector_owner = False
+        return collector_owner, True
+
+
+def start_collector():
+    """Start the background poller thread in this process, at most once.
+
+    Under gunicorn every worker calls this after fork and only the elected
+    one polls. The ASGI entry point (asgi.py) runs the collector as a task
+    on its event loop instead.
+    """
+    owner, elected = elect_collector()
+    if owner and elected:
+        thread = threading.Thread(target=fetch_orchestrators)
+        thread.daemon = True
+        thread.start()
+        logging.info("Collector started in pid %d", _collector_pid)
+    return owner
+
+
+def follow_if_stale():
+    """Pick up snapshots persisted by the collector in another process.
+
+    Checks the database at most once per second.
+    """
+    global _follow_checked_at
+    if collector_owner:
+        return
+    now = time.monotonic()
+    if now - _follow_checked_at < 1.0:
+        return
+    _follow_checked_at = now
+    if snapshot_generation() > data_generation:
+        restore_snapshot()
+    if _search_index.generation != data_generation:
+        update_search_index_later()
+
+
+def get_admission():
+    """The AdmissionController for the current settings."""
+    global _admission
+    settings = (
+        ROUTE_CONCURRENCY, ROUTE_LIMITS, ROUTE_QUEUE, QUEUE_TIMEOUT,
+        CLIENT_RATE, CLIENT_BURST, POLL_CONCURRENCY,
+    )
+    if _admission[0] != settings:
+        limits = {}
+        if ROUTE_LIMITS:
+            try:
+                limits = {
+                    "dashboard." + str(route): int(limit)
+                    for route, limit in json.loads(ROUTE_LIMITS).items()
+                }
+            except (ValueError, TypeError, AttributeError):
+                logging.exception("Invalid ROUTE_LIMITS, using ROUTE_CONCURRENCY")
+        controller = admission.AdmissionController(
+            concurrency=ROUTE_CONCURRENCY,
+            limits=limits,
+            queue=ROUTE_QUEUE,
+            timeout=QUEUE_TIMEOUT,
+            rate=CLIENT_RATE,
+            burst=CLIENT_BURST,
+            poll_concurrency=POLL_CONCURRENCY,
+        )
+        _admission = (settings, controller)
+    return _admission[1]
+
+
+def client_address(remote_addr, forwarded_for=None):
+    """The client a request's rate limit is charged to.
+
+    With TRUSTED_PROXIES = N, the Nth X-Forwarded-For entry from the right,
+    as werkzeug's ProxyFix(x_for=N) picks it; entries further left are set
+    by the client and cannot be trusted.
+    """
+    if TRUSTED_PROXIES > 0 and forwarded_for:
+        hops = [hop.strip() for hop in forwarded_for.split(",") if hop.strip()]
+        if len(hops) >= TRUSTED_PROXIES:
+            return hops[-TRUSTED_PROXIES]
+    return remote_addr or ""
+
+
+def request_client():
+    return client_address(request.remote_addr, request.headers.get("X-Forwarded-For"))
+
+
+def admission_exempt(path):
+    return path.startswith(ADMISSION_EXEMPT)
+
+
+def rejection_response(exc):
+    """The 429/503 answer to a request turned away by admission control."""
+    response = jsonify(error=exc.reason, retry_after=exc.retry_after)
+    response.status_code = exc.status
+    response.headers["Retry-After"] = str(exc.retry_after)
+    return response
+
+
+@bp.before_app_request
+def start_request_trace():
+    """Open the request's root span ahead of admission, so 429s are traced too."""
+    if request.path.startswith("/static/"):
+        return
+    rule = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    g.trace = tracing.start_trace(
+        "{} {}".format(request.method, rule),
+        tracing.SERVER,
+        {
+            "http.method": request.method,
+            "http.route": rule,
+            "http.target": request.full_path.rstrip("?"),
+            "client.address": request_client(),
+        },
+    )
+
+
+@bp.after_app_request
+def finish_request_trace(response):
+    root = g.get("trace")
+    if root is not None:
+        root.set(**{
+            "http.status_code": response.status_code,
+            "http.response_content_length": response.calculate_content_length() or 0,
+        })
+        if response.status_code >= 500:
+            root.status = tracing.STATUS_ERROR
+    return response
+
+
+@bp.teardown_app_request
+def end_request_trace(exc):
+    root = g.pop("trace", None)
+    if root is not None and exc is not None:
+        root.error(exc)
+    tracing.end_trace(root)
+
+
+@bp.before_app_request
+def admit_request():
+    """Admission control ahead of every other hook (see admission.py).
+
+    Under asgi.py the client's rate was already charged on the event loop.
+    """
+    if admission_exempt(request.path):
+        return None
+    controller = get_admission()
+    route = request.endpoint or "unmatched"
+    try:
+        controller.admit(
+            route,
+            request_client(),
+            rate_checked=request.environ.get("dashboard.rate_checked", False),
+        )
+    except admission.Rejected as exc:
+        return rejection_response(exc)
+    g.admission = (controller, route)
+    return None
+
+
+@bp.teardown_app_request
+def release_request(exc):
+    admitted = g.pop("admission", None)
+    if admitted is not None:
+        controller, route = admitted
+        controller.release(route)
+
+
+@bp.before_app_request
+def follow_snapshot():
+    follow_if_stale()
+
+
+def status_code(o):
+    """Index into STATUS_LABELS for an orchestrator record."""
+    if o.get("eligible_for_payments") and not o.get("cooldown_active"):
+        return 0
+    if o.get("cooldown_active"):
+        return 1
+    return 2
+
+
+def fleet_stats(fleet):
+    """Header counters for the dashboard."""
+    return {
+        "total": len(fleet),
+        "healthy": sum(1 for o in fleet if o.get("last_healthy_at")),
+        "eligible": sum(1 for o in fleet if o.get("eligible_for_payments") is True),
+        "top_100": sum(1 for o in fleet if o.get("is_top_100") is True),
+    }
+
+
+def fleet_columns():
+    """Return (generation, {column: values}) for the current fleet, cached."""
+    global _columns_cache
+    generation, columns = _columns_cache
+    if generation == data_generation:
+        return generation, columns
+    generation, fleet = data_generation, orchestrators_data
+    _, sparklines = fleet_sparklines()
+    columns = build_columns(fleet, sparklines)
+    _columns_cache = (generation, columns)
+    return generation, columns
+
+
+def build_columns(fleet, sparklines):
+    """{column: values} of API_COLUMNS for a list of orchestrator records."""
+    columns = {name: [] for name in API_COLUMNS}
+    for o in fleet:
+        columns["orchestrator_id"].append(o.get("orchestrator_id"))
+        columns["address"].append(o.get("address"))
+        try:
+            columns["balance_eth"].append(float(o.get("balance_eth", 0.0)))
+        except (TypeError, ValueError):
+            columns["balance_eth"].append(0.0)
+        columns["balance_change_24h"].append(o.get("balance_change_24h", 0.0))
+        columns["status"].append(status_code(o))
+        columns["last_healthy_at"].append(o.get("last_healthy_at"))
+        columns["source"].append(o.get("source"))
+    columns["sparkline"] = [sparklines.get(addr, "") for addr in columns["address"]]
+    return columns
+
+
+SPARKLINE_HOURS = 24
+SPARKLINE_HEIGHT = 16  # SVG units; points are 2 units apart
+
+
+def sparkline_path(values, height=SPARKLINE_HEIGHT):
+    """SVG path data for one row of balances (None = no data that hour).
+
+    Scaled to the row's own min/max with a 1 unit margin; a flat row is
+    drawn mid-height. columnar.sparkline_paths() is the vectorized twin.
+    """
+    present = [v for v in values if v is not None]
+    if not present:
+        return ""
+    low, high = min(present), max(present)
+    span = high - low
+    parts = []
+    for x, v in enumerate(values):
+        if v is None:
+            continue
+        y = 1 + (high - v) / span * (height - 2) if span > 0 else height / 2
+        parts.append("{} {}".format(2 * x, int(round(y))))
+    return "M" + "L".join(parts)
+
+
+def sparkline_closes(end):
+    """Hourly closes of every address for the SPARKLINE_HOURS before `end`.
+
+    One query per history shard. Returns ({address: row}, closes) where
+    closes has one row per address plus a last row without data for
+    addresses that have none: a float array (NaN = no data) with the
+    columnar backend, else lists (None = no data). Completed hours do not
+    change, so fleet_sparklines() reuses the result until the hour turns.
+    """
+    hours = [(end - timedelta(hours=SPARKLINE_HOURS - k)).isoformat() for k in range(SPARKLINE_HOURS)]
+    column = {hour: k for k, hour in enumerate(hours)}
+
+    def query(conn, shard):
+        with tracing.span("db.sparkline_closes", shard=shard) as trace:
+            rows = conn.execute(
+                "SELECT address, hour, close FROM balance_hourly WHERE hour >= ? AND hour < ?",
+                (hours[0], end.isoformat()),
+            ).fetchall()
+            trace.set(rows=len(rows))
+        return rows
+
+    try:
+        rows = [row for part in get_history_store().map(query) for row in part]
+    except Exception:
+        logging.exception("Error loading sparkline points")
+        rows = []
+    index = {}
+    for addr, _, _ in rows:
+        if addr not in index:
+            index[addr] = len(index)
+    if use_columnar():
+        import numpy as np
+
+        closes = np.full((len(index) + 1, SPARKLINE_HOURS), np.nan)
+        if rows:
+            pos = np.fromiter((index[addr] for addr, _, _ in rows), np.int64, len(rows))
+            col = np.fromiter((column.get(hour, -1) for _, hour, _ in rows), np.int64, len(rows))
+            close = np.fromiter((value for _, _, value in rows), np.float64, len(rows))
+            keep = col >= 0
+            closes[pos[keep], col[keep]] = close[keep]
+    else:
+        closes = [[None] * SPARKLINE_HOURS for _ in range(len(index) + 1)]
+        for addr, hour, close in rows:
+            k = column.get(hour)
+            if k is not None:
+                closes[index[addr]][k] = close
+    return index, closes
+
+
+def fleet_sparklines():
+    """Return (generation, {address: path}) of 24h balance sparklines, cached.
+
+    Points are the closes of the last SPARKLINE_HOURS complete hours (see
+    sparkline_closes(), loaded once per hour) plus the served balance as
+    the last point. Paths are built for the whole fleet in one pass,
+    vectorized with the columnar backend, once per generation once the
+    last hour is rolled up; the collector builds them right after each
+    poll.
+    """
+    global _sparkline_cache, _sparkline_closes
+    generation, paths = _sparkline_cache
+    if generation == data_generation:
+        return generation, paths
+    generation, fleet, updated = data_generation, orchestrators_data, last_update
+    now = datetime.fromisoformat(updated) if updated else datetime.now(timezone.utc)
+    end = floor_hour(now)
+    columnar_backend = use_columnar()
+    cached_end, index, closes = _sparkline_closes
+    if cached_end != end or columnar_backend != (not isinstance(closes, list)):
+        index, closes = sparkline_closes(end)
+        # Keep it for the hour only once the last hour has been rolled up.
+        if columnar_backend:
+            import numpy as np
+
+            complete = bool((~np.isnan(closes[:-1, -1])).any())
+        else:
+            complete = any(row[-1] is not None for row in closes[:-1])
+        _sparkline_closes = (end, index, closes) if complete else (None, None, None)
+
+    addresses = [o.get("address", "") for o in fleet]
+    balances = []
+    for o in fleet:
+        try:
+            balances.append(float(o.get("balance_eth", 0.0)))
+        except (TypeError, ValueError):
+            balances.append(0.0)
+    rows = [index.get(addr, -1) for addr in addresses]
+    if columnar_backend:
+        import columnar
+        import numpy as np
+
+        values = np.empty((len(fleet), SPARKLINE_HOURS + 1))
+        values[:, :SPARKLINE_HOURS] = closes[np.array(rows, dtype=np.int64)]
+        values[:, SPARKLINE_HOURS] = balances
+        built = columnar.sparkline_paths(values, SPARKLINE_HEIGHT)
+    else:
+        built = [sparkline_path(closes[row] + [balance]) for row, balance in zip(rows, balances)]
+    paths = dict(zip(addresses, built))
+    # Until the last hour is rolled up (just after the fleet is published)
+    # the paths are rebuilt on every call, or they would miss that hour
+    # for the rest of the generation.
+    if _sparkline_closes[0] == end:
+        _sparkline_cache = (generation, paths)
+    return generation, paths
+
+
+def find_orchestrator(address):
+    """The current record for `address` (case-insensitive), or None."""
+    global _address_index
+    generation, index = _address_index
+    if generation != data_generation:
+        generation, fleet = data_generation, orchestrators_data
+        index = {(o.get("address") or "").lower(): o for o in fleet}
+        _address_index = (generation, index)
+    return index.get(address.lower())
+
+
+def get_search_index():
+    """The SearchIndex, never updated on the request path.
+
+    The collector updates it right after publishing a fleet; in other
+    workers follow_if_stale() updates it in the background, and searches
+    are answered from the previous generation until that finishes.
+    """
+    return _search_index
+
+
+def update_search_index():
+    """Bring the SearchIndex up to the served generation."""
+    generation, fleet = data_generation, orchestrators_data
+    if _search_index.generation != generation:
+        _search_index.update(fleet, generation)
+    return _search_index
+
+
+def update_search_index_later():
+    """Run update_search_index() on a background thread; returns its future.
+
+    An update already queued or running is reused: it reads the generation
+    being served when it starts.
+    """
+    global _search_executor, _search_future
+    with _search_lock:
+        if _search_future is not None and not _search_future.running() and not _search_future.done():
+            return _search_future
+        if _search_executor is None:
+            _search_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="search")
+        _search_future = _search_executor.submit(_update_search_index_logged)
+        return _search_future
+
+
+def _update_search_index_logged():
+    try:
+        update_search_index()
+    except Exception:
+        logging.exception("Search index update failed")
+
+
+def burn_rate(points, since, until):
+    """ETH spent per hour from `since` to `until` from sorted (time, balance) points.
+
+    Only decreases count, so a top-up does not hide spending. A point
+    before `since` is the balance carried into the window. None when the
+    points cover no time in the window.
+    """
+    since_iso, until_iso = since.isoformat(), until.isoformat()
+    spent, carried, start = 0.0, None, None
+    for moment, balance in points:
+        if moment > until_iso:
+            break
+        if moment < since_iso:
+            carried = balance
+            continue
+        if start is None:
+            start = since if carried is not None else datetime.fromisoformat(moment)
+        if carried is not None and balance < carried:
+            spent += carried - balance
+        carried = balance
+    if start is None:
+        if carried is None:
+            return None
+        start = since
+    hours = (until - start).total_seconds() / 3600
+    return spent / hours if hours > 0 else None
+
+
+def orchestrator_detail(address, record=None):
+    """Balance history, rollups, status transitions and burn rates of one address.
+
+    Everything is as of the served generation's last_update, so the result
+    only changes with the generation. Returns None for an address that is
+    neither in the fleet nor in the history.
+    """
+    now = datetime.fromisoformat(last_update) if last_update else datetime.now(timezone.utc)
+    day_ago, week_ago = now - timedelta(hours=24), now - timedelta(days=7)
+    conn = get_history_store().for_address(address)
+    with tracing.span("db.detail", address=address) as trace:
+        history = conn.execute(
+            "SELECT timestamp, balance FROM balance_history WHERE address = ? ORDER BY timestamp",
+            (address,),
+        ).fetchall()
+        hourly = conn.execute(
+            """
+            SELECT hour, open, high, low, close, samples FROM balance_hourly
+            WHERE address = ? AND hour >= ? ORDER BY hour
+            """,
+            (address, floor_hour(week_ago).isoformat()),
+        ).fetchall()
+        events = conn.execute(
+            "SELECT changed_at, status FROM status_events WHERE address = ? ORDER BY changed_at",
+            (address,),
+        ).fetchall()
+        trace.set(history_rows=len(history), hourly_rows=len(hourly), status_rows=len(events))
+    if record is None and not history and not events:
+        return None
+
+    balance = float(record.get("balance_eth", 0.0)) if record else (history[-1][1] if history else 0.0)
+    # A close is the balance at the end of its hour.
+    closes = [
+        ((datetime.fromisoformat(hour) + timedelta(hours=1)).isoformat(), close)
+        for hour, _, _, _, close, _ in hourly
+    ]
+    rate_24h = burn_rate(history, day_ago, now)
+    rate_7d = burn_rate(closes, week_ago, now)
+    return {
+        "address": address,
+        "as_of": now.isoformat(),
+        "orchestrator": record,
+        "balance_eth": balance,
+        "burn_rate_24h": rate_24h,
+        "burn_rate_7d": rate_7d,
+        "drain_hours": balance / rate_24h if rate_24h else None,
+        "history": [{"timestamp": t, "balance": b} for t, b in history],
+        "hourly": [
+            {"hour": h, "open": o, "high": hi, "low": lo, "close": c, "samples": n}
+            for h, o, hi, lo, c, n in hourly
+        ],
+        "status_events": [
+            {"changed_at": t, "status": STATUS_LABELS[code]} for t, code in events
+        ],
+    }
+
+
+class ResponseCache:
+    """LRU of computed responses keyed by (key, scope).
+
+    An entry is a dict whose "bodies" ({name: str}) hold the serialized
+    responses built from it so far; memory use is tracked as their size.
+    A lookup with a different scope drops every entry first: the detail
+    cache uses the data generation as scope, so a new poll invalidates it
+    without a sweep.
+    """
+
+    def __init__(self, size):
+        self.size = max(1, size)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.scope = None
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+        self.bytes = 0
+
+    def _check_scope(self, scope):
+        if scope != self.scope:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self.bytes = 0
+            self.scope = scope
+
+    def get(self, key, scope):
+        with self._lock:
+            self._check_scope(scope)
+            entry = self._entries.get((key, scope))
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end((key, scope))
+            return entry
+
+    def put(self, key, scope, entry):
+        with self._lock:
+            self._check_scope(scope)
+            old = self._entries.pop((key, scope), None)
+            if old is not None:
+                self.bytes -= self._size(old)
+            self._entries[(key, scope)] = entry
+            self.bytes += self._size(entry)
+            while len(self._entries) > self.size:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= self._size(evicted)
+                self.evictions += 1
+
+    def add_body(self, key, scope, name, body):
+        """Attach another serialized response to an entry that is still cached."""
+        with self._lock:
+            entry = self._entries.get((key, scope))
+            if entry is not None and name not in entry["bodies"]:
+                entry["bodies"][name] = body
+                self.bytes += len(body)
+
+    @staticmethod
+    def _size(entry):
+        return sum(len(body) for body in entry["bodies"].values())
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "capacity": self.size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "bytes": self.bytes,
+            }
+
+
+def get_detail_cache():
+    global _detail_cache
+    if _detail_cache is None or _detail_cache.size != max(1, DETAIL_CACHE_SIZE):
+        _detail_cache = ResponseCache(DETAIL_CACHE_SIZE)
+    return _detail_cache
+
+
+def cached_detail(address):
+    """(generation, cache entry) for `address`, or (generation, None) if unknown."""
+    generation = data_generation
+    record = find_orchestrator(address)
+    if record is not None:
+        address = record.get("address", address)
+    cache = get_detail_cache()
+    entry = cache.get(address, generation)
+    if entry is None:
+        detail = orchestrator_detail(address, record)
+        if detail is None:
+            return generation, None
+        entry = {
+            "detail": detail,
+            "bodies": {
+                "json": json.dumps(dict(detail, generation=generation), separators=(",", ":")),
+            },
+        }
+        cache.put(address, generation, entry)
+    return generation, entry
+
+
+def detail_url_prefix():
+    """URL of the detail page minus the address, for building links in bulk."""
+    return url_for("dashboard.orchestrator_detail_page", address="_")[:-1]
+
+
+AS_OF_QUERY = """
+    WITH RECURSIVE addresses(address) AS (
+        SELECT MIN(address) FROM balance_history
+        UNION ALL
+        SELECT (SELECT MIN(address) FROM balance_history WHERE address > addresses.address)
+        FROM addresses WHERE address IS NOT NULL
+    )
+    SELECT
+        address,
+        COALESCE(
+            (SELECT balance FROM balance_history
+             WHERE address = a.address AND timestamp <= :at
+             ORDER BY timestamp DESC LIMIT 1),
+            (SELECT close FROM balance_hourly
+             WHERE address = a.address AND hour <= :at_hour
+             ORDER BY hour DESC LIMIT 1)
+        ) AS balance,
+        COALESCE(
+            (SELECT balance FROM balance_history
+             WHERE address = a.address AND timestamp <= :day_ago
+             ORDER BY timestamp DESC LIMIT 1),
+            (SELECT close FROM balance_hourly
+             WHERE address = a.address AND hour <= :day_ago_hour
+             ORDER BY hour DESC LIMIT 1),
+            (SELECT open FROM balance_hourly
+             WHERE address = a.address AND hour <= :at
+             ORDER BY hour LIMIT 1),
+            (SELECT balance FROM balance_history
+             WHERE address = a.address AND timestamp <= :at
+             ORDER BY timestamp LIMIT 1)
+        ) AS balance_24h_ago,
+        (SELECT status FROM status_events
+         WHERE address = a.address AND changed_at <= :at
+         ORDER BY changed_at DESC LIMIT 1) AS status
+    FROM addresses AS a WHERE address IS NOT NULL
+"""
+
+
+def parse_as_of(value, now=None):
+    """The instant of an ?at= value: ISO 8601 (naive means UTC) or Unix seconds.
+
+    ValueError if it cannot be parsed or lies in the future.
+    """
+    value = value.strip()
+    try:
+        moment = datetime.fromtimestamp(float(value), timezone.utc)
+    except (ValueError, OverflowError, OSError):
+        moment = datetime.fromisoformat(value.replace(" ", "T"))
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=timezone.utc)
+        moment = moment.astimezone(timezone.utc)
+    if moment > (now or datetime.now(timezone.utc)):
+        raise ValueError("at lies in the future")
+    return moment
+
+
+def fleet_as_of(at):
+    """Rebuild the fleet view as of `at`: balance, 24h change and status.
+
+    One query per history shard: a skip scan walks the distinct addresses
+    of idx_address_timestamp and each address gets LIMIT 1 seeks on that
+    index and the balance_hourly/status_events primary keys, so the cost
+    grows with the fleet and not with the length of the history. A balance
+    is the latest balance_history row at or before the instant; once
+    cleanup_old_records() has thinned that out, the close of the last
+    complete hour stands in. As in process_fleet(), the 24h change falls
+    back to the oldest known balance. Status is the last status_events
+    transition at or before `at` (None before the first one).
+
+    Names and sources come from the current fleet; addresses no longer in
+    it keep their address as orchestrator_id. Sorted by orchestrator_id.
+    """
+    day_ago = at - timedelta(hours=24)
+    params = {
+        "at": at.isoformat(),
+        "at_hour": (at - timedelta(hours=1)).isoformat(),
+        "day_ago": day_ago.isoformat(),
+        "day_ago_hour": (day_ago - timedelta(hours=1)).isoformat(),
+    }
+
+    def query(conn, shard):
+        with tracing.span("db.as_of", shard=shard, at=params["at"]) as trace:
+            rows = conn.execute(AS_OF_QUERY, params).fetchall()
+            trace.set(rows=len(rows))
+        return rows
+
+    records = []
+    for part in get_history_store().map(query):
+        for addr, balance, balance_24h_ago, status in part:
+            if balance is None:  # first seen after `at`
+                continue
+            current = find_orchestrator(addr) or {}
+            change = balance - balance_24h_ago if balance_24h_ago is not None else 0.0
+            records.append(
+                {
+                    "orchestrator_id": current.get("orchestrator_id") or addr,
+                    "address": addr,
+                    "balance_eth": balance,
+                    "balance_change_24h": change,
+                    "drain_hours": drain_hours(balance, change),
+                    "status": status,
+                    "eligible_for_payments": None if status is None else status == 0,
+                    "cooldown_active": None if status is None else status == 1,
+                    "last_healthy_at": None,
+                    "source": current.get("source"),
+                }
+            )
+    records.sort(key=lambda o: (o["orchestrator_id"].lower(), o["address"]))
+    return records
+
+
+def get_as_of_cache():
+    global _as_of_cache
+    if _as_of_cache is None or _as_of_cache.size != max(1, AS_OF_CACHE_SIZE):
+        _as_of_cache = ResponseCache(AS_OF_CACHE_SIZE)
+    return _as_of_cache
+
+
+def cached_as_of(at):
+    """(key, cache entry) of the fleet as of `at`; the key is its ISO form.
+
+    History before the last finished poll cycle does not change, so entries
+    stay valid across generations; the scope only changes with the history
+    files. Later instants are not cached: a cycle being stored right now
+    writes rows stamped at its start, which is after that.
+    """
+    key, scope = at.isoformat(), (DB_FILE, HISTORY_SHARDS)
+    cache = get_as_of_cache()
+    entry = cache.get(key, scope)
+    if entry is None:
+        finished = last_poll_finished()  # before the query, see above
+        fleet = fleet_as_of(at)
+        entry = {"fleet": fleet, "columns": build_columns(fleet, {}), "bodies": {}}
+        if finished and at < datetime.fromisoformat(finished):
+            cache.put(key, scope, entry)
+    return key, entry
+
+
+@bp.route("/static/<path:filename>")
+def static_asset(filename):
+    asset = load_assets().get(filename)
+    if asset is None:
+        abort(404)
+    encoding = "identity"
+    for candidate in ("br", "gzip"):
+        if candidate in asset["encodings"] and request.accept_encodings[candidate]:
+            encoding = candidate
+            break
+    response = current_app.response_class(
+        asset["encodings"][encoding], mimetype=asset["mimetype"]
+    )
+    if encoding != "identity":
+        response.headers["Content-Encoding"] = encoding
+    response.headers["Vary"] = "Accept-Encoding"
+    if filename == asset["hashed"]:
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    else:
+        response.headers["Cache-Control"] = "no-cache"
+    response.set_etag("{}-{}".format(asset["digest"], encoding))
+    return response.make_conditional(request)
+
+
+def _json_response(body):
+    return current_app.response_class(body, mimetype="application/json")
+
+
+@bp.before_app_request
+def start_request_profile():
+    g.profile_token = profiler.start("request")
+
+
+@bp.teardown_app_request
+def stop_request_profile(exc):
+    profiler.stop(g.pop("profile_token", None), request.path)
+
+
+def require_dashboard_token():
+    """Abort unless the request carries the DASHBOARD_TOKEN."""
+    token = request.headers.get("X-Dashboard-Token", "")
+    if not DASHBOARD_TOKEN or not hmac.compare_digest(token, DASHBOARD_TOKEN):
+        abort(403)
+
+
+@bp.route("/admin/profile", methods=["GET", "POST"])
+def admin_profile():
+    """Arm profiling of the next N poll cycles or requests.
+
+    POST {"kind": "poll"|"request", "count": N, "mode": "cprofile"|"sample"}.
+    Requests are profiled in this process. Poll cycles are profiled in
+    whichever process polls next, normally the collector (see
+    request_poll_profiles()); `pending_polls` counts the ones it has not
+    taken up yet.
+    """
+    require_dashboard_token()
+    if request.method == "POST":
+        body = request.get_json(silent=True) or request.form
+        kind, mode = body.get("kind", "poll"), body.get("mode")
+        try:
+            count = int(body.get("count", 1))
+            profiling.check_arm(kind, mode)
+        except ValueError as exc:
+            return jsonify(error=str(exc)), 400
+        if kind == "poll":
+            request_poll_profiles(count, mode)
+        else:
+            profiler.arm(kind, count, mode=mode)
+    return jsonify(
+        dict(profiler.status(), collector_owner=collector_owner, pending_polls=pending_poll_profiles())
+    )
+
+
+@bp.route("/refresh", methods=["POST"])
+def refresh():
+    """Poll the upstream API now instead of waiting for the schedule.
+
+    Concurrent refreshes, from any worker, share a single upstream fetch;
+    REFRESH_MIN_INTERVAL still applies and is answered with 429.
+    """
+    require_dashboard_token()
+    outcome = run_poll(min_interval=REFRESH_MIN_INTERVAL)
+    _collector_wakeup.set()
+    if outcome == "throttled":
+        since = seconds_since_last_refresh() or 0
+        retry_after = max(1, int(REFRESH_MIN_INTERVAL - since + 0.999))
+        response = jsonify(status=outcome, retry_after=retry_after)
+        response.status_code = 429
+        response.headers["Retry-After"] = str(retry_after)
+        return response
+    return jsonify(
+        status=outcome,
+        generation=data_generation,
+        last_update=last_update,
+        orchestrators=len(orchestrators_data),
+    )
+
+
+@bp.route("/api/status")
+def api_status():
+    """Data freshness and the stage timings of the last poll cycle."""
+    return jsonify(
+        generation=data_generation,
+        last_update=last_update,
+        age_seconds=data_age_seconds(),
+        orchestrators=len(orchestrators_data),
+        collector_owner=collector_owner,
+        last_poll=load_poll_stats(),
+        admission=get_admission().stats(),
+        traces=tracing.get_exporter().stats() if tracing.get_exporter() else None,
+    )
+
+
+def page_view(requested, fleet):
+    """The table flavour to render: ?view= if valid, else by fleet size."""
+    if requested in ("table", "virtual"):
+        return requested
+    return "virtual" if len(fleet) > VIRTUAL_TABLE_THRESHOLD else "table"
+
+
+def page_version(generation, reread=True):
+    """Cache key of the live page at `generation`.
+
+    The source panel changes with every poll cycle, including cycles where
+    every source failed and no generation was published, so the last poll
+    is part of the key. `reread` is passed to last_poll_finished().
+    """
+    finished = last_poll_finished(reread) or ""
+    return "{}.{:08x}".format(generation, zlib.crc32(finished.encode("utf-8")))
+
+
+def cached_page(view, version):
+    """Rendered HTML for `view` at page_version(), or None if not cached."""
+    cached_version, html = _page_cache.get(view, (None, None))
+    return html if cached_version == version else None
+
+
+def page_etag(version, view):
+    assets = load_assets()
+    return "g{}-{}-{}-{}".format(
+        version,
+        view,
+        assets["dashboard.css"]["digest"],
+        assets["dashboard.js"]["digest"],
+    )
+
+
+@bp.route("/")
 def index():
-    for o in orchestrators_data:
+    global _page_cache
+    if request.args.get("at"):
+        return as_of_page(request.args["at"])
+    generation, fleet = data_generation, orchestrators_data
+    view = page_view(request.args.get("view"), fleet)
+    version = page_version(generation)
+    html = cached_page(view, version)
+    if html is not None:
+        return _page_response(html, version, view)
+
+    if view == "table":
+        format_rows(fleet)
+    last_update_fmt = format_timestamp(last_update) if last_update else "N/A"
+    age = data_age_seconds()
+    stale_after = UPDATE_INTERVAL * 3
+    html = render_index(
+        fleet,
+        view,
+        stats=fleet_stats(fleet),
+        api_url=url_for("dashboard.api_orchestrators"),
+        events_url=url_for("dashboard.api_events"),
+        search_url=url_for("dashboard.api_search"),
+        sparklines=fleet_sparklines()[1] if view == "table" else {},
+        generation=generation,
+        last_update=last_update_fmt,
+        last_update_iso=last_update,
+        data_age=format_age(age),
+        data_stale=age is not None and age > stale_after,
+        stale_after=stale_after,
+    )
+    _page_cache[view] = (version, html)
+    return _page_response(html, version, view)
+
+
+def as_of_page(value):
+    """The dashboard rebuilt from history as of ?at= (see fleet_as_of())."""
+    try:
+        at = parse_as_of(value)
+    except ValueError:
+        abort(400)
+    key, entry = cached_as_of(at)
+    fleet = entry["fleet"]
+    view = page_view(request.args.get("view"), fleet)
+    html = entry["bodies"].get("html:" + view)
+    if html is None:
+        if view == "table":
+            format_rows(fleet)
+        stats = fleet_stats(fleet)
+        stats.update(healthy=None, top_100=None)  # not part of the history
+        html = render_index(
+            fleet,
+            view,
+            stats=stats,
+            api_url=url_for("dashboard.api_orchestrators", at=key),
+            events_url="",
+            search_url="",
+            sparklines={},
+            generation="",
+            as_of=key,
+            as_of_fmt=format_timestamp(key),
+            last_update_iso=None,
+            stale_after=UPDATE_INTERVAL * 3,
+        )
+        get_as_of_cache().add_body(key, (DB_FILE, HISTORY_SHARDS), "html:" + view, html)
+    return _page_response(html, "at" + key, view)
+
+
+def format_rows(fleet):
+    """Add the *_fmt fields the server-rendered table shows."""
+    for o in fleet:
         try:
             o["balance_eth_fmt"] = "{:.8f}".format(float(o.get("balance_eth", 0.0)))
         except Exception:
@@ -602,19 +3317,248 @@ def index():
 
         o["last_healthy_at_formatted"] = format_timestamp(o.get("last_healthy_at"))
 
-    last_update_fmt = format_timestamp(last_update) if last_update else "N/A"
-    return render_template_string(
-        HTML_TEMPLATE,
-        orchestrators=orchestrators_data,
-        last_update=last_update_fmt,
+
+def render_index(fleet, view, **context):
+    with tracing.span("render", view=view, orchestrators=len(fleet)) as trace:
+        html = get_template().render(
+            orchestrators=fleet,
+            virtual=view == "virtual",
+            detail_url=detail_url_prefix(),
+            index_url=url_for("dashboard.index"),
+            page_size=API_PAGE_SIZE,
+            sources=load_source_status(),
+            format_age=format_age,
+            **context
+        )
+        trace.set(bytes=len(html))
+    return html
+
+
+def _page_response(html, generation, view):
+    """Serve the page with an ETag so unchanged data costs a 304."""
+    response = current_app.response_class(html, mimetype="text/html")
+    response.set_etag(page_etag(generation, view))
+    response.headers["Cache-Control"] = "no-cache"
+    return response.make_conditional(request)
+
+
+@bp.route("/orchestrator/<address>")
+def orchestrator_detail_page(address):
+    """One orchestrator: metadata, balance history, status changes, burn rate."""
+    generation, entry = cached_detail(address)
+    if entry is None:
+        abort(404)
+    html = entry["bodies"].get("html")
+    if html is None:
+        detail = entry["detail"]
+        record = detail["orchestrator"] or {}
+        with tracing.span("render", view="detail") as trace:
+            html = get_template("detail").render(
+                detail=detail,
+                record=record,
+                status=STATUS_LABELS[status_code(record)] if record else None,
+                metadata=sorted(
+                    (key, value)
+                    for key, value in record.items()
+                    if not key.endswith("_fmt") and key != "last_healthy_at_formatted"
+                ),
+                history=list(reversed(detail["history"])),
+                hourly=list(reversed(detail["hourly"])),
+                events=list(reversed(detail["status_events"])),
+                format_timestamp=format_timestamp,
+                format_age=format_age,
+                generation=generation,
+            )
+            trace.set(bytes=len(html))
+        get_detail_cache().add_body(detail["address"], generation, "html", html)
+    return _page_response(html, generation, "detail")
+
+
+@bp.route("/api/orchestrators/<address>")
+def api_orchestrator(address):
+    """JSON form of the orchestrator detail page."""
+    _, entry = cached_detail(address)
+    if entry is None:
+        return jsonify(error="unknown address"), 404
+    return _json_response(entry["bodies"]["json"])
+
+
+@bp.route("/api/cache")
+def api_cache():
+    """Hit rates and memory use of this process's response caches."""
+    _, rows = _rows_cache
+    return jsonify(
+        pid=os.getpid(),
+        detail=get_detail_cache().stats(),
+        as_of=get_as_of_cache().stats(),
+        search=get_search_index().stats(),
+        pages={view: len(html) for view, (_, html) in _page_cache.items()},
+        rows_bytes=len(rows or ""),
+    )
+
+
+@bp.route("/api/search")
+def api_search():
+    """Orchestrators whose ID or address starts with or contains ?q=.
+
+    Prefix matches come first; substrings need at least three characters.
+    ?limit= lowers the number of results (at most SEARCH_LIMIT).
+    """
+    try:
+        limit = min(SEARCH_LIMIT, max(1, int(request.args.get("limit", SEARCH_LIMIT))))
+    except ValueError:
+        return jsonify(error="limit must be an integer"), 400
+    query = request.args.get("q", "")
+    index = get_search_index()
+    matches, truncated = index.search(query, limit)
+    detail = detail_url_prefix()
+    results = []
+    for orchestrator_id, address, match in matches:
+        record = find_orchestrator(address) or {}
+        results.append(
+            {
+                "orchestrator_id": orchestrator_id,
+                "address": address,
+                "match": match,
+                "balance_eth": record.get("balance_eth"),
+                "status": STATUS_LABELS[status_code(record)] if record else None,
+                "url": detail + quote(address, safe=""),
+            }
+        )
+    return jsonify(
+        query=query, generation=index.generation, results=results, truncated=truncated
     )
 
 
+@bp.route("/api/orchestrators")
+def api_orchestrators():
+    """The current fleet as JSON.
+
+    ?format=columns returns {"columns": [...], "data": [[...], ...]} with one
+    array per column, paged by ?offset= and ?limit= (at most API_PAGE_SIZE).
+    Status is an index into "status_labels". ?at= returns the fleet as of
+    that instant instead (see fleet_as_of()), with a null generation.
+    """
+    at = None
+    if request.args.get("at"):
+        try:
+            at = parse_as_of(request.args["at"])
+        except ValueError:
+            return jsonify(error="at must be a past ISO 8601 time or Unix timestamp"), 400
+    if request.args.get("format") == "columns":
+        try:
+            body = orchestrators_columns_body(
+                request.args.get("offset", 0), request.args.get("limit", API_PAGE_SIZE), at
+            )
+        except ValueError:
+            return jsonify(error="offset and limit must be integers"), 400
+        return _json_response(body)
+    if at is not None:
+        return _json_response(as_of_rows_body(at))
+    return _json_response(orchestrators_rows_body())
+
+
+def orchestrators_columns_body(offset, limit, at=None):
+    """JSON body of one ?format=columns page; ValueError on bad numbers."""
+    offset = max(0, int(offset))
+    limit = min(API_PAGE_SIZE, max(1, int(limit)))
+    if at is None:
+        generation, columns = fleet_columns()
+        extra = {"generation": generation, "last_update": last_update}
+    else:
+        key, entry = cached_as_of(at)
+        columns = entry["columns"]
+        extra = {"generation": None, "at": key}
+    return json.dumps(
+        dict(
+            extra,
+            total=len(columns["address"]),
+            offset=offset,
+            columns=list(API_COLUMNS),
+            status_labels=list(STATUS_LABELS),
+            data=[columns[name][offset:offset + limit] for name in API_COLUMNS],
+        ),
+        separators=(",", ":"),
+    )
+
+
+def as_of_rows_body(at):
+    """JSON body of the row-per-orchestrator API as of `at`, cached."""
+    key, entry = cached_as_of(at)
+    body = entry["bodies"].get("json")
+    if body is None:
+        body = json.dumps(
+            {"generation": None, "at": key, "orchestrators": entry["fleet"]},
+            separators=(",", ":"),
+        )
+        get_as_of_cache().add_body(key, (DB_FILE, HISTORY_SHARDS), "json", body)
+    return body
+
+
+def cached_rows_body():
+    """orchestrators_rows_body() if already built for this generation, else None."""
+    generation, body = _rows_cache
+    return body if generation == data_generation else None
+
+
+def orchestrators_rows_body():
+    """JSON body of the row-per-orchestrator API, cached per generation."""
+    global _rows_cache
+    generation, body = _rows_cache
+    if generation != data_generation:
+        generation, fleet = data_generation, orchestrators_data
+        body = json.dumps(
+            {"generation": generation, "last_update": last_update, "orchestrators": fleet},
+            separators=(",", ":"),
+        )
+        _rows_cache = (generation, body)
+    return body
+
+
+def event_frame(retry_ms=None):
+    """A server-sent event announcing the generation being served."""
+    data = json.dumps(
+        {"generation": data_generation, "last_update": last_update},
+        separators=(",", ":"),
+    )
+    retry = "retry: {}\n".format(retry_ms) if retry_ms else ""
+    return "id: {}\n{}event: generation\ndata: {}\n\n".format(data_generation, retry, data)
+
+
+@bp.route("/api/events")
+def api_events():
+    """Live updates as text/event-stream.
+
+    WSGI workers cannot park a thread per idle subscriber, so this answers
+    with the current generation and asks the browser to reconnect after
+    UPDATE_INTERVAL. The ASGI entry point (asgi.py) serves the same URL as
+    a long-lived stream that pushes each new generation as it is published.
+    """
+    response = current_app.response_class(
+        event_frame(retry_ms=UPDATE_INTERVAL * 1000), mimetype="text/event-stream"
+    )
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+@bp.route("/api/summary")
+def api_summary():
+    """Fleet aggregates: totals, 24h change and nodes projected to drain."""
+    return jsonify(
+        generation=data_generation,
+        last_update=last_update,
+        summary=fleet_summary(orchestrators_data),
+    )
+
+
+@bp.route("/api/sources")
+def api_sources():
+    """Per-source latency, freshness and last error."""
+    return jsonify(sources=load_source_status(), stale_after=UPDATE_INTERVAL * 3)
+
+
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
-    init_db()
-    thread = threading.Thread(target=fetch_orchestrators)
-    thread.daemon = True
-    thread.start()
-    time.sleep(2)
+    app = create_app()
+    start_collector()
     app.run(host="0.0.0.0", port=5000)
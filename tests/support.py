@@ -0,0 +1,29 @@
+"""Helpers shared by the test modules."""
+import importlib.machinery
+import importlib.util
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+MODULE_PATH = os.path.join(ROOT, "test_orchestrators.py")
+
+# The side modules (admission, columnar, search, ...) import from the root.
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def load_module(name, path):
+    loader = importlib.machinery.SourceFileLoader(name, path)
+    spec = importlib.util.spec_from_loader(loader.name, loader)
+    module = importlib.util.module_from_spec(spec)
+    loader.exec_module(module)
+    return module
+
+
+def load_app_module():
+    """A fresh copy of the dashboard module.
+
+    The dashboard keeps its settings and state in module globals (one app
+    per process, see create_app()), so each test gets its own copy.
+    """
+    return load_module("dashboard_app", MODULE_PATH)
@@ -0,0 +1,161 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from support import load_app_module
+
+import admission
+
+
+class ControllerTests(unittest.TestCase):
+    def test_token_bucket_refills_at_rate(self):
+        controller = admission.AdmissionController(rate=2, burst=2)
+        self.assertEqual(controller.throttle("a", now=0.0), 0)
+        self.assertEqual(controller.throttle("a", now=0.0), 0)
+        self.assertAlmostEqual(controller.throttle("a", now=0.0), 0.5)
+        self.assertEqual(controller.throttle("b", now=0.0), 0)  # buckets are per client
+        self.assertEqual(controller.throttle("a", now=0.5), 0)
+        self.assertEqual(controller.stats()["rate_limited"], 1)
+
+    def test_collector_priority_holds_requests_until_the_poll_ends(self):
+        controller = admission.AdmissionController(concurrency=4, queue=4, timeout=5, poll_concurrency=1)
+        controller.admit("index", "a")
+        admitted = threading.Event()
+
+        def second():
+            controller.admit("api", "b")
+            admitted.set()
+
+        with controller.collector_priority():
+            thread = threading.Thread(target=second)
+            thread.start()
+            time.sleep(0.1)
+            self.assertFalse(admitted.is_set())
+            self.assertEqual(controller.stats()["routes"]["api"]["waiting"], 1)
+        thread.join(2)
+        self.assertTrue(admitted.is_set())
+        stats = controller.stats()
+        self.assertEqual((stats["active"], stats["queued"], stats["rejected"]), (2, 1, 0))
+
+
+class AdmissionTests(unittest.TestCase):
+    def setUp(self):
+        self.module = load_app_module()
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def client(self, **config):
+        config.setdefault("DB_FILE", os.path.join(self.temp_dir.name, "test.db"))
+        return self.module.create_app(config).test_client()
+
+    def test_client_over_its_rate_gets_429(self):
+        client = self.client(CLIENT_RATE=1, CLIENT_BURST=2)
+        statuses = [client.get("/api/summary").status_code for _ in range(3)]
+        self.assertEqual(statuses, [200, 200, 429])
+        response = client.get("/api/summary")
+        self.assertEqual(response.headers["Retry-After"], "1")
+        self.assertEqual(response.get_json()["error"], "rate limited")
+
+        status = client.get("/api/status")  # exempt, so an overload stays observable
+        self.assertEqual(status.status_code, 200)
+        self.assertEqual(status.get_json()["admission"]["rate_limited"], 2)
+
+    def test_clients_behind_a_trusted_proxy_get_their_own_bucket(self):
+        client = self.client(CLIENT_RATE=1, CLIENT_BURST=1, TRUSTED_PROXIES=1)
+
+        def get(forwarded_for):
+            return client.get(
+                "/api/summary",
+                headers={"X-Forwarded-For": forwarded_for},
+                environ_base={"REMOTE_ADDR": "127.0.0.1"},
+            ).status_code
+
+        self.assertEqual(get("203.0.113.5"), 200)
+        self.assertEqual(get("198.51.100.7"), 200)
+        self.assertEqual(get("203.0.113.5"), 429)
+        # Entries left of the trusted proxy's are the client's own claims.
+        self.assertEqual(get("192.0.2.1, 203.0.113.5"), 429)
+
+    def test_forwarded_for_is_ignored_without_trusted_proxies(self):
+        client = self.client(CLIENT_RATE=1, CLIENT_BURST=1)
+        statuses = [
+            client.get("/api/summary", headers={"X-Forwarded-For": address}).status_code
+            for address in ("203.0.113.5", "198.51.100.7")
+        ]
+        self.assertEqual(statuses, [200, 429])
+
+    def test_busy_route_queues_then_sheds_with_503(self):
+        client = self.client(ROUTE_LIMITS='{"api_summary": 1}', ROUTE_QUEUE=1, QUEUE_TIMEOUT=5, CLIENT_RATE=0)
+        release = threading.Event()
+        summary = self.module.fleet_summary
+
+        def slow_summary(fleet):
+            release.wait(5)
+            return summary(fleet)
+
+        self.module.fleet_summary = slow_summary
+        results = []
+
+        def get():
+            results.append(client.get("/api/summary").status_code)
+
+        threads = [threading.Thread(target=get) for _ in range(2)]
+        for thread in threads:  # one runs, one waits in the queue
+            thread.start()
+        for _ in range(100):
+            routes = self.module.get_admission().stats()["routes"]
+            if routes.get("dashboard.api_summary", {}).get("waiting"):
+                break
+            time.sleep(0.01)
+        shed = client.get("/api/summary")
+        self.assertEqual(shed.status_code, 503)
+        self.assertEqual(shed.headers["Retry-After"], "1")
+        self.assertEqual(client.get("/api/sources").status_code, 200)  # other routes unaffected
+
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [200, 200])
+        stats = client.get("/api/status").get_json()["admission"]["routes"]["dashboard.api_summary"]
+        self.assertEqual(
+            (stats["limit"], stats["active"], stats["admitted"], stats["queued"], stats["rejected"]),
+            (1, 0, 2, 1, 1),
+        )
+
+    def test_queue_timeout_sheds_with_503(self):
+        client = self.client(ROUTE_LIMITS='{"api_summary": 1}', ROUTE_QUEUE=4, QUEUE_TIMEOUT=0, CLIENT_RATE=0)
+        controller = self.module.get_admission()
+        controller.admit("dashboard.api_summary", "other")
+        self.assertEqual(client.get("/api/summary").status_code, 503)
+        controller.release("dashboard.api_summary")
+        self.assertEqual(client.get("/api/summary").status_code, 200)
+        self.assertEqual(controller.stats()["timed_out"], 1)
+
+    def test_poll_holds_requests_back_after_the_fetch_only(self):
+        self.client()
+        controller = self.module.get_admission()
+        polling = {}
+
+        def fetch(source):
+            polling["fetch"] = controller.stats()["polling"]
+            return [{"orchestrator_id": "a", "address": "0xa", "balance_eth": 1.0}]
+
+        process_fleet = self.module.process_fleet
+
+        def process(data, now=None):
+            polling["process"] = controller.stats()["polling"]
+            return process_fleet(data, now=now)
+
+        self.module.fetch_source = fetch
+        self.module.process_fleet = process
+        self.module.run_poll()
+        self.assertEqual(polling, {"fetch": False, "process": True})
+        self.assertFalse(controller.stats()["polling"])
+
+
+if __name__ == "__main__":
+    unittest.main()
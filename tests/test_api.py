@@ -0,0 +1,76 @@
+import os
+import tempfile
+import unittest
+
+from support import load_app_module
+
+
+def make_fleet(size):
+    return [
+        {
+            "orchestrator_id": "orch-{:05d}".format(i),
+            "address": "0x{:040x}".format(i),
+            "balance_eth": i / 100.0,
+            "balance_change_24h": -0.5 if i % 2 else 0.0,
+            "eligible_for_payments": i % 3 == 0,
+            "cooldown_active": i % 5 == 0,
+            "last_healthy_at": "2024-01-01T00:00:00+00:00" if i % 4 else None,
+        }
+        for i in range(size)
+    ]
+
+
+class OrchestratorsApiTests(unittest.TestCase):
+    def setUp(self):
+        self.module = load_app_module()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.app = self.module.create_app(
+            {"DB_FILE": os.path.join(self.temp_dir.name, "test.db")}
+        )
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def publish(self, fleet):
+        self.module.publish_fleet(fleet)
+
+    def test_columns_payload_is_paged(self):
+        self.publish(make_fleet(25))
+        payload = self.client.get(
+            "/api/orchestrators?format=columns&offset=20&limit=10"
+        ).get_json()
+
+        self.assertEqual(payload["total"], 25)
+        self.assertEqual(payload["offset"], 20)
+        columns = dict(zip(payload["columns"], payload["data"]))
+        self.assertEqual(columns["orchestrator_id"], ["orch-{:05d}".format(i) for i in range(20, 25)])
+        # orch-00020: cooldown; orch-00021: eligible; orch-00022: neither
+        self.assertEqual(columns["status"][:3], [1, 0, 2])
+        self.assertEqual(payload["status_labels"][1], "Cooldown")
+
+    def test_columns_payload_is_smaller_than_rendered_table(self):
+        self.publish(make_fleet(2000))
+        table = self.client.get("/?view=table").get_data()
+        columns = self.client.get("/api/orchestrators?format=columns").get_data()
+        self.assertLess(len(columns) * 3, len(table))
+
+    def test_large_fleet_uses_virtual_table(self):
+        self.module.VIRTUAL_TABLE_THRESHOLD = 10
+        self.publish(make_fleet(11))
+        html = self.client.get("/").get_data(as_text=True)
+        self.assertIn('id="vt-search"', html)
+        self.assertNotIn("orch-00003", html)
+
+        html = self.client.get("/?view=table").get_data(as_text=True)
+        self.assertIn("orch-00003", html)
+
+    def test_rows_payload(self):
+        self.publish(make_fleet(3))
+        payload = self.client.get("/api/orchestrators").get_json()
+        self.assertEqual(payload["generation"], self.module.data_generation)
+        self.assertEqual(len(payload["orchestrators"]), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
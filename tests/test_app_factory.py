@@ -0,0 +1,69 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from support import ROOT, load_app_module
+
+
+class AppFactoryTests(unittest.TestCase):
+    def setUp(self):
+        self.module = load_app_module()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_file = os.path.join(self.temp_dir.name, "test.db")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_import_is_lazy(self):
+        code = (
+            "import sys, test_orchestrators; "
+            "print('requests' in sys.modules, '_default_app' in vars(test_orchestrators) "
+            "and test_orchestrators._default_app is not None)"
+        )
+        out = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.split()
+        self.assertEqual(out, ["False", "False"])
+
+    def test_create_app_applies_config_overrides(self):
+        app = self.module.create_app({"DB_FILE": self.db_file, "UPDATE_INTERVAL": 900})
+        self.assertEqual(self.module.DB_FILE, self.db_file)
+        self.assertEqual(self.module.UPDATE_INTERVAL, 900)
+        self.assertTrue(os.path.exists(self.db_file))
+        self.assertIn("dashboard_template", app.extensions)
+
+    def test_second_app_with_other_settings_is_flagged(self):
+        self.module.create_app({"DB_FILE": self.db_file, "UPDATE_INTERVAL": 5})
+        with self.assertLogs(level="WARNING") as logs:
+            self.module.create_app({"DB_FILE": self.db_file, "UPDATE_INTERVAL": 99})
+        self.assertIn("apps built earlier in this process now use them too", logs.output[0])
+        self.assertEqual(self.module.UPDATE_INTERVAL, 99)
+
+    def test_follower_picks_up_newer_snapshot(self):
+        app = self.module.create_app({"DB_FILE": self.db_file})
+        client = app.test_client()
+        self.assertNotIn("orch-late", client.get("/").get_data(as_text=True))
+
+        fleet = [
+            {
+                "orchestrator_id": "orch-late",
+                "address": "0x" + "1" * 40,
+                "balance_eth": 2.0,
+                "balance_change_24h": 0.0,
+            }
+        ]
+        self.module.save_snapshot(fleet, "2024-03-01T12:00:00+00:00", 5)
+        self.module._follow_checked_at = 0.0
+
+        self.assertIn("orch-late", client.get("/").get_data(as_text=True))
+        self.assertEqual(self.module.data_generation, 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
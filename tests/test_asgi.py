@@ -0,0 +1,297 @@
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+from support import ROOT, load_app_module, load_module
+
+ASGI_PATH = os.path.join(ROOT, "asgi.py")
+
+
+def load_asgi_modules():
+    """Load asgi.py bound to a fresh copy of the dashboard module."""
+    dashboard = load_app_module()
+    saved = sys.modules.get("test_orchestrators")
+    sys.modules["test_orchestrators"] = dashboard
+    try:
+        asgi = load_module("dashboard_asgi", ASGI_PATH)
+    finally:
+        if saved is None:
+            sys.modules.pop("test_orchestrators", None)
+        else:
+            sys.modules["test_orchestrators"] = saved
+    return dashboard, asgi
+
+
+FLEET = [
+    {"orchestrator_id": "a", "address": "0xa", "balance_eth": 1.0, "balance_change_24h": 0.0},
+    {"orchestrator_id": "b", "address": "0xb", "balance_eth": 2.0, "balance_change_24h": 0.0},
+]
+
+
+async def call(app, method, path, query=b"", headers=(), body=b""):
+    """Drive one plain HTTP request through an ASGI app."""
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "root_path": "",
+        "query_string": query,
+        "headers": [(k.encode(), v.encode()) for k, v in headers],
+        "http_version": "1.1",
+        "scheme": "http",
+        "server": ("testserver", 80),
+        "client": ("127.0.0.1", 1234),
+    }
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    sent = []
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        sent.append(message)
+
+    await app(scope, receive, send)
+    start = sent[0]
+    return (
+        start["status"],
+        {k.decode(): v.decode() for k, v in start["headers"]},
+        b"".join(m.get("body", b"") for m in sent[1:]),
+    )
+
+
+class AsgiTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.dashboard, self.asgi = load_asgi_modules()
+        self.fetches = 0
+        self.dashboard.fetch_source = self.fake_fetch
+        self.app = self.asgi.DashboardASGI(
+            {
+                "DB_FILE": os.path.join(self.temp_dir.name, "test.db"),
+                "UPDATE_INTERVAL": 3600,
+                "DASHBOARD_TOKEN": "secret",
+            }
+        )
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def fake_fetch(self, source):
+        self.fetches += 1
+        return [dict(o) for o in FLEET]
+
+    def run_app(self, coro_fn):
+        async def runner():
+            await self.app.startup()
+            try:
+                return await coro_fn()
+            finally:
+                await self.app.shutdown()
+
+        return asyncio.run(runner())
+
+    async def wait_for_generation(self, generation):
+        for _ in range(200):
+            if self.dashboard.data_generation >= generation:
+                return
+            await asyncio.sleep(0.01)
+        self.fail("generation {} never published".format(generation))
+
+    def test_collector_task_polls_on_startup(self):
+        async def scenario():
+            await self.wait_for_generation(1)
+            return await call(self.app, "GET", "/api/orchestrators")
+
+        status, headers, body = self.run_app(scenario)
+        self.assertEqual(status, 200)
+        self.assertEqual(headers["content-type"], "application/json")
+        self.assertEqual(len(json.loads(body)["orchestrators"]), 2)
+        self.assertTrue(self.dashboard.collector_owner)
+        self.assertEqual(self.fetches, 1)
+
+    def test_page_is_served_from_the_shared_cache(self):
+        async def scenario():
+            await self.wait_for_generation(1)
+            first = await call(self.app, "GET", "/")
+            cached = await call(self.app, "GET", "/")
+            etag = first[1]["etag"]
+            revalidated = await call(self.app, "GET", "/", headers=[("if-none-match", etag)])
+            return first, cached, revalidated
+
+        first, cached, revalidated = self.run_app(scenario)
+        self.assertEqual(first[0], 200)
+        self.assertIn(b"data-events=", first[2])
+        self.assertEqual(cached[2], first[2])
+        self.assertEqual(cached[1]["etag"], first[1]["etag"])
+        self.assertEqual(revalidated[0], 304)
+        self.assertEqual(revalidated[2], b"")
+
+    def test_cached_page_does_not_read_the_database_on_the_event_loop(self):
+        readers = set()
+        load_poll_stats = self.dashboard.load_poll_stats
+
+        def tracked():
+            readers.add(threading.get_ident())
+            return load_poll_stats()
+
+        self.dashboard.load_poll_stats = tracked
+
+        async def scenario():
+            await self.wait_for_generation(1)
+            await call(self.app, "GET", "/")
+            await asyncio.sleep(1.1)  # past last_poll_finished()'s re-read interval
+            readers.clear()
+            return await call(self.app, "GET", "/")
+
+        status, _, body = self.run_app(scenario)
+        self.assertEqual(status, 200)
+        self.assertIn(b"data-events=", body)
+        self.assertNotIn(threading.get_ident(), readers)
+
+    def test_other_routes_are_bridged_to_flask(self):
+        async def scenario():
+            await self.wait_for_generation(1)
+            status = await call(self.app, "GET", "/api/status")
+            refused = await call(self.app, "POST", "/refresh")
+            bad_page = await call(
+                self.app, "GET", "/api/orchestrators", query=b"format=columns&offset=x"
+            )
+            return status, refused, bad_page
+
+        status, refused, bad_page = self.run_app(scenario)
+        self.assertEqual(status[0], 200)
+        self.assertEqual(json.loads(status[2])["generation"], 1)
+        self.assertEqual(refused[0], 403)
+        self.assertEqual(bad_page[0], 400)
+
+    def test_rate_limit_applies_to_cached_and_bridged_routes(self):
+        self.app.config = dict(self.app.config, CLIENT_RATE=1, CLIENT_BURST=2)
+
+        async def scenario():
+            await self.wait_for_generation(1)
+            first = await call(self.app, "GET", "/api/orchestrators")
+            bridged = await call(self.app, "GET", "/api/summary")
+            limited = await call(self.app, "GET", "/")
+            status = await call(self.app, "GET", "/api/status")
+            return first, bridged, limited, status
+
+        first, bridged, limited, status = self.run_app(scenario)
+        self.assertEqual((first[0], bridged[0], limited[0]), (200, 200, 429))
+        self.assertEqual(limited[1]["retry-after"], "1")
+        admission = json.loads(status[2])["admission"]
+        self.assertEqual(admission["rate_limited"], 1)  # bridged requests are charged once
+        self.assertEqual(admission["routes"]["dashboard.api_summary"]["admitted"], 1)
+
+    def test_answers_on_the_event_loop_are_traced(self):
+        trace_dir = os.path.join(self.temp_dir.name, "traces")
+        self.app.config = dict(self.app.config, TRACE_DIR=trace_dir, CLIENT_RATE=1, CLIENT_BURST=3)
+
+        def stop_tracing():
+            exporter = self.asgi.tracing.configure(None)
+            if exporter is not None:
+                exporter.close()
+
+        self.addCleanup(stop_tracing)
+
+        async def scenario():
+            await self.wait_for_generation(1)
+            await call(self.app, "GET", "/")  # rendered by Flask
+            await call(self.app, "GET", "/")
+            rows = await call(self.app, "GET", "/api/orchestrators", query=b"x=1")
+            await call(self.app, "GET", "/orchestrator/0xa")
+            return rows
+
+        rows = self.run_app(scenario)
+        self.asgi.tracing.get_exporter().flush()
+        roots = {}
+        (name,) = os.listdir(trace_dir)
+        with open(os.path.join(trace_dir, name)) as fh:
+            for line in fh:
+                (resource_spans,) = json.loads(line)["resourceSpans"]
+                for span in resource_spans["scopeSpans"][0]["spans"]:
+                    if not span["parentSpanId"]:
+                        attributes = {
+                            a["key"]: list(a["value"].values())[0] for a in span["attributes"]
+                        }
+                        roots.setdefault(span["name"], []).append((span["kind"], attributes))
+
+        self.assertEqual(len(roots["GET /"]), 2)
+        ((kind, attributes),) = roots["GET /api/orchestrators"]
+        self.assertEqual(kind, 2)
+        self.assertEqual(attributes["http.target"], "/api/orchestrators?x=1")
+        self.assertEqual(int(attributes["http.status_code"]), 200)
+        self.assertEqual(int(attributes["http.response_content_length"]), len(rows[2]))
+        ((_, attributes),) = roots["GET /orchestrator/<address>"]
+        self.assertEqual(int(attributes["http.status_code"]), 429)
+
+    def test_rate_limit_follows_forwarded_for_behind_a_trusted_proxy(self):
+        self.app.config = dict(self.app.config, CLIENT_RATE=1, CLIENT_BURST=1, TRUSTED_PROXIES=1)
+
+        async def scenario():
+            await self.wait_for_generation(1)
+            statuses = []
+            for address in ("203.0.113.5", "198.51.100.7", "203.0.113.5"):
+                response = await call(
+                    self.app, "GET", "/api/orchestrators", headers=[("x-forwarded-for", address)]
+                )
+                statuses.append(response[0])
+            return statuses
+
+        self.assertEqual(self.run_app(scenario), [200, 200, 429])
+
+    def test_events_push_new_generations(self):
+        async def scenario():
+            await self.wait_for_generation(1)
+            frames = asyncio.Queue()
+            disconnect = asyncio.Event()
+            scope = {
+                "type": "http",
+                "method": "GET",
+                "path": "/api/events",
+                "query_string": b"",
+                "headers": [],
+            }
+
+            async def receive():
+                await disconnect.wait()
+                return {"type": "http.disconnect"}
+
+            async def send(message):
+                await frames.put(message)
+
+            stream = asyncio.ensure_future(self.app(scope, receive, send))
+            start = await frames.get()
+            first = await frames.get()
+            self.assertEqual(self.app.subscribers, 1)
+            self.dashboard.publish_fleet([dict(o) for o in FLEET[:1]])
+            second = await asyncio.wait_for(frames.get(), 5)
+            disconnect.set()
+            await asyncio.wait_for(stream, 5)
+            return start, first, second
+
+        start, first, second = self.run_app(scenario)
+        self.assertEqual(dict(start["headers"])[b"content-type"], b"text/event-stream; charset=utf-8")
+        self.assertIn(b"id: 1\n", first["body"])
+        self.assertIn(b"id: 2\n", second["body"])
+        self.assertTrue(second["more_body"])
+        self.assertEqual(self.app.subscribers, 0)
+
+    def test_wsgi_events_answer_once_with_retry(self):
+        flask_app = self.dashboard.create_app(
+            {"DB_FILE": os.path.join(self.temp_dir.name, "wsgi.db"), "UPDATE_INTERVAL": 10}
+        )
+        response = flask_app.test_client().get("/api/events")
+        self.assertEqual(response.mimetype, "text/event-stream")
+        self.assertIn(b"retry: 10000\n", response.data)
+        self.assertIn(b"event: generation\n", response.data)
+
+
+if __name__ == "__main__":
+    unittest.main()
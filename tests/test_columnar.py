@@ -0,0 +1,83 @@
+import math
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from support import load_app_module
+
+import columnar
+
+
+def make_fleet():
+    return [
+        {"orchestrator_id": "b", "address": "0xb", "balance_eth": 2.0, "last_healthy_at": "2024-01-01T00:00:00"},
+        {"orchestrator_id": "a", "address": "0xa", "balance_eth": 5.0, "eligible_for_payments": True},
+        {"orchestrator_id": "c", "address": "0xc", "balance_eth": 1.0, "cooldown_active": True},
+    ]
+
+
+@unittest.skipUnless(columnar.available(), "NumPy is not installed")
+class ColumnarBackendTests(unittest.TestCase):
+    def setUp(self):
+        self.module = load_app_module()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.module.DB_FILE = os.path.join(self.temp_dir.name, "test.db")
+        self.module.init_db()
+        self.now = datetime(2024, 5, 1, 12, 0, tzinfo=timezone.utc)
+        self.module.save_balances(
+            [
+                ("0xa", 4.0, (self.now - timedelta(hours=30)).isoformat()),
+                ("0xa", 6.0, (self.now - timedelta(hours=2)).isoformat()),
+                ("0xb", 3.2, (self.now - timedelta(hours=20)).isoformat()),
+                ("0xc", 1.0, (self.now - timedelta(minutes=20)).isoformat()),
+            ]
+        )
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def process(self, backend):
+        self.module.COLUMNAR_BACKEND = backend
+        fleet = make_fleet()
+        self.module.process_fleet(fleet, now=self.now)
+        return fleet
+
+    def test_matches_row_loop(self):
+        vectorized = self.process("auto")
+        rows = list(self.module.get_db().execute(
+            "SELECT address, balance, timestamp FROM balance_history ORDER BY id"
+        ))
+
+        # Rebuild the same starting history for the loop path.
+        self.tearDown()
+        self.setUp()
+        looped = self.process("off")
+        self.assertEqual(vectorized, looped)
+        self.assertEqual(
+            rows,
+            list(self.module.get_db().execute(
+                "SELECT address, balance, timestamp FROM balance_history ORDER BY id"
+            )),
+        )
+
+    def test_deltas_and_drain_projection(self):
+        fleet = {o["address"]: o for o in self.process("auto")}
+        self.assertAlmostEqual(fleet["0xa"]["balance_change_24h"], 1.0)
+        self.assertAlmostEqual(fleet["0xb"]["balance_change_24h"], -1.2)
+        self.assertAlmostEqual(fleet["0xb"]["drain_hours"], 2.0 / (1.2 / 24))
+        self.assertIsNone(fleet["0xa"]["drain_hours"])
+
+    def test_summary_matches_python_aggregates(self):
+        fleet = self.process("auto")
+        vectorized = self.module.fleet_summary(fleet, drain_warning_hours=48)
+        self.module.COLUMNAR_BACKEND = "off"
+        plain = self.module.fleet_summary(fleet, drain_warning_hours=48)
+        self.assertEqual(vectorized.keys(), plain.keys())
+        for key in plain:
+            self.assertTrue(math.isclose(vectorized[key], plain[key]), key)
+        self.assertEqual(plain["draining_soon"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
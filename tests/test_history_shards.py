@@ -0,0 +1,170 @@
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import unittest
+import zlib
+from datetime import datetime, timedelta, timezone
+
+import support
+
+T0 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def load_app_module():
+    module = support.load_app_module()
+    # Worker processes look _rollup_shard up by module name.
+    sys.modules[module.__name__] = module
+    return module
+
+
+def synthetic_rows(count=40, seed=2):
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        address = "0x{:04x}".format(i)
+        for step in range(rng.randint(1, 12)):
+            moment = T0 + timedelta(minutes=37 * step + i)
+            rows.append((address, round(rng.uniform(0, 5), 6), moment.isoformat()))
+    return rows
+
+
+class ShardedHistoryTests(unittest.TestCase):
+    def setUp(self):
+        self.module = load_app_module()
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.module.get_history_store().close()
+        self.temp_dir.cleanup()
+
+    def use(self, name, shards):
+        self.module.create_app(
+            {"DB_FILE": os.path.join(self.temp_dir.name, name), "HISTORY_SHARDS": shards}
+        )
+        return self.module.get_history_store()
+
+    def snapshot(self, now):
+        return (
+            self.module.get_latest_all(),
+            self.module.get_balances_24h_ago_all(now),
+            list(self.module.iter_history()),
+            list(self.module.iter_hourly()),
+        )
+
+    def test_sharded_queries_match_single_file(self):
+        rows = synthetic_rows()
+        now = T0 + timedelta(hours=26)
+        results = []
+        for name, shards in (("single.db", 0), ("sharded.db", 3)):
+            self.use(name, shards)
+            self.module.save_balances(rows)
+            self.module.roll_up_hours(T0 + timedelta(hours=8), since=T0)
+            results.append(self.snapshot(now))
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(len(results[0][2]), len(rows))
+
+    def test_rows_are_placed_by_address_hash(self):
+        store = self.use("placed.db", 4)
+        self.assertTrue(all(os.path.exists(path) for path in store.paths))
+        self.assertTrue(store.paths[1].endswith("placed.shard-1-of-4.db"))
+        self.module.save_balances(synthetic_rows(count=20))
+        for k, path in enumerate(store.paths):
+            conn = sqlite3.connect(path)
+            addresses = [row[0] for row in conn.execute("SELECT DISTINCT address FROM balance_history")]
+            conn.close()
+            for address in addresses:
+                self.assertEqual(zlib.crc32(address.encode()) % 4, k)
+        main = sqlite3.connect(store.db_file)
+        tables = {row[0] for row in main.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        main.close()
+        self.assertNotIn("balance_history", tables)
+
+    def test_process_fleet_is_unchanged_by_sharding(self):
+        fleet = [
+            {"orchestrator_id": str(i), "address": "0x{:02x}".format(i), "balance_eth": float(i)}
+            for i in range(12)
+        ]
+        results = []
+        for name, shards in (("single.db", 0), ("sharded.db", 4)):
+            self.use(name, shards)
+            data = [dict(o) for o in fleet]
+            self.module.process_fleet(data, now=T0)
+            later = [dict(o, balance_eth=o["balance_eth"] / 2) for o in fleet]
+            self.module.process_fleet(later, now=T0 + timedelta(hours=25))
+            results.append(([o["balance_change_24h"] for o in later], list(self.module.iter_history())))
+        self.assertEqual(results[0], results[1])
+
+    def test_cleanup_is_staggered_across_shards(self):
+        store = self.use("cleanup.db", 2)
+        self.module.HISTORY_RETENTION_HOURS = 1
+        rows = []
+        for i in range(10):
+            for hour in range(4):
+                rows.append(("0x{:02x}".format(i), float(hour), (T0 + timedelta(hours=hour)).isoformat()))
+        self.module.save_balances(rows)
+
+        def counts():
+            return store.map(
+                lambda conn, shard: conn.execute("SELECT COUNT(*) FROM balance_history").fetchone()[0]
+            )
+
+        before = counts()
+        now = T0 + timedelta(hours=4)
+        self.assertEqual(store.next_cleanup(), [0])
+        self.module.cleanup_old_records(now=now, shards=[0])
+        after = counts()
+        self.assertLess(after[0], before[0])
+        self.assertEqual(after[1], before[1])
+        self.assertEqual(store.next_cleanup(), [1])
+        self.assertEqual(store.next_cleanup(), [0])
+
+    def test_reshard_preserves_history(self):
+        self.use("reshard.db", 0)
+        self.module.save_balances(synthetic_rows())
+        self.module.roll_up_hours(T0 + timedelta(hours=8), since=T0)
+        expected = self.snapshot(T0 + timedelta(hours=26))
+
+        copied = self.module.reshard_history(4, drop_source=True)
+        self.assertEqual(copied["balance_history"], len(expected[2]))
+        self.assertEqual(self.module.count_history(), 0)
+        self.module.configure(self.module.load_config({"HISTORY_SHARDS": 4}))
+        self.assertEqual(self.snapshot(T0 + timedelta(hours=26)), expected)
+
+        with self.assertRaises(ValueError):
+            self.module.reshard_history(4)
+        old = self.module.get_history_store().paths
+        self.module.reshard_history(2, drop_source=True)
+        self.assertFalse(any(os.path.exists(path) for path in old))
+        self.module.configure(self.module.load_config({"HISTORY_SHARDS": 2}))
+        self.assertEqual(self.snapshot(T0 + timedelta(hours=26)), expected)
+
+    def test_history_is_merged_in_order(self):
+        self.use("ordered.db", 3)
+        rows = synthetic_rows()
+        self.module.save_balances(list(reversed(rows)))
+        expected = sorted(rows, key=lambda r: (r[0], r[2]))
+        self.assertEqual(list(self.module.iter_history()), expected)
+        since, until = T0 + timedelta(hours=1), T0 + timedelta(hours=3)
+        self.assertEqual(
+            list(self.module.iter_history(address="0x0003", since=since, until=until)),
+            [r for r in expected if r[0] == "0x0003" and since.isoformat() <= r[2] < until.isoformat()],
+        )
+
+    def test_recompute_matches_single_file(self):
+        rows = synthetic_rows()
+        since, until = T0, T0 + timedelta(hours=8)
+        results = []
+        for name, shards, workers in (("single.db", 0, 0), ("sharded.db", 3, 0), ("pool.db", 3, 2)):
+            self.use(name, shards)
+            self.module.save_balances(rows)
+            written = self.module.recompute_rollups(since=since, until=until, workers=workers, shards=5)
+            results.append((written, list(self.module.iter_hourly())))
+        self.assertGreater(results[0][0], 0)
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(results[0], results[2])
+
+
+if __name__ == "__main__":
+    unittest.main()
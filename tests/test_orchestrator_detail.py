@@ -0,0 +1,111 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from support import load_app_module
+
+T0 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+ADDRESS = "0x" + "ab" * 20
+
+
+def record(balance, eligible=True, cooldown=False, address=ADDRESS):
+    return {
+        "orchestrator_id": "orch-a",
+        "address": address,
+        "balance_eth": balance,
+        "eligible_for_payments": eligible,
+        "cooldown_active": cooldown,
+        "last_healthy_at": T0.isoformat(),
+    }
+
+
+class BurnRateTests(unittest.TestCase):
+    def setUp(self):
+        self.module = load_app_module()
+
+    def at(self, hours):
+        return (T0 + timedelta(hours=hours)).isoformat()
+
+    def test_top_ups_do_not_hide_spending(self):
+        points = [(self.at(-1), 10.0), (self.at(2), 8.0), (self.at(3), 12.0), (self.at(5), 11.0)]
+        rate = self.module.burn_rate(points, T0, T0 + timedelta(hours=6))
+        self.assertAlmostEqual(rate, 3.0 / 6)
+
+    def test_window_starts_at_first_point_without_carry_in(self):
+        points = [(self.at(2), 4.0), (self.at(4), 3.0)]
+        self.assertAlmostEqual(self.module.burn_rate(points, T0, T0 + timedelta(hours=6)), 0.25)
+        self.assertIsNone(self.module.burn_rate([], T0, T0 + timedelta(hours=6)))
+
+
+class OrchestratorDetailTests(unittest.TestCase):
+    def setUp(self):
+        self.module = load_app_module()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.app = self.module.create_app(
+            {"DB_FILE": os.path.join(self.temp_dir.name, "test.db"), "DETAIL_CACHE_SIZE": 2}
+        )
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def poll(self, fleet, now):
+        self.module.process_fleet(fleet, now=now)
+        self.module.publish_fleet(fleet, taken_at=now)
+
+    def test_status_changes_are_recorded_once(self):
+        self.poll([record(5.0)], T0)
+        self.poll([record(4.0)], T0 + timedelta(hours=1))
+        self.poll([record(3.0, cooldown=True)], T0 + timedelta(hours=2))
+        detail = self.client.get("/api/orchestrators/" + ADDRESS).get_json()
+        self.assertEqual(
+            detail["status_events"],
+            [
+                {"changed_at": T0.isoformat(), "status": "Active"},
+                {"changed_at": (T0 + timedelta(hours=2)).isoformat(), "status": "Cooldown"},
+            ],
+        )
+        self.assertEqual([h["balance"] for h in detail["history"]], [5.0, 4.0, 3.0])
+        self.assertAlmostEqual(detail["burn_rate_24h"], 1.0)
+        self.assertAlmostEqual(detail["drain_hours"], 3.0)
+
+    def test_detail_page_and_unknown_address(self):
+        self.poll([record(5.0)], T0)
+        page = self.client.get("/orchestrator/" + ADDRESS.upper().replace("X", "x"))
+        self.assertEqual(page.status_code, 200)
+        self.assertIn(ADDRESS.encode(), page.data)
+        self.assertIn(b"Status Changes", page.data)
+        self.assertEqual(self.client.get("/orchestrator/0xdead").status_code, 404)
+        self.assertEqual(self.client.get("/api/orchestrators/0xdead").status_code, 404)
+
+        index = self.client.get("/?view=table")
+        self.assertIn('href="/orchestrator/{}"'.format(ADDRESS).encode(), index.data)
+
+    def test_cache_hits_evicts_and_invalidates_per_generation(self):
+        other, third = "0x" + "cd" * 20, "0x" + "ef" * 20
+        self.poll([record(5.0), record(1.0, address=other), record(2.0, address=third)], T0)
+
+        first = self.client.get("/orchestrator/" + ADDRESS)
+        again = self.client.get("/orchestrator/" + ADDRESS)
+        self.assertEqual(again.data, first.data)
+        stats = self.client.get("/api/cache").get_json()["detail"]
+        self.assertEqual((stats["hits"], stats["misses"], stats["entries"]), (1, 1, 1))
+        self.assertGreater(stats["bytes"], len(first.data))
+
+        self.client.get("/api/orchestrators/" + other)
+        self.client.get("/api/orchestrators/" + third)  # evicts ADDRESS (capacity 2)
+        stats = self.client.get("/api/cache").get_json()["detail"]
+        self.assertEqual((stats["entries"], stats["evictions"]), (2, 1))
+
+        self.poll([record(4.0)], T0 + timedelta(hours=1))
+        detail = self.client.get("/api/orchestrators/" + other).get_json()
+        self.assertEqual(detail["generation"], 2)
+        self.assertIsNone(detail["orchestrator"])  # dropped from the fleet, history remains
+        stats = self.client.get("/api/cache").get_json()["detail"]
+        self.assertEqual((stats["entries"], stats["invalidations"]), (1, 1))
+        self.assertAlmostEqual(stats["hit_rate"], 1 / 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
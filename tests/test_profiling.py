@@ -0,0 +1,122 @@
+import os
+import pstats
+import tempfile
+import time
+import unittest
+
+from support import load_app_module
+
+
+def fake_fetch(source):
+    return [
+        {"orchestrator_id": "o{}".format(i), "address": "0x{:040x}".format(i), "balance_eth": i}
+        for i in range(50)
+    ]
+
+
+class ProfilingTests(unittest.TestCase):
+    def setUp(self):
+        self.module = load_app_module()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.profile_dir = os.path.join(self.temp_dir.name, "profiles")
+        self.app = self.module.create_app(
+            {
+                "DB_FILE": os.path.join(self.temp_dir.name, "test.db"),
+                "PROFILE_DIR": self.profile_dir,
+                "DASHBOARD_TOKEN": "secret",
+            }
+        )
+        self.module.fetch_source = fake_fetch
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_poll_stage_timings_are_reported(self):
+        self.module.poll_once()
+        status = self.client.get("/api/status").get_json()
+        timings = status["last_poll"]["timings_ms"]
+        for stage in ("fetch", "parse", "delta", "persist", "sort", "cleanup", "total"):
+            self.assertIn(stage, timings)
+        self.assertEqual(status["orchestrators"], 50)
+        self.assertFalse(os.path.exists(self.profile_dir))
+
+    def test_armed_poll_writes_one_pstats_file(self):
+        self.module.profiler.arm("poll", 1)
+        self.module.poll_once()
+        self.module.poll_once()
+
+        files = os.listdir(self.profile_dir)
+        self.assertEqual(len(files), 1)
+        self.assertTrue(files[0].startswith("poll-") and files[0].endswith(".pstats"))
+        stats = pstats.Stats(os.path.join(self.profile_dir, files[0]))
+        self.assertTrue(any(func[2] == "process_fleet" for func in stats.stats))
+
+    def test_armed_poll_profiles_the_source_fetch_threads(self):
+        self.module.profiler.arm("poll", 1)
+        self.module.poll_once()
+
+        (name,) = os.listdir(self.profile_dir)
+        functions = {func[2] for func in pstats.Stats(os.path.join(self.profile_dir, name)).stats}
+        self.assertIn("process_fleet", functions)
+        self.assertIn("_run_source", functions)
+        self.assertIn("fake_fetch", functions)
+
+    def test_sampled_poll_covers_the_source_fetch_threads(self):
+        def slow_fetch(source):
+            time.sleep(0.05)
+            return fake_fetch(source)
+
+        self.module.fetch_source = slow_fetch
+        self.module.profiler.arm("poll", 1, mode="sample")
+        self.module.poll_once()
+
+        (name,) = os.listdir(self.profile_dir)
+        with open(os.path.join(self.profile_dir, name)) as fh:
+            stacks = fh.read()
+        self.assertIn("slow_fetch (test_profiling.py:", stacks)
+
+    def test_admin_endpoint_arms_sampled_request_profiles(self):
+        self.assertEqual(self.client.post("/admin/profile", json={"kind": "request"}).status_code, 403)
+
+        response = self.client.post(
+            "/admin/profile",
+            json={"kind": "request", "count": 1, "mode": "sample"},
+            headers={"X-Dashboard-Token": "secret"},
+        )
+        self.assertEqual(response.get_json()["remaining"]["request"], 1)
+
+        self.client.get("/api/orchestrators")
+        files = os.listdir(self.profile_dir)
+        self.assertEqual(len(files), 1)
+        self.assertTrue(files[0].endswith("-api_orchestrators.collapsed"))
+
+    def test_poll_profile_armed_in_another_worker_runs_in_the_collector(self):
+        collector = load_app_module()
+        collector.create_app(
+            {"DB_FILE": os.path.join(self.temp_dir.name, "test.db"), "PROFILE_DIR": self.profile_dir}
+        )
+        collector.fetch_source = fake_fetch
+
+        response = self.client.post(
+            "/admin/profile", json={"kind": "poll", "count": 1}, headers={"X-Dashboard-Token": "secret"}
+        )
+        self.assertEqual(response.get_json()["pending_polls"], 1)
+        self.assertEqual(self.module.profiler.status()["remaining"]["poll"], 0)
+
+        collector.poll_once()
+        collector.poll_once()
+        (name,) = os.listdir(self.profile_dir)
+        self.assertTrue(name.startswith("poll-") and name.endswith(".pstats"))
+        status = self.client.get("/admin/profile", headers={"X-Dashboard-Token": "secret"}).get_json()
+        self.assertEqual(status["pending_polls"], 0)
+
+    def test_invalid_kind_is_rejected(self):
+        response = self.client.post(
+            "/admin/profile", json={"kind": "bogus"}, headers={"X-Dashboard-Token": "secret"}
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
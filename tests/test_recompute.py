@@ -0,0 +1,133 @@
+import os
+import random
+import shutil
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+
+import support
+
+T0 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def load_app_module():
+    module = support.load_app_module()
+    # Worker processes look _rollup_shard up by module name.
+    sys.modules[module.__name__] = module
+    return module
+
+
+def at(hours, minutes=0):
+    return (T0 + timedelta(hours=hours, minutes=minutes)).isoformat()
+
+
+class HourlyRollupTests(unittest.TestCase):
+    def setUp(self):
+        self.module = load_app_module()
+
+    def test_hours_carry_the_last_balance(self):
+        rows = [
+            ("0xa", 5.0, at(0, 30)),  # before `since`: carried into hour 1
+            ("0xa", 4.0, at(1, 10)),
+            ("0xa", 6.0, at(1, 50)),
+            ("0xb", 1.0, at(2, 0)),  # first row exactly on an hour boundary
+        ]
+        result = list(
+            self.module.hourly_rollup(rows, T0 + timedelta(hours=1), T0 + timedelta(hours=4))
+        )
+        self.assertEqual(
+            result,
+            [
+                ("0xa", at(1), 5.0, 6.0, 4.0, 6.0, 2),
+                ("0xa", at(2), 6.0, 6.0, 6.0, 6.0, 0),
+                ("0xa", at(3), 6.0, 6.0, 6.0, 6.0, 0),
+                ("0xb", at(2), 1.0, 1.0, 1.0, 1.0, 1),
+                ("0xb", at(3), 1.0, 1.0, 1.0, 1.0, 0),
+            ],
+        )
+
+
+class RecomputeTests(unittest.TestCase):
+    def setUp(self):
+        self.module = load_app_module()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.seed = os.path.join(self.temp_dir.name, "seed.db")
+        self.module.create_app({"DB_FILE": self.seed})
+        rng = random.Random(1)
+        rows = []
+        for i in range(60):
+            for step in range(rng.randint(1, 30)):
+                rows.append(("0x{:04x}".format(i), round(rng.uniform(0, 5), 6), at(0, 7 * step + i % 7)))
+        self.module.save_balances(rows)
+        self.since, self.until = T0, T0 + timedelta(hours=5)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def use_copy(self, name):
+        path = os.path.join(self.temp_dir.name, name)
+        self.module.DB_FILE = self.seed
+        self.module.get_db().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        shutil.copy(self.seed, path)
+        self.module.DB_FILE = path
+        return path
+
+    def dump(self):
+        return list(self.module.get_db().iterdump())
+
+    def hourly(self):
+        return [line for line in self.dump() if line.startswith('INSERT INTO "balance_hourly"')]
+
+    def recompute(self, **kwargs):
+        return self.module.recompute_rollups(since=self.since, until=self.until, **kwargs)
+
+    def test_parallel_matches_serial(self):
+        self.use_copy("serial.db")
+        serial_rows = self.recompute(workers=0, shards=1)
+        serial = self.hourly()
+
+        self.use_copy("parallel.db")
+        parallel_rows = self.recompute(workers=2, shards=7)
+
+        self.assertEqual(parallel_rows, serial_rows)
+        self.assertGreater(serial_rows, 60)
+        self.assertEqual(self.hourly(), serial)
+
+    def test_live_rollup_matches_recompute(self):
+        self.use_copy("recomputed.db")
+        self.recompute(workers=0)
+        expected = self.hourly()
+
+        self.use_copy("live.db")
+        self.module.HISTORY_RETENTION_HOURS = 1000
+        for hour in range(1, 6):
+            self.module.roll_up_hours(T0 + timedelta(hours=hour, minutes=3), since=T0 if hour == 1 else None)
+        self.assertEqual(self.hourly(), expected)
+
+    def test_interrupted_run_resumes_from_checkpoints(self):
+        self.use_copy("expected.db")
+        self.recompute(workers=0, shards=6)
+        expected = self.hourly()
+
+        self.use_copy("resumed.db")
+        calls = []
+
+        def interrupt(done, total, rows):
+            calls.append(done)
+            if done == 3:
+                raise KeyboardInterrupt
+
+        with self.assertRaises(KeyboardInterrupt):
+            self.recompute(workers=0, shards=6, progress=interrupt)
+        self.assertEqual(self.hourly(), [])  # nothing swapped in yet
+
+        # Resuming keeps the original range and shards and skips finished ones.
+        self.module.recompute_rollups(workers=0, progress=lambda done, total, rows: calls.append(done))
+        self.assertEqual(calls, [1, 2, 3, 4, 5, 6])
+        self.assertEqual(self.hourly(), expected)
+        self.assertEqual(self.module.get_db().execute("SELECT COUNT(*) FROM recompute_shards").fetchone()[0], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
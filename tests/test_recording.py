@@ -0,0 +1,130 @@
+import gzip
+import json
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from support import load_app_module
+
+
+class FakeResponse:
+    status_code = 200
+
+    def __init__(self, payload):
+        self.content = json.dumps({"orchestrators": payload}).encode()
+
+
+class FakeSession:
+    def __init__(self):
+        self.payload = []
+
+    def get(self, url, headers=None, timeout=None):
+        return FakeResponse(self.payload)
+
+
+def fleet(balances):
+    return [
+        {"orchestrator_id": "o{}".format(i), "address": "0x{}".format(i), "balance_eth": b}
+        for i, b in enumerate(balances)
+    ]
+
+
+class RecordingTests(unittest.TestCase):
+    def setUp(self):
+        self.module = load_app_module()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.record_dir = os.path.join(self.temp_dir.name, "rec")
+        self.module.COLUMNAR_BACKEND = "off"
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def use_db(self, name):
+        self.module.create_app({"DB_FILE": os.path.join(self.temp_dir.name, name)})
+
+    def history(self):
+        return self.module.get_db().execute(
+            "SELECT address, balance, timestamp FROM balance_history ORDER BY address, timestamp"
+        ).fetchall()
+
+    def blob_count(self):
+        return sum(len(files) for _, _, files in os.walk(os.path.join(self.record_dir, "blobs")))
+
+    def test_polls_are_recorded_with_deduplicated_payloads(self):
+        self.use_db("live.db")
+        self.module.RECORD_DIR = self.record_dir
+        session = FakeSession()
+        self.module.get_http_session = lambda: session
+
+        for balances in ([1.0, 2.0], [1.0, 2.0], [0.5, 2.0]):
+            session.payload = fleet(balances)
+            self.assertTrue(self.module.poll_once())
+
+        entries = list(self.module.recording.Recording(self.record_dir).entries())
+        self.assertEqual(len(entries), 3)
+        self.assertEqual(self.blob_count(), 2)
+        self.assertEqual(entries[0]["sources"][0]["sha"], entries[1]["sources"][0]["sha"])
+        self.assertNotEqual(entries[1]["sources"][0]["sha"], entries[2]["sources"][0]["sha"])
+        self.assertEqual(entries[0]["sources"][0]["name"], "default")
+        # The live cycle and its recording share one timestamp.
+        self.assertEqual(self.module.last_update, entries[2]["t"])
+        self.assertEqual(self.module.load_snapshot()[1], entries[2]["t"])
+
+    def test_truncated_index_tail_is_ignored(self):
+        recorder = self.module.recording.Recorder(self.record_dir)
+        sha = recorder.store(b"[]")
+        recorder.append("2024-01-01T00:00:00+00:00", [{"name": "default", "sha": sha, "fetched_at": None}])
+        with open(os.path.join(self.record_dir, "index.jsonl.gz"), "ab") as fh:
+            fh.write(gzip.compress(b'{"t": "2024-01-01T00:10')[:-8])
+
+        entries = list(self.module.recording.Recording(self.record_dir).entries())
+        self.assertEqual(len(entries), 1)
+
+    def test_replay_matches_processing_every_poll(self):
+        # Three days of 10-minute polls; a balance changes every 7 hours.
+        recorder = self.module.recording.Recorder(self.record_dir)
+        start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        polls = []
+        for step in range(3 * 24 * 6):
+            now = start + timedelta(minutes=10 * step)
+            hours = step // 6
+            payload = fleet([10.0 - hours // 7, 5.0, 3.0 - (hours // 11) * 0.1])
+            raw = json.dumps(payload).encode()
+            sha = recorder.store(raw)
+            recorder.append(now.isoformat(), [{"name": "default", "sha": sha, "fetched_at": now.isoformat()}])
+            polls.append((now, payload))
+
+        self.use_db("expected.db")
+        for now, payload in polls:
+            data = self.module.merge_sources([("default", payload)])
+            self.module.process_fleet(data, now=now)
+            self.module.cleanup_old_records(now=now)
+        expected_fleet = data
+        expected = self.history()
+
+        self.use_db("replayed.db")
+        stats = self.module.replay_log(self.record_dir)
+
+        self.assertEqual(self.history(), expected)
+        self.assertEqual(stats["polls"], len(polls))
+        self.assertGreater(stats["skipped"], stats["processed"])
+        self.assertEqual(self.module.orchestrators_data, expected_fleet)
+        self.assertEqual(self.module.last_update, polls[-1][0].isoformat())
+
+    def test_replay_stops_at_until(self):
+        recorder = self.module.recording.Recorder(self.record_dir)
+        start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        for step in range(5):
+            now = start + timedelta(hours=step)
+            sha = recorder.store(json.dumps(fleet([float(step)])).encode())
+            recorder.append(now.isoformat(), [{"name": "default", "sha": sha, "fetched_at": None}])
+
+        self.use_db("until.db")
+        stats = self.module.replay_log(self.record_dir, until=start + timedelta(hours=2))
+        self.assertEqual(stats["polls"], 3)
+        self.assertEqual(self.module.orchestrators_data[0]["balance_eth"], 2.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,138 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from datetime import datetime, timezone
+
+from support import load_app_module
+
+
+class RefreshTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_file = os.path.join(self.temp_dir.name, "test.db")
+        self.fetches = 0
+        self.fetch_lock = threading.Lock()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def slow_fetch(self, source):
+        with self.fetch_lock:
+            self.fetches += 1
+        time.sleep(0.3)
+        return [{"orchestrator_id": "a", "address": "0xa", "balance_eth": 1.0}]
+
+    def make_worker(self, **config):
+        module = load_app_module()
+        app = module.create_app(dict(config, DB_FILE=self.db_file, DASHBOARD_TOKEN="secret"))
+        module.fetch_source = self.slow_fetch
+        return module, app
+
+    def refresh(self, app):
+        return app.test_client().post("/refresh", headers={"X-Dashboard-Token": "secret"}).status_code
+
+    def post_refresh(self, app, results):
+        response = app.test_client().post("/refresh", headers={"X-Dashboard-Token": "secret"})
+        results.append((response.status_code, response.get_json()["status"]))
+
+    def test_concurrent_refreshes_share_one_fetch_across_workers(self):
+        workers = [self.make_worker() for _ in range(2)]
+        results = []
+        threads = [
+            threading.Thread(target=self.post_refresh, args=(workers[i % 2][1], results))
+            for i in range(6)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(self.fetches, 1)
+        self.assertEqual(sorted(status for _, status in results), ["coalesced"] * 5 + ["polled"])
+        # Both workers serve the refreshed fleet.
+        for module, _ in workers:
+            self.assertEqual(len(module.orchestrators_data), 1)
+
+    def test_min_interval_returns_429(self):
+        module, app = self.make_worker()
+        client = app.test_client()
+        headers = {"X-Dashboard-Token": "secret"}
+        self.assertEqual(client.post("/refresh", headers=headers).status_code, 200)
+
+        response = client.post("/refresh", headers=headers)
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response.headers["Retry-After"]), 1)
+        self.assertEqual(self.fetches, 1)
+
+    def test_refresh_requires_token(self):
+        module, app = self.make_worker()
+        self.assertEqual(app.test_client().post("/refresh").status_code, 403)
+        self.assertEqual(self.fetches, 0)
+
+    def test_collector_polls_after_a_refresh_on_another_worker(self):
+        collector, _ = self.make_worker()
+        follower, app = self.make_worker()
+        collector.run_poll()
+        follower.fetch_source = lambda source: [
+            {"orchestrator_id": "a", "address": "0xa", "balance_eth": 2.0}
+        ]
+        self.assertEqual(self.refresh(app), 200)
+        self.assertEqual(follower.data_generation, 2)
+
+        collector.fetch_source = lambda source: [
+            {"orchestrator_id": "a", "address": "0xa", "balance_eth": 3.0}
+        ]
+        self.assertEqual(collector.run_poll(), "polled")
+        self.assertEqual(collector.data_generation, 3)
+        self.assertEqual(collector.snapshot_generation(), 3)
+
+        self.assertEqual(follower.run_poll(requested_at=datetime(2000, 1, 1, tzinfo=timezone.utc)), "coalesced")
+        self.assertEqual(follower.data_generation, 3)
+        self.assertEqual(follower.orchestrators_data[0]["balance_eth"], 3.0)
+
+    def test_refresh_on_another_worker_keeps_a_failing_source(self):
+        sources = '[{"name": "eu", "url": "http://eu.invalid"}, {"name": "us", "url": "http://us.invalid"}]'
+
+        def fetch(source):
+            if source["name"] == "us" and not us_up:
+                raise RuntimeError("region down")
+            return [{"orchestrator_id": source["name"], "address": "0x" + source["name"], "balance_eth": 1.0}]
+
+        us_up = True
+        collector, _ = self.make_worker()
+        follower, app = self.make_worker()
+        for module in (collector, follower):
+            module.API_SOURCES = sources
+            module.fetch_source = fetch
+        collector.run_poll()
+
+        us_up = False
+        self.assertEqual(self.refresh(app), 200)
+        self.assertEqual(follower.data_generation, 2)
+        self.assertEqual(sorted(o["source"] for o in follower.orchestrators_data), ["eu", "us"])
+
+    def test_scheduled_polls_do_not_throttle_a_refresh(self):
+        module, app = self.make_worker()
+        module.run_poll()
+        self.assertEqual(self.refresh(app), 200)
+        self.assertEqual(self.fetches, 2)
+        self.assertEqual(self.refresh(app), 429)
+
+    def test_manual_refresh_pushes_back_scheduled_poll(self):
+        module, app = self.make_worker(UPDATE_INTERVAL=60)
+        self.assertEqual(self.refresh(app), 200)
+        self.assertLess(module.seconds_since_last_poll(), 60)
+
+        collector = threading.Thread(target=module.fetch_orchestrators)
+        collector.start()
+        time.sleep(0.3)
+        module.stop_collector()
+        collector.join(5)
+        self.assertFalse(collector.is_alive())
+        self.assertEqual(self.fetches, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
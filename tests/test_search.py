@@ -0,0 +1,149 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from support import load_app_module
+
+
+def node(orchestrator_id, address, balance=1.0):
+    return {
+        "orchestrator_id": orchestrator_id,
+        "address": address,
+        "balance_eth": balance,
+        "eligible_for_payments": True,
+    }
+
+
+FLEET = [
+    node("alpha-node", "0xAbCdEf0000000000000000000000000000000001"),
+    node("beta-node", "0x1234560000000000000000000000000000000002"),
+    node("alphabet", "0x9999990000000000000000000000000000abcdef"),
+] + [node("node-{:03d}".format(i), "0x{:040x}".format(1000 + i)) for i in range(200)]
+
+
+class SearchIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.search = load_app_module().search
+        self.index = self.search.SearchIndex()
+        self.index.update(FLEET, 1)
+
+    def ids(self, query, limit=20):
+        matches, _ = self.index.search(query, limit)
+        return [(orchestrator_id, match) for orchestrator_id, _, match in matches]
+
+    def test_prefix_matches_come_first_in_key_order(self):
+        self.assertEqual(
+            self.ids("ALPHA"), [("alpha-node", "prefix"), ("alphabet", "prefix")]
+        )
+        self.assertEqual(self.ids("0x1234"), [("beta-node", "prefix")])
+
+    def test_substring_matches_ids_and_full_addresses(self):
+        self.assertEqual(self.ids("-node"), [("alpha-node", "substring"), ("beta-node", "substring")])
+        # Both a prefix of one address and the tail of another.
+        self.assertEqual(
+            self.ids("abcdef"), [("alpha-node", "substring"), ("alphabet", "substring")]
+        )
+        self.assertEqual(self.ids("0xabcdef"), [("alpha-node", "prefix")])
+        self.assertEqual(self.ids("zz-top"), [])
+
+    def test_short_queries_only_match_prefixes(self):
+        self.assertEqual(self.ids("be"), [("beta-node", "prefix")])
+        self.assertEqual(self.ids("ta"), [])
+
+    def test_results_are_limited_and_flagged(self):
+        matches, truncated = self.index.search("node-", 5)
+        self.assertEqual(len(matches), 5)
+        self.assertTrue(truncated)
+        matches, truncated = self.index.search("node-19", 20)
+        self.assertEqual(len(matches), 10)
+        self.assertFalse(truncated)
+
+    def test_update_applies_changes_incrementally(self):
+        fleet = [dict(o) for o in FLEET[1:]]
+        fleet[0]["orchestrator_id"] = "gamma"
+        fleet.append(node("delta", "0xdddd000000000000000000000000000000000003"))
+
+        self.assertEqual(self.index.update(fleet, 2), (2, 2))
+        self.assertEqual(self.ids("alpha"), [("alphabet", "prefix")])
+        self.assertEqual(self.ids("beta"), [])
+        self.assertEqual(self.ids("gam"), [("gamma", "prefix")])
+        self.assertEqual(self.ids("dddd"), [("delta", "substring")])
+        stats = self.index.stats()
+        self.assertEqual((stats["generation"], stats["entries"], stats["dead_slots"]), (2, 203, 2))
+
+    def test_large_changes_rebuild_the_index(self):
+        self.index.update(FLEET[:3], 2)
+        self.assertEqual(self.index.stats()["dead_slots"], 0)
+        self.assertEqual(len(self.index), 3)
+        self.assertEqual(self.ids("node-"), [])
+
+
+class SearchApiTests(unittest.TestCase):
+    def setUp(self):
+        self.module = load_app_module()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.app = self.module.create_app({"DB_FILE": os.path.join(self.temp_dir.name, "test.db")})
+        self.module.fetch_source = lambda source: [dict(o) for o in FLEET]
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_search_returns_records_with_detail_links(self):
+        self.module.poll_once()
+        self.assertIn("search_index", self.module.last_poll_timings)
+
+        body = self.client.get("/api/search", query_string={"q": "beta"}).get_json()
+        self.assertEqual(body["generation"], 1)
+        self.assertFalse(body["truncated"])
+        (result,) = body["results"]
+        self.assertEqual(result["address"], FLEET[1]["address"])
+        self.assertEqual(result["match"], "prefix")
+        self.assertEqual(result["status"], "Active")
+        self.assertEqual(result["balance_eth"], 1.0)
+        self.assertEqual(self.client.get(result["url"]).status_code, 200)
+
+    def test_limit_is_capped_and_validated(self):
+        self.module.poll_once()
+        body = self.client.get("/api/search", query_string={"q": "node-", "limit": 500}).get_json()
+        self.assertEqual(len(body["results"]), self.module.SEARCH_LIMIT)
+        self.assertTrue(body["truncated"])
+        response = self.client.get("/api/search", query_string={"q": "node", "limit": "x"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get("/api/search").get_json()["results"], [])
+
+    def test_follower_updates_the_index_off_the_request_path(self):
+        follower = load_app_module()
+        client = follower.create_app({"DB_FILE": self.module.DB_FILE}).test_client()
+        client.get("/api/search", query_string={"q": "beta"})
+        follower.update_search_index_later().result()
+        self.module.poll_once()
+
+        release = threading.Event()
+        update = follower._search_index.update
+
+        def slow_update(records, generation=None):
+            release.wait(5)
+            return update(records, generation)
+
+        follower._search_index.update = slow_update
+        follower._follow_checked_at = 0.0
+        body = client.get("/api/search", query_string={"q": "beta"}).get_json()
+        self.assertEqual(follower.data_generation, 1)
+        self.assertEqual((body["generation"], body["results"]), (0, []))
+
+        release.set()
+        follower.update_search_index_later().result()
+        body = client.get("/api/search", query_string={"q": "beta"}).get_json()
+        self.assertEqual(body["generation"], 1)
+        self.assertEqual([r["orchestrator_id"] for r in body["results"]], ["beta-node"])
+
+    def test_live_page_has_search_box(self):
+        self.module.poll_once()
+        html = self.client.get("/").get_data(as_text=True)
+        self.assertIn('id="search" data-api="/api/search"', html)
+
+
+if __name__ == "__main__":
+    unittest.main()
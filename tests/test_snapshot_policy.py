@@ -0,0 +1,75 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from support import load_app_module
+
+
+class ChangeOnlyPolicyTests(unittest.TestCase):
+    def setUp(self):
+        self.module = load_app_module()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.module.DB_FILE = os.path.join(self.temp_dir.name, "test.db")
+        self.module.init_db()
+        self.start = datetime(2024, 6, 1, 0, 0, tzinfo=timezone.utc)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def rows(self, address="addr"):
+        return [
+            tuple(r)
+            for r in self.module.get_db().execute(
+                "SELECT balance, timestamp FROM balance_history WHERE address = ? ORDER BY timestamp",
+                (address,),
+            )
+        ]
+
+    def poll(self, balance, minutes):
+        self.module.save_balance("addr", balance, timestamp=self.start + timedelta(minutes=minutes))
+
+    def test_idle_balance_writes_only_on_change_and_heartbeat(self):
+        self.module.HEARTBEAT_INTERVAL = 6 * 3600
+        # Ten hours of 15-minute polls; the balance moves once.
+        for minute in range(0, 600, 15):
+            self.poll(2.0 if minute < 300 else 1.5, minute)
+
+        stamps = [ts for _, ts in self.rows()]
+        self.assertEqual(
+            stamps,
+            [
+                self.start.isoformat(),
+                (self.start + timedelta(minutes=300)).isoformat(),
+            ],
+        )
+
+        self.poll(1.5, 300 + 6 * 60)
+        self.assertEqual(len(self.rows()), 3)
+
+    def test_hourly_and_every_policies(self):
+        self.module.SNAPSHOT_POLICY = "hourly"
+        for minute in range(0, 120, 15):
+            self.poll(2.0, minute)
+        self.assertEqual(len(self.rows()), 2)
+
+        self.module.SNAPSHOT_POLICY = "every"
+        self.poll(2.0, 120)
+        self.poll(2.0, 135)
+        self.assertEqual(len(self.rows()), 4)
+
+    def test_as_of_lookup_survives_cleanup(self):
+        self.module.HISTORY_RETENTION_HOURS = 25
+        self.poll(3.0, 0)
+        self.poll(2.5, 60)
+        now = self.start + timedelta(hours=60)
+        self.module.cleanup_old_records(now=now)
+
+        # The 2.5 row is still valid at the cutoff and is kept; 3.0 is superseded.
+        self.assertEqual([bal for bal, _ in self.rows()], [2.5])
+        self.assertEqual(self.module.get_balance_24h_ago("addr", reference_time=now), 2.5)
+        self.assertEqual(self.module.get_balances_24h_ago_all(now), {"addr": 2.5})
+
+
+if __name__ == "__main__":
+    unittest.main()
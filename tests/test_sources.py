@@ -0,0 +1,89 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+
+from support import load_app_module
+
+
+class MultiSourceTests(unittest.TestCase):
+    def setUp(self):
+        self.module = load_app_module()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.module.DB_FILE = os.path.join(self.temp_dir.name, "test.db")
+        self.module.init_db()
+        self.module.SOURCE_TIMEOUT = 0.5
+        self.module.API_SOURCES = json.dumps(
+            [
+                {"name": "eu", "url": "http://eu.invalid", "token": "a"},
+                {"name": "us", "url": "http://us.invalid", "token": "b"},
+                {"name": "ap", "url": "http://ap.invalid", "token": "c"},
+            ]
+        )
+        self.release = threading.Event()
+
+    def tearDown(self):
+        self.release.set()
+        self.temp_dir.cleanup()
+
+    def fake_fetch(self, source):
+        if source["name"] == "eu":
+            return [
+                {"address": "0x1", "orchestrator_id": "one", "last_healthy_at": "2024-01-01T00:00:00"},
+                {"address": "0x2", "orchestrator_id": "two", "last_healthy_at": None},
+            ]
+        if source["name"] == "us":
+            return [
+                {"address": "0x2", "orchestrator_id": "two", "last_healthy_at": "2024-01-01T00:05:00"},
+            ]
+        self.release.wait(5)
+        raise RuntimeError("region down")
+
+    def test_merges_dedupes_and_isolates_slow_source(self):
+        self.module.fetch_source = self.fake_fetch
+
+        fleet = self.module.fetch_sources()
+
+        by_address = {o["address"]: o for o in fleet}
+        self.assertEqual(sorted(by_address), ["0x1", "0x2"])
+        self.assertEqual(by_address["0x1"]["source"], "eu")
+        # The us copy reports a more recent health check.
+        self.assertEqual(by_address["0x2"]["source"], "us")
+        self.assertNotIn("ap", self.module.source_status)
+
+    def test_unchanged_results_are_not_republished(self):
+        self.module.fetch_source = lambda source: (_ for _ in ()).throw(RuntimeError("boom"))
+        self.assertIsNone(self.module.fetch_sources())
+        self.assertFalse(self.module.source_status["eu"]["ok"])
+        self.assertEqual(self.module.source_status["eu"]["last_error"], "boom")
+
+    def test_sources_endpoint_reports_persisted_status(self):
+        self.module.fetch_source = self.fake_fetch
+        self.module.poll_once()
+
+        app = self.module.create_app({"DB_FILE": self.module.DB_FILE})
+        payload = app.test_client().get("/api/sources").get_json()
+        names = [s["name"] for s in payload["sources"]]
+        self.assertEqual(names, ["eu", "us", "ap"])
+        self.assertEqual(payload["sources"][0]["count"], 2)
+        self.assertIsNotNone(payload["sources"][1]["age_seconds"])
+
+    def test_page_reflects_failing_sources_without_a_new_generation(self):
+        self.module.API_SOURCES = json.dumps(json.loads(self.module.API_SOURCES)[:2])
+        client = self.module.create_app({"DB_FILE": self.module.DB_FILE}).test_client()
+        self.module.fetch_source = self.fake_fetch
+        self.module.poll_once()
+        first = client.get("/")
+        self.assertNotIn('class="source failing"', first.get_data(as_text=True))
+
+        self.module.fetch_source = lambda source: (_ for _ in ()).throw(RuntimeError("boom"))
+        self.assertFalse(self.module.poll_once())
+        again = client.get("/", headers={"If-None-Match": first.headers["ETag"]})
+        self.assertEqual(again.status_code, 200)
+        self.assertEqual(again.get_data(as_text=True).count('class="source failing"'), 2)
+        self.assertEqual(self.module.data_generation, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import os
+import random
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from support import load_app_module
+
+import columnar
+
+NOW = datetime(2024, 1, 2, 12, 30, tzinfo=timezone.utc)
+
+
+class SparklineTests(unittest.TestCase):
+    def setUp(self):
+        self.module = load_app_module()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.app = self.module.create_app({"DB_FILE": os.path.join(self.temp_dir.name, "test.db")})
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def seed(self):
+        """0xa drains steadily over the day, 0xb drops once, 0xc is new."""
+        rows = []
+        for k in range(24):
+            hour = (self.module.floor_hour(NOW) - timedelta(hours=24 - k)).isoformat()
+            rows.append(("0xa", hour, 0, 0, 0, 10.0 - k * 0.1, 1))
+            rows.append(("0xb", hour, 0, 0, 0, 5.0 if k < 20 else 1.0, 1))
+        conn = self.module.get_db()
+        conn.executemany("INSERT INTO balance_hourly VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        conn.commit()
+        fleet = [
+            {"orchestrator_id": "a", "address": "0xa", "balance_eth": 7.6, "balance_change_24h": -2.4},
+            {"orchestrator_id": "b", "address": "0xb", "balance_eth": 1.0, "balance_change_24h": -4.0},
+            {"orchestrator_id": "c", "address": "0xc", "balance_eth": 3.0, "balance_change_24h": 0.0},
+        ]
+        self.module.publish_fleet(fleet, taken_at=NOW)
+
+    def test_path_scales_each_row(self):
+        self.assertEqual(self.module.sparkline_path([4.0, None, 2.0, 3.0]), "M0 1L4 15L6 8")
+        self.assertEqual(self.module.sparkline_path([None, 1.0, 1.0]), "M2 8L4 8")
+        self.assertEqual(self.module.sparkline_path([None, None]), "")
+
+    @unittest.skipUnless(columnar.available(), "NumPy is not installed")
+    def test_vectorized_paths_match_the_loop(self):
+        import numpy as np
+
+        rng = random.Random(3)
+        rows = []
+        for _ in range(200):
+            start = rng.randint(0, 25)
+            row = [None] * start + [round(rng.uniform(0, 5), rng.choice((0, 3, 8))) for _ in range(25 - start)]
+            rows.append(row)
+        values = np.array([[np.nan if v is None else v for v in row] for row in rows])
+        self.assertEqual(
+            columnar.sparkline_paths(values),
+            [self.module.sparkline_path(row) for row in rows],
+        )
+
+    def test_fleet_sparklines_for_both_backends(self):
+        self.seed()
+        results = []
+        for backend in ("off", "auto"):
+            self.module.COLUMNAR_BACKEND = backend
+            self.module._sparkline_cache = (None, None)
+            generation, paths = self.module.fleet_sparklines()
+            results.append(paths)
+        self.assertEqual(generation, 1)
+        self.assertEqual(results[0], results[1])
+        paths = results[0]
+        self.assertTrue(paths["0xa"].startswith("M0 1L2 2"))
+        self.assertTrue(paths["0xa"].endswith("L46 14L48 15"))
+        self.assertTrue(paths["0xb"].startswith("M0 1L2 1"))
+        self.assertIn("L38 1L40 15", paths["0xb"])
+        self.assertEqual(paths["0xc"], "M48 8")
+        self.assertIs(self.module.fleet_sparklines()[1], results[1])  # cached per generation
+
+    def test_paths_built_before_the_rollup_are_not_kept(self):
+        self.seed()
+        last_hour = (self.module.floor_hour(NOW) - timedelta(hours=1)).isoformat()
+        conn = self.module.get_db()
+        conn.execute("DELETE FROM balance_hourly WHERE hour = ?", (last_hour,))
+        conn.commit()
+        _, early = self.module.fleet_sparklines()
+
+        conn.execute("INSERT INTO balance_hourly VALUES ('0xa', ?, 0, 0, 0, 7.7, 1)", (last_hour,))
+        conn.commit()
+        _, paths = self.module.fleet_sparklines()
+        self.assertNotEqual(paths["0xa"], early["0xa"])
+        self.assertIs(self.module.fleet_sparklines()[1], paths)
+
+    def test_page_and_columns_api_carry_the_paths(self):
+        self.seed()
+        _, paths = self.module.fleet_sparklines()
+        page = self.client.get("/?view=table").data.decode()
+        self.assertIn('<path d="{}"/>'.format(paths["0xa"]), page)
+        payload = self.client.get("/api/orchestrators?format=columns").get_json()
+        columns = dict(zip(payload["columns"], payload["data"]))
+        self.assertEqual(columns["sparkline"], [paths[addr] for addr in columns["address"]])
+
+
+if __name__ == "__main__":
+    unittest.main()
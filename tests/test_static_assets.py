@@ -0,0 +1,51 @@
+import gzip
+import os
+import re
+import tempfile
+import unittest
+
+from support import load_app_module
+
+
+class StaticAssetTests(unittest.TestCase):
+    def setUp(self):
+        self.module = load_app_module()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        app = self.module.create_app({"DB_FILE": os.path.join(self.temp_dir.name, "test.db")})
+        self.client = app.test_client()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def css_url(self):
+        html = self.client.get("/").get_data(as_text=True)
+        self.assertNotIn("fonts.googleapis.com", html)
+        self.assertNotIn("<style>", html)
+        return re.search(r'href="(/static/dashboard\.[0-9a-f]{12}\.css)"', html).group(1)
+
+    def test_fingerprinted_css_is_immutable_and_precompressed(self):
+        url = self.css_url()
+        response = self.client.get(url, headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertIn("immutable", response.headers["Cache-Control"])
+        with open(os.path.join(self.module.STATIC_DIR, "dashboard.css"), "rb") as fh:
+            self.assertEqual(gzip.decompress(response.get_data()), fh.read())
+
+        plain = self.client.get(url, headers={"Accept-Encoding": "identity"})
+        self.assertNotIn("Content-Encoding", plain.headers)
+
+    def test_revalidation_returns_304(self):
+        url = self.css_url()
+        etag = self.client.get(url).headers["ETag"]
+        self.assertEqual(self.client.get(url, headers={"If-None-Match": etag}).status_code, 304)
+
+        page_etag = self.client.get("/").headers["ETag"]
+        self.assertEqual(self.client.get("/", headers={"If-None-Match": page_etag}).status_code, 304)
+
+    def test_unknown_asset_is_404(self):
+        self.assertEqual(self.client.get("/static/missing.css").status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from support import load_app_module
+
+T0 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+A, B = "0x" + "aa" * 20, "0x" + "bb" * 20
+
+
+def record(address, balance, cooldown=False):
+    return {
+        "orchestrator_id": "orch-" + address[2:4],
+        "address": address,
+        "balance_eth": balance,
+        "eligible_for_payments": not cooldown,
+        "cooldown_active": cooldown,
+        "last_healthy_at": T0.isoformat(),
+    }
+
+
+class TimeTravelTests(unittest.TestCase):
+    def setUp(self):
+        self.module = load_app_module()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.config = {"DB_FILE": os.path.join(self.temp_dir.name, "test.db")}
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def start(self, **overrides):
+        self.app = self.module.create_app(dict(self.config, **overrides))
+        self.client = self.app.test_client()
+        polls = [
+            (0, [record(A, 5.0)]),
+            (12, [record(A, 4.0)]),
+            (25, [record(A, 3.0, cooldown=True)]),
+            (30, [record(A, 2.0, cooldown=True), record(B, 1.0)]),
+        ]
+        for hours, fleet in polls:
+            now = T0 + timedelta(hours=hours)
+            self.module.process_fleet(fleet, now=now)
+            self.module.publish_fleet(fleet, taken_at=now)
+        self.module.save_poll_stats(now.isoformat(), {})
+
+    def as_of(self, hours):
+        return {o["address"]: o for o in self.module.fleet_as_of(T0 + timedelta(hours=hours))}
+
+    def test_balances_change_and_status_as_of(self):
+        self.start()
+        fleet = self.as_of(26)
+        self.assertEqual(list(fleet), [A])  # B was first seen at T0+30h
+        self.assertEqual(fleet[A]["balance_eth"], 3.0)
+        self.assertEqual(fleet[A]["balance_change_24h"], -2.0)
+        self.assertEqual(fleet[A]["status"], 1)
+        self.assertEqual(fleet[A]["orchestrator_id"], "orch-aa")
+
+        early = self.as_of(1)[A]
+        self.assertEqual((early["balance_eth"], early["balance_change_24h"], early["status"]), (5.0, 0.0, 0))
+        self.assertEqual(set(self.as_of(31)), {A, B})
+
+    def test_rollups_stand_in_for_thinned_history(self):
+        self.start()
+        expected = self.as_of(26)[A]
+        self.module.roll_up_hours(now=T0 + timedelta(hours=31), since=T0)
+        self.module.cleanup_old_records(now=T0 + timedelta(hours=60))
+        self.assertEqual(self.module.count_history(), 2)
+        fleet = self.as_of(26)
+        self.assertEqual(fleet[A]["balance_eth"], expected["balance_eth"])
+        self.assertEqual(fleet[A]["balance_change_24h"], expected["balance_change_24h"])
+
+    def test_sharded_history_gives_the_same_view(self):
+        self.start(HISTORY_SHARDS=3)
+        fleet = self.as_of(31)
+        self.assertEqual((fleet[A]["balance_eth"], fleet[A]["balance_change_24h"]), (2.0, -3.0))
+        self.assertEqual((fleet[B]["balance_eth"], fleet[B]["status"]), (1.0, 0))
+
+    def test_page_and_api_are_cached_per_instant(self):
+        self.start()
+        at = (T0 + timedelta(hours=26)).isoformat()
+        page = self.client.get("/", query_string={"at": at, "view": "table"})
+        self.assertEqual(page.status_code, 200)
+        self.assertIn(b"Showing the fleet as of", page.data)
+        self.assertIn(b"-2.00000000", page.data)
+        self.assertIn(b"Cooldown", page.data)
+
+        rows = self.client.get("/api/orchestrators", query_string={"at": "2024-01-02T02:00:00"}).get_json()
+        self.assertEqual((rows["generation"], rows["at"]), (None, at))
+        self.assertEqual([o["balance_eth"] for o in rows["orchestrators"]], [3.0])
+
+        payload = self.client.get(
+            "/api/orchestrators", query_string={"at": at, "format": "columns"}
+        ).get_json()
+        columns = dict(zip(payload["columns"], payload["data"]))
+        self.assertEqual((columns["address"], columns["status"], columns["sparkline"]), ([A], [1], [""]))
+
+        virtual = self.client.get("/", query_string={"at": at, "view": "virtual"}).data.decode()
+        self.assertIn('data-api="/api/orchestrators?at=', virtual)
+        stats = self.client.get("/api/cache").get_json()["as_of"]
+        self.assertEqual((stats["misses"], stats["hits"], stats["entries"]), (1, 3, 1))
+
+    def test_instants_after_the_last_finished_poll_are_not_cached(self):
+        self.start()
+        at = T0 + timedelta(hours=32)
+        query = {"at": at.isoformat()}
+        rows = self.client.get("/api/orchestrators", query_string=query).get_json()
+        self.assertEqual([o["balance_eth"] for o in rows["orchestrators"]], [2.0, 1.0])
+
+        # The next cycle, which started at `at`, is stored after that request.
+        self.module.process_fleet([record(A, 1.5, cooldown=True), record(B, 1.0)], now=at)
+        rows = self.client.get("/api/orchestrators", query_string=query).get_json()
+        self.assertEqual([o["balance_eth"] for o in rows["orchestrators"]], [1.5, 1.0])
+        self.assertEqual(self.client.get("/api/cache").get_json()["as_of"]["entries"], 0)
+
+    def test_bad_or_future_instants_are_rejected(self):
+        self.start()
+        future = (datetime.now(timezone.utc) + timedelta(hours=1)).isoformat()
+        for value in ("yesterday", future):
+            self.assertEqual(self.client.get("/", query_string={"at": value}).status_code, 400)
+            response = self.client.get("/api/orchestrators", query_string={"at": value})
+            self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get("/?at=").status_code, 200)  # empty means live
+
+
+if __name__ == "__main__":
+    unittest.main()
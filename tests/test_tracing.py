@@ -0,0 +1,140 @@
+import json
+import os
+import tempfile
+import unittest
+
+from support import load_app_module
+
+
+FLEET = [
+    {"orchestrator_id": "o{}".format(i), "address": "0x{:040x}".format(i), "balance_eth": i}
+    for i in range(20)
+]
+
+
+class FakeResponse:
+    status_code = 200
+    content = json.dumps({"orchestrators": FLEET}).encode()
+
+
+class FakeSession:
+    def get(self, url, headers=None, timeout=None):
+        return FakeResponse()
+
+
+def attributes(span):
+    values = {}
+    for item in span["attributes"]:
+        (kind, value), = item["value"].items()
+        values[item["key"]] = int(value) if kind == "intValue" else value
+    return values
+
+
+class TracingTests(unittest.TestCase):
+    def setUp(self):
+        self.module = load_app_module()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.trace_dir = os.path.join(self.temp_dir.name, "traces")
+
+    def tearDown(self):
+        exporter = self.module.tracing.configure(None)
+        if exporter is not None:
+            exporter.close()
+        self.temp_dir.cleanup()
+
+    def create_app(self, **config):
+        config.setdefault("DB_FILE", os.path.join(self.temp_dir.name, "test.db"))
+        app = self.module.create_app(config)
+        session = FakeSession()
+        self.module.get_http_session = lambda: session
+        return app
+
+    def read_traces(self):
+        """Flush the exporter and return {trace name: [spans]}, one per trace."""
+        self.module.tracing.get_exporter().flush()
+        traces = {}
+        for name in sorted(os.listdir(self.trace_dir)):
+            with open(os.path.join(self.trace_dir, name)) as fh:
+                for line in fh:
+                    request = json.loads(line)
+                    (resource_spans,) = request["resourceSpans"]
+                    (scope_spans,) = resource_spans["scopeSpans"]
+                    spans = scope_spans["spans"]
+                    root = [s for s in spans if not s["parentSpanId"]]
+                    traces.setdefault(root[0]["name"] if root else "late", []).append(spans)
+        return traces
+
+    def test_poll_cycle_is_one_trace_of_nested_spans(self):
+        self.create_app(TRACE_DIR=self.trace_dir)
+        self.module.poll_once()
+
+        (spans,) = self.read_traces()["poll_cycle"]
+        by_name = {s["name"]: s for s in spans}
+        self.assertEqual(len({s["traceId"] for s in spans}), 1)
+
+        def parent(name):
+            by_id = {s["spanId"]: s["name"] for s in spans}
+            return by_id.get(by_name[name]["parentSpanId"])
+
+        root = by_name["poll_cycle"]
+        self.assertEqual(attributes(root)["orchestrators"], 20)
+        self.assertEqual(attributes(root)["generation"], 1)
+        self.assertEqual(parent("fetch"), "poll_cycle")
+        self.assertEqual(parent("upstream"), "fetch")
+        self.assertEqual(parent("parse"), "fetch")
+        self.assertEqual(parent("db.insert_history"), "persist")
+        self.assertEqual(parent("sort"), "poll_cycle")
+        self.assertEqual(parent("db.cleanup"), "cleanup")
+        self.assertEqual(attributes(by_name["db.insert_history"])["rows"], 20)
+        self.assertEqual(attributes(by_name["parse"])["orchestrators"], 20)
+        self.assertEqual(by_name["upstream"]["kind"], 3)
+        upstream = attributes(by_name["upstream"])
+        self.assertEqual(upstream["http.status_code"], 200)
+        self.assertEqual(upstream["http.response_content_length"], len(FakeResponse.content))
+        for s in spans:
+            self.assertLessEqual(int(root["startTimeUnixNano"]), int(s["startTimeUnixNano"]))
+            self.assertLessEqual(int(s["endTimeUnixNano"]), int(root["endTimeUnixNano"]))
+
+    def test_request_trace_records_status_and_render(self):
+        app = self.create_app(TRACE_DIR=self.trace_dir)
+        self.module.poll_once()
+        client = app.test_client()
+        client.get("/?view=table")
+        client.get("/orchestrator/0xnope")
+
+        traces = self.read_traces()
+        (page,) = traces["GET /"]
+        root = [s for s in page if not s["parentSpanId"]][0]
+        self.assertEqual(root["kind"], 2)
+        self.assertEqual(attributes(root)["http.status_code"], 200)
+        self.assertEqual(attributes(root)["http.target"], "/?view=table")
+        render = [s for s in page if s["name"] == "render"][0]
+        self.assertEqual(attributes(render)["view"], "table")
+        self.assertGreater(attributes(render)["bytes"], 0)
+
+        (missing,) = traces["GET /orchestrator/<address>"]
+        root = [s for s in missing if not s["parentSpanId"]][0]
+        self.assertEqual(attributes(root)["http.status_code"], 404)
+        self.assertIn("db.detail", [s["name"] for s in missing])
+
+    def test_trace_file_is_rotated(self):
+        self.create_app(TRACE_DIR=self.trace_dir, TRACE_MAX_BYTES=2000, TRACE_BACKUPS=2)
+        for _ in range(4):
+            self.module.poll_once()
+        self.module.tracing.get_exporter().flush()
+
+        names = sorted(os.listdir(self.trace_dir))
+        base = "traces-{}.jsonl".format(os.getpid())
+        self.assertEqual(names, [base, base + ".1", base + ".2"])
+
+    def test_tracing_is_off_by_default(self):
+        app = self.create_app()
+        self.module.poll_once()
+        status = app.test_client().get("/api/status").get_json()
+        self.assertIsNone(status["traces"])
+        self.assertIsNone(self.module.tracing.get_exporter())
+        self.assertIsNone(self.module.tracing.current())
+
+
+if __name__ == "__main__":
+    unittest.main()
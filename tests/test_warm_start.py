@@ -0,0 +1,46 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from support import load_app_module
+
+
+class WarmStartTests(unittest.TestCase):
+    def setUp(self):
+        self.module = load_app_module()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.module.DB_FILE = os.path.join(self.temp_dir.name, "test.db")
+        self.module.init_db()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_restores_last_snapshot(self):
+        fleet = [{"orchestrator_id": "orch-a", "address": "0xabc", "balance_eth": 1.5}]
+        taken_at = "2024-03-01T12:00:00+00:00"
+        self.module.save_snapshot(fleet, taken_at, 7)
+
+        fresh = load_app_module()
+        fresh.DB_FILE = self.module.DB_FILE
+        self.assertTrue(fresh.restore_snapshot())
+        self.assertEqual(fresh.orchestrators_data, fleet)
+        self.assertEqual(fresh.last_update, taken_at)
+        self.assertEqual(fresh.data_generation, 7)
+
+    def test_restore_without_snapshot_keeps_empty_fleet(self):
+        self.assertFalse(self.module.restore_snapshot())
+        self.assertEqual(self.module.orchestrators_data, [])
+
+    def test_index_shows_stale_data_age(self):
+        taken = datetime.now(timezone.utc) - timedelta(hours=2)
+        self.module.save_snapshot([], taken.isoformat(), 1)
+        self.module.restore_snapshot()
+
+        html = self.module.app.test_client().get("/").get_data(as_text=True)
+        self.assertIn("2h 0m ago", html)
+        self.assertIn("showing stale data", html)
+
+
+if __name__ == "__main__":
+    unittest.main()
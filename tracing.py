@@ -0,0 +1,377 @@
+"""Per-cycle and per-request traces, written as OpenTelemetry JSON lines.
+
+start_trace() opens a root span on the current thread (the poll cycle, a
+web request); span() and profiling.span() inside it open child spans, which
+nest by thread-local stack and carry attributes (row counts, bytes, status
+codes). wrap() carries the current span into a worker thread. Without an
+exporter (configure(None), the default) no trace is started and span()
+costs one thread-local lookup.
+
+When a root span ends its finished spans are handed to the exporter, whose
+queue is never waited on: FileExporter serializes and writes them from its
+own thread, one OTLP/JSON `{"resourceSpans": [...]}` object per line (the
+format of the OpenTelemetry Collector's file exporter and `otlpjsonfile`
+receiver), rotating the file at a size limit. When the queue is full the
+trace is dropped and counted. A span that ends after its root, such as a
+source fetch outliving its poll cycle, is exported on its own with the same
+trace id.
+"""
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+INTERNAL, SERVER, CLIENT = 1, 2, 3  # OTLP SpanKind
+STATUS_UNSET, STATUS_OK, STATUS_ERROR = 0, 1, 2
+
+_local = threading.local()
+_exporter = None
+
+
+def configure(exporter):
+    """Send traces to `exporter` (None disables tracing); returns the old one."""
+    global _exporter
+    previous, _exporter = _exporter, exporter
+    return previous
+
+
+def get_exporter():
+    return _exporter
+
+
+class _Trace:
+    __slots__ = ("trace_id", "spans", "ended", "lock")
+
+    def __init__(self):
+        self.trace_id = os.urandom(16).hex()
+        self.spans = []
+        self.ended = False
+        self.lock = threading.Lock()
+
+
+class Span:
+    __slots__ = (
+        "trace", "name", "span_id", "parent_id", "kind", "start_ns", "end_ns",
+        "attributes", "status", "message",
+    )
+
+    def __init__(self, trace, name, parent_id, kind, attributes):
+        self.trace = trace
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = dict(attributes or {})
+        self.status = STATUS_UNSET
+        self.message = ""
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def error(self, exc):
+        self.status = STATUS_ERROR
+        self.message = "{}: {}".format(type(exc).__name__, exc)
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def set(self, **attributes):
+        pass
+
+    def error(self, exc):
+        pass
+
+
+NOOP = _NoopSpan()
+
+
+def _stack():
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def current():
+    """The innermost open span on this thread, or None."""
+    stack = getattr(_local, "stack", None)
+    return stack[-1] if stack else None
+
+
+def start_trace(name, kind=INTERNAL, attributes=None, detached=False):
+    """Open a root span on this thread; None when tracing is off.
+
+    A detached root is not made the current span, for requests whose
+    coroutines interleave on one thread (asgi.py).
+    """
+    if _exporter is None:
+        return None
+    root = Span(_Trace(), name, "", kind, attributes)
+    if not detached:
+        _stack().append(root)
+    return root
+
+
+def end_trace(root):
+    """Close a root span from start_trace() and export its trace."""
+    if root is None:
+        return
+    end_span(root)
+
+
+def start_span(name, attributes=None, kind=INTERNAL):
+    """Open a child of the current span; None outside a trace."""
+    parent = current()
+    if parent is None:
+        return None
+    child = Span(parent.trace, name, parent.span_id, kind, attributes)
+    _local.stack.append(child)
+    return child
+
+
+def end_span(span):
+    span.end_ns = time.time_ns()
+    stack = _stack()
+    if stack and stack[-1] is span:
+        stack.pop()
+    elif span in stack:
+        stack.remove(span)
+    trace = span.trace
+    with trace.lock:
+        if trace.ended:
+            late = [span]
+        else:
+            trace.spans.append(span)
+            late = None
+            if not span.parent_id:
+                trace.ended = True
+                late, trace.spans = trace.spans, []
+    exporter = _exporter
+    if late and exporter is not None:
+        exporter.export(late)
+
+
+@contextmanager
+def span(name, kind=INTERNAL, **attributes):
+    """A child span of the current one, for work that is not a poll stage."""
+    child = start_span(name, attributes, kind)
+    if child is None:
+        yield NOOP
+        return
+    try:
+        yield child
+    except BaseException as exc:
+        child.error(exc)
+        raise
+    finally:
+        end_span(child)
+
+
+@contextmanager
+def trace(name, kind=INTERNAL, **attributes):
+    root = start_trace(name, kind, attributes)
+    if root is None:
+        yield NOOP
+        return
+    try:
+        yield root
+    except BaseException as exc:
+        root.error(exc)
+        raise
+    finally:
+        end_trace(root)
+
+
+@contextmanager
+def attach(parent):
+    """Make `parent` (from current()) the current span on this thread."""
+    if parent is None:
+        yield
+        return
+    stack = _stack()
+    stack.append(parent)
+    try:
+        yield
+    finally:
+        if stack and stack[-1] is parent:
+            stack.pop()
+
+
+def wrap(fn):
+    """fn bound to the caller's current span, for running on another thread."""
+    parent = current()
+    if parent is None:
+        return fn
+
+    def run(*args, **kwargs):
+        with attach(parent):
+            return fn(*args, **kwargs)
+
+    return run
+
+
+def _value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": "" if value is None else str(value)}
+
+
+def _attributes(attributes):
+    return [{"key": key, "value": _value(value)} for key, value in attributes.items()]
+
+
+def to_otlp(spans, resource):
+    """An OTLP/JSON ExportTraceServiceRequest for finished spans."""
+    return {
+        "resourceSpans": [
+            {
+                "resource": {"attributes": _attributes(resource)},
+                "scopeSpans": [
+                    {
+                        "scope": {"name": "orchestrators-dashboard"},
+                        "spans": [
+                            {
+                                "traceId": s.trace.trace_id,
+                                "spanId": s.span_id,
+                                "parentSpanId": s.parent_id,
+                                "name": s.name,
+                                "kind": s.kind,
+                                "startTimeUnixNano": str(s.start_ns),
+                                "endTimeUnixNano": str(s.end_ns),
+                                "attributes": _attributes(s.attributes),
+                                "status": (
+                                    {"code": s.status, "message": s.message}
+                                    if s.message
+                                    else {"code": s.status}
+                                ),
+                            }
+                            for s in spans
+                        ],
+                    }
+                ],
+            }
+        ]
+    }
+
+
+class FileExporter:
+    """Writes traces to `directory`/traces-<pid>.jsonl from a background thread.
+
+    Each process writes its own file, so gunicorn workers never interleave
+    or rotate each other's lines. The file is rotated to .1, .2, ... once it
+    would grow past `max_bytes`, keeping `backups` old files.
+    """
+
+    def __init__(self, directory, max_bytes=10 * 1024 * 1024, backups=5, max_queue=1000,
+                 service="orchestrators-dashboard"):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.service = service
+        self.exported = 0
+        self.dropped = 0
+        self.written_bytes = 0
+        self._queue = queue.Queue(max_queue)
+        self._lock = threading.Lock()
+        self._pid = None
+        self._thread = None
+
+    @property
+    def path(self):
+        return os.path.join(self.directory, "traces-{}.jsonl".format(os.getpid()))
+
+    def export(self, spans):
+        """Queue finished spans for writing; never blocks."""
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(spans)
+        except queue.Full:
+            self.dropped += 1
+
+    def _ensure_thread(self):
+        # Threads do not survive fork: a gunicorn worker starts its own.
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue(self._queue.maxsize)
+                self._thread = threading.Thread(target=self._run, name="trace-export", daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write([spans for spans in batch if spans is not None])
+            except Exception:
+                logging.exception("Error writing traces to %s", self.directory)
+            for _ in batch:
+                self._queue.task_done()
+            if any(spans is None for spans in batch):
+                return
+
+    def _write(self, batch):
+        if not batch:
+            return
+        resource = {"service.name": self.service, "process.pid": os.getpid()}
+        data = "".join(
+            json.dumps(to_otlp(spans, resource), separators=(",", ":")) + "\n" for spans in batch
+        ).encode("utf-8")
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = 0
+        if size and size + len(data) > self.max_bytes:
+            self._rotate(path)
+        with open(path, "ab") as fh:
+            fh.write(data)
+        self.exported += len(batch)
+        self.written_bytes += len(data)
+
+    def _rotate(self, path):
+        for k in range(self.backups - 1, 0, -1):
+            older = "{}.{}".format(path, k)
+            if os.path.exists(older):
+                os.replace(older, "{}.{}".format(path, k + 1))
+        if self.backups:
+            os.replace(path, path + ".1")
+        else:
+            os.remove(path)
+
+    def flush(self):
+        """Wait until everything queued so far is written."""
+        if self._pid == os.getpid():
+            self._queue.join()
+
+    def close(self):
+        if self._pid == os.getpid():
+            self._queue.put(None)
+            self._thread.join(5)
+            self._pid = None
+
+    def stats(self):
+        return {
+            "path": self.path,
+            "exported": self.exported,
+            "dropped": self.dropped,
+            "queued": self._queue.qsize(),
+            "bytes": self.written_bytes,
+        }